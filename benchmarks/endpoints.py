@@ -0,0 +1,564 @@
+"""
+Endpoint benchmark.
+
+Seeds a synthetic data set (see utils/synthetic.py) into an empty database, then drives every route registered by the
+controllers with concurrent requests - through the Flask test client, or over HTTP to a local gunicorn - and reports the
+throughput, p50/p95/p99 latency and SQL statements per request of each endpoint. Statements are counted by the app's own
+/metrics histograms, so both servers report them the same way.
+
+The results can be written to a JSON file and compared with the results of another commit. The comparison fails (exit
+status 1) when an endpoint runs more statements per request than before, e.g. a query added in a loop.
+
+Run from the project root (uses a temporary SQLite database unless --database is given):
+    python -m benchmarks.endpoints [--users 1000] [--posts 5000] [--requests 200] [--concurrency 4]
+        [--server client|gunicorn] [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+PASSWORD = "Password.123"
+BENCH_EMAIL = "benchmark@example.com"
+
+# posts created per request when the benchmark makes its own posts
+SETUP_BATCH_SIZE = 100
+
+# number of users the benchmark user follows, so its feed has posts in it
+FEED_FOLLOWS = 20
+
+# statements per request are averages (e.g. a cold identity cache adds one), so a change smaller than this isn't reported
+# as a regression - a query added in a loop adds at least one statement to most requests
+QUERY_TOLERANCE = 0.1
+
+
+# return the p-th percentile of a list of numbers
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+# the current commit, marked "-dirty" when tracked files have changed
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "diff", "--quiet", "HEAD"]).returncode != 0
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if dirty else commit
+
+
+# requests through the Flask test client, one client per thread
+class TestClient:
+    # metrics are recorded when the response is closed, so they're complete as soon as the requests are
+    metrics_delay = 0
+
+    def __init__(self, app):
+        self.app = app
+        self.local = threading.local()
+
+    def request(self, method, path, body=None, token=None):
+        if not hasattr(self.local, "client"):
+            self.local.client = self.app.test_client()
+
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        # closing the response runs its call_on_close callbacks, which record the request's metrics
+        with self.local.client.open(path, method=method, json=body, headers=headers) as response:
+            return response.status_code, response.get_json(silent=True), response.get_data(as_text=True)
+
+    def close(self):
+        pass
+
+
+# requests over HTTP to a local gunicorn, one keep-alive connection per thread
+class GunicornClient:
+    # the workers record a request's metrics after sending its response
+    metrics_delay = 5
+
+    def __init__(self, port, workers, threads, timeout=60):
+        self.port = port
+        self.local = threading.local()
+        self.connections = []
+
+        # the workers write their metrics to files in a directory of their own, so /metrics totals every worker
+        self.metrics_dir = tempfile.TemporaryDirectory()
+        env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=self.metrics_dir.name)
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}",
+             "--workers", str(workers), "--threads", str(threads), "--log-level", "warning", "main:app_init()"],
+            env=env
+        )
+
+        # wait for the workers to answer
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"gunicorn exited with status {self.process.returncode}")
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                self.request("GET", "/cache/stats")
+                return
+            except OSError:
+                if time.monotonic() > deadline:
+                    self.close()
+                    raise RuntimeError("gunicorn didn't start in time")
+                time.sleep(0.2)
+
+    def request(self, method, path, body=None, token=None):
+        if not hasattr(self.local, "connection"):
+            self.local.connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+            self.connections.append(self.local.connection)
+
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+
+        try:
+            self.local.connection.request(method, path, body=None if body is None else json.dumps(body), headers=headers)
+            response = self.local.connection.getresponse()
+            text = response.read().decode()
+        except (http.client.HTTPException, OSError):
+            # the worker closed the connection (e.g. it was restarted), so reconnect on the next request
+            self.local.connection.close()
+            del self.local.connection
+            raise
+
+        try:
+            data = json.loads(text)
+        except ValueError:
+            data = None
+        return response.status, data, text
+
+    def close(self):
+        for connection in self.connections:
+            connection.close()
+        self.process.terminate()
+        self.process.wait()
+        self.metrics_dir.cleanup()
+
+
+# total SQL statements and requests recorded by /metrics for each endpoint
+def query_totals(client):
+    from prometheus_client.parser import text_string_to_metric_families
+
+    status, _, text = client.request("GET", "/metrics")
+    totals = {}
+    for family in text_string_to_metric_families(text):
+        if family.name != "http_request_db_queries":
+            continue
+        for sample in family.samples:
+            endpoint = sample.labels.get("endpoint")
+            if sample.name.endswith("_sum"):
+                totals.setdefault(endpoint, [0.0, 0.0])[0] = sample.value
+            elif sample.name.endswith("_count"):
+                totals.setdefault(endpoint, [0.0, 0.0])[1] = sample.value
+    return totals
+
+
+# one endpoint's requests - build(i, target) returns the path and body of request i, with target i from setup(n) if any,
+# and optionally the token to send it with (the benchmark user's by default)
+class Scenario:
+    def __init__(self, endpoint, method, build, setup=None):
+        self.endpoint = endpoint
+        self.method = method
+        self.build = build
+        self.setup = setup
+
+
+# the seeded data set and the benchmark user, and the requests made to each endpoint
+class Benchmark:
+    def __init__(self, client, ids, seed):
+        self.client = client
+        self.rng = random.Random(seed)
+        self.users = ids["users"]
+        self.posts = ids["posts"]
+        self.comments = ids["comments"]
+        self.categories = ids["categories"]
+
+        # write requests use ids not used by another scenario, so e.g. a post liked by one scenario isn't liked again
+        self.unused = {name: self.rng.sample(values, len(values)) for name, values in ids.items()}
+        self.token = None
+        self.registered = 0
+
+    # a request made while setting up a scenario, which must succeed
+    def call(self, method, path, body=None):
+        status, data, text = self.client.request(method, path, body, self.token)
+        if status >= 400:
+            raise RuntimeError(f"{method} {path} failed while setting up the benchmark ({status}): {text[:200]}")
+        return data
+
+    # n ids of a kind that no other scenario has used (reused from the start if there aren't enough)
+    def take(self, name, n):
+        pool = self.unused[name]
+        if len(pool) < n:
+            print(f"warning: not enough unused {name} for {n} requests, some requests will fail")
+            pool[:] = self.rng.sample(getattr(self, name), len(getattr(self, name)))
+        taken, pool[:] = pool[:n], pool[n:]
+        return taken
+
+    # a random id of a kind, for read requests
+    def pick(self, name):
+        return self.rng.choice(getattr(self, name))
+
+    # register and log in the benchmark user, and follow some users so its feed has posts
+    def sign_up(self):
+        self.call("POST", "/auth/register", {"name": "Benchmark", "email": BENCH_EMAIL, "password": PASSWORD})
+        self.token = self.call("POST", "/auth/login", {"email": BENCH_EMAIL, "password": PASSWORD})["token"]
+        for user_id in self.take("users", FEED_FOLLOWS):
+            self.call("POST", f"/followers/{user_id}")
+
+    # n new posts by the benchmark user
+    def own_posts(self, n):
+        post_ids = []
+        while len(post_ids) < n:
+            size = min(SETUP_BATCH_SIZE, n - len(post_ids))
+            body = [self.post_body(len(post_ids) + i) for i in range(size)]
+            post_ids += self.call("POST", "/posts/batch", body)["post_ids"]
+        return post_ids
+
+    # n new comments by the benchmark user
+    def own_comments(self, n):
+        return [self.call("POST", f"/comments/{post_id}", {"comment_text": f"Benchmark comment {i}"})["comment_id"]
+                for i, post_id in enumerate(self.take("posts", n))]
+
+    # n ids of a kind, each liked (or followed) by the benchmark user first
+    def liked(self, name, path, n):
+        targets = self.take(name, n)
+        for target in targets:
+            self.call("POST", path.format(target))
+        return targets
+
+    def own_categories(self, n):
+        post_ids = self.own_posts(n)
+        for i, post_id in enumerate(post_ids):
+            self.call("POST", f"/category/{post_id}", {"category": f"benchmark {i}"})
+        return list(zip(post_ids, (f"benchmark {i}" for i in range(n))))
+
+    def post_body(self, i):
+        return {"post_title": f"Benchmark post {i}", "post_content": "Benchmark post content " * 20, "categories": [self.pick("categories")]}
+
+    # the requests made to each endpoint, read-only endpoints first so the writes don't change what they read
+    def scenarios(self):
+        return [
+            # blog posts
+            Scenario("blogposts.get_posts", "GET", lambda i, t: ("/posts/", None)),
+            Scenario("blogposts.get_posts_list", "GET", lambda i, t: ("/posts/compact", None)),
+            Scenario("blogposts.search_posts", "GET", lambda i, t: (f"/posts/search?q={self.rng.choice(('game', 'music', 'city', 'science', 'history'))}", None)),
+            Scenario("blogposts.view_category", "GET", lambda i, t: (f"/posts/category/{self.pick('categories')}", None)),
+            Scenario("blogposts.view_post", "GET", lambda i, t: (f"/posts/{self.pick('posts')}", None)),
+
+            # comments, likes and followers
+            Scenario("comments.get_post_comments", "GET", lambda i, t: (f"/comments/{self.pick('posts')}", None)),
+            Scenario("likes.get_post_likes", "GET", lambda i, t: (f"/likes/post/{self.pick('posts')}", None)),
+            Scenario("likes.get_comment_likes", "GET", lambda i, t: (f"/likes/comment/{self.pick('comments')}", None)),
+            Scenario("followers.get_post_likes", "GET", lambda i, t: (f"/followers/{self.pick('users')}", None)),
+
+            # users
+            Scenario("users.get_users", "GET", lambda i, t: ("/users/", None)),
+            Scenario("users.view_user", "GET", lambda i, t: (f"/users/{self.pick('users')}", None)),
+            Scenario("users.view_user_posts", "GET", lambda i, t: (f"/users/posts/{self.pick('users')}", None)),
+            Scenario("users.view_user_comments", "GET", lambda i, t: (f"/users/comments/{self.pick('users')}", None)),
+            Scenario("users.view_user_likes", "GET", lambda i, t: (f"/users/likes/{self.pick('users')}", None)),
+
+            # feed, cache and metrics
+            Scenario("feed.get_feed", "GET", lambda i, t: ("/feed/", None)),
+            Scenario("cache.get_cache_stats", "GET", lambda i, t: ("/cache/stats", None)),
+            Scenario("metrics.get_metrics", "GET", lambda i, t: ("/metrics", None)),
+
+            # auth
+            Scenario("auth.login_user", "POST", lambda i, t: ("/auth/login", {"email": BENCH_EMAIL, "password": PASSWORD})),
+            Scenario("auth.register_user", "POST", lambda i, t: ("/auth/register", {"name": f"Registered {i}", "email": f"registered{t}@example.com", "password": PASSWORD}),
+                     setup=self.new_emails),
+
+            # writes to blog posts and categories
+            Scenario("blogposts.create_post", "POST", lambda i, t: ("/posts/", self.post_body(i))),
+            Scenario("blogposts.create_posts_batch", "POST", lambda i, t: ("/posts/batch", [self.post_body(i * 10 + j) for j in range(10)])),
+            Scenario("blogposts.update_post", "PUT", lambda i, t: (f"/posts/{t}", {"post_title": f"Updated post {i}", "post_content": "Updated content"}),
+                     setup=self.own_posts),
+            Scenario("category.new_category", "POST", lambda i, t: (f"/category/{t}", {"category": f"new category {i}"}),
+                     setup=self.own_posts),
+            Scenario("category.delete_category", "DELETE", lambda i, t: (f"/category/{t[0]}", {"category": t[1]}),
+                     setup=self.own_categories),
+
+            # writes to comments
+            Scenario("comments.like_post", "POST", lambda i, t: (f"/comments/{self.pick('posts')}", {"comment_text": f"Benchmark comment {i}"})),
+            Scenario("comments.update_comment", "PUT", lambda i, t: (f"/comments/{t}", {"comment_text": f"Updated comment {i}"}),
+                     setup=self.own_comments),
+            Scenario("comments.delete_comment", "DELETE", lambda i, t: (f"/comments/{t}", None), setup=self.own_comments),
+
+            # writes to likes
+            Scenario("likes.like_post", "POST", lambda i, t: (f"/likes/post/{t}", None), setup=lambda n: self.take("posts", n)),
+            Scenario("likes.like_comment", "POST", lambda i, t: (f"/likes/comment/{t}", None), setup=lambda n: self.take("comments", n)),
+            Scenario("likes.toggle_post_like", "POST", lambda i, t: (f"/likes/post/{t}/toggle", None), setup=lambda n: self.take("posts", n)),
+            Scenario("likes.toggle_comment_like", "POST", lambda i, t: (f"/likes/comment/{t}/toggle", None), setup=lambda n: self.take("comments", n)),
+            Scenario("likes.delete_post_like", "DELETE", lambda i, t: (f"/likes/post/{t}", None),
+                     setup=lambda n: self.liked("posts", "/likes/post/{}", n)),
+            Scenario("likes.delete_comment_like", "DELETE", lambda i, t: (f"/likes/comment/{t}", None),
+                     setup=lambda n: self.liked("comments", "/likes/comment/{}", n)),
+
+            # writes to followers and users
+            Scenario("followers.follow_user", "POST", lambda i, t: (f"/followers/{t}", None), setup=lambda n: self.take("users", n)),
+            Scenario("followers.delete_post_like", "DELETE", lambda i, t: (f"/followers/{t}", None),
+                     setup=lambda n: self.liked("users", "/followers/{}", n)),
+            Scenario("users.update_post", "PUT", lambda i, t: ("/users/", {"name": f"Benchmark {i}"})),
+
+            # deleting posts and users last, as it also hides their comments and likes
+            Scenario("blogposts.delete_post", "DELETE", lambda i, t: (f"/posts/{t}", None), setup=self.own_posts),
+            Scenario("users.delete_user", "DELETE", lambda i, t: ("/users/", None, t), setup=self.new_accounts),
+        ]
+
+    # n email addresses that haven't been registered yet
+    def new_emails(self, n):
+        first = self.registered
+        self.registered += n
+        return list(range(first, first + n))
+
+    # n new users, each with a post and a comment, returning their tokens
+    def new_accounts(self, n):
+        tokens = []
+        for t in self.new_emails(n):
+            email = f"account{t}@example.com"
+            self.call("POST", "/auth/register", {"name": f"Account {t}", "email": email, "password": PASSWORD})
+            token = self.call("POST", "/auth/login", {"email": email, "password": PASSWORD})["token"]
+            self.client.request("POST", "/posts/", self.post_body(t), token)
+            self.client.request("POST", f"/comments/{self.pick('posts')}", {"comment_text": f"Account comment {t}"}, token)
+            tokens.append(token)
+        return tokens
+
+    # send a scenario's requests from a pool of threads, returning the latency and status of every request
+    def run(self, scenario, requests, concurrency):
+        latencies = []
+        errors = []
+
+        def send(path, body, token):
+            start = time.perf_counter()
+            try:
+                status, _, text = self.client.request(scenario.method, path, body, token)
+            except (http.client.HTTPException, OSError) as e:
+                status, text = None, str(e)
+            latencies.append(time.perf_counter() - start)
+            if status is None or status >= 400:
+                errors.append((status, text[:200]))
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for future in [pool.submit(send, path, body, token[0] if token else self.token) for path, body, *token in requests]:
+                future.result()
+        return time.perf_counter() - start, latencies, errors
+
+
+# create the app against the benchmark database, with response caching and query budgets as chosen
+def create_app(args, database):
+    os.environ["SQLALCHEMY_DATABASE_URI"] = database
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark")
+    os.environ["CACHE_BACKEND"] = args.cache
+    os.environ["BCRYPT_LOG_ROUNDS"] = str(args.rounds)
+    os.environ["QUERY_BUDGET_MODE"] = "off"
+
+    # the benchmark measures one database, and metrics are kept in this process unless gunicorn is used
+    os.environ.pop("DATABASE_REPLICA_URIS", None)
+    os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+
+    from main import app_init
+
+    return app_init()
+
+
+# empty the database and add the synthetic data set, returning the ids the requests can use
+def seed(app, args):
+    import sqlalchemy as sa
+    from main import db, passwords
+    from models import User, BlogPost, Comment, Category
+    from utils.counters import recount_all
+    from utils.search import reindex_all
+    from utils.synthetic import generate
+
+    with app.app_context():
+        if args.database and sa.inspect(db.engine).get_table_names() and not args.reset:
+            sys.exit(f"{args.database} isn't empty - use --reset to drop its tables first")
+
+        db.drop_all()
+        db.create_all()
+        counts = generate(
+            users=args.users, posts=args.posts, comments_per_post=args.comments_per_post, likes=args.likes,
+            follows=args.follows, categories=args.categories, password_hash=passwords.hash(PASSWORD), seed=args.seed,
+            log=lambda message: None
+        )
+        recount_all()
+        reindex_all()
+        db.session.commit()
+
+        ids = {
+            "users": db.session.scalars(db.select(User.user_id)).all(),
+            "posts": db.session.scalars(db.select(BlogPost.post_id)).all(),
+            "comments": db.session.scalars(db.select(Comment.comment_id)).all(),
+            "categories": db.session.scalars(db.select(Category.category_name)).all(),
+        }
+        return counts, ids, db.engine.dialect.name
+
+
+# print the results next to an earlier run, returning the endpoints that now run more statements per request
+def compare(results, baseline):
+    print(f"\ncompared with {baseline['meta'].get('commit')} ({baseline['meta'].get('date')})")
+    print(f"{'endpoint':<30} {'queries':>15} {'p95 ms':>17} {'req/s':>17}")
+
+    regressions = []
+    for endpoint, new in results["endpoints"].items():
+        old = baseline["endpoints"].get(endpoint)
+        if old is None:
+            print(f"{endpoint:<30} {'(new)':>15}")
+            continue
+
+        # endpoints whose requests aren't recorded by /metrics have no query count
+        old_queries, new_queries = old["queries_per_request"] or 0, new["queries_per_request"] or 0
+
+        flag = ""
+        if new_queries > old_queries + QUERY_TOLERANCE:
+            regressions.append(endpoint)
+            flag = "  <- more queries"
+        print(
+            f"{endpoint:<30} {old_queries:>6.1f} -> {new_queries:<6.1f} "
+            f"{old['p95_ms']:>7.1f} -> {new['p95_ms']:<7.1f} {old['throughput']:>6.0f} -> {new['throughput']:<6.0f}{flag}"
+        )
+
+    for endpoint in sorted(baseline["endpoints"].keys() - results["endpoints"].keys()):
+        print(f"{endpoint:<30} {'(not run)':>15}")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the throughput, latency and queries per request of every endpoint.")
+    parser.add_argument("--database", help="SQLAlchemy URL of an empty database (default: a temporary SQLite database)")
+    parser.add_argument("--reset", action="store_true", help="drop the tables of a --database that isn't empty")
+    parser.add_argument("--users", type=int, default=1000, help="number of users")
+    parser.add_argument("--posts", type=int, default=5000, help="number of blog posts")
+    parser.add_argument("--comments-per-post", type=float, default=3.0, help="average number of comments per post")
+    parser.add_argument("--likes", type=int, default=20000, help="number of post likes")
+    parser.add_argument("--follows", type=int, default=5000, help="number of follows")
+    parser.add_argument("--categories", type=int, default=50, help="number of categories")
+    parser.add_argument("--seed", type=int, default=1, help="random seed of the data set and the requests")
+    parser.add_argument("--requests", type=int, default=200, help="number of requests to each endpoint")
+    parser.add_argument("--warmup", type=int, default=10, help="untimed requests to each read-only endpoint first")
+    parser.add_argument("--concurrency", type=int, default=4, help="number of concurrent request threads")
+    parser.add_argument("--server", choices=("client", "gunicorn"), default="client", help="send requests through the Flask test client or to a local gunicorn")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=4, help="gunicorn threads per worker")
+    parser.add_argument("--port", type=int, default=8765, help="gunicorn port")
+    parser.add_argument("--cache", choices=("none", "memory", "redis"), default="none", help="response cache backend (none measures every request's queries)")
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt work factor")
+    parser.add_argument("--endpoints", help="comma separated endpoints to run (default: all)")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run - exits with status 1 if an endpoint runs more queries per request")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = args.database or f"sqlite:///{os.path.join(directory, 'endpoints.db')}"
+        app = create_app(args, database)
+        print(f"seeding {args.users} users and {args.posts} posts...")
+        counts, ids, dialect = seed(app, args)
+
+        client = GunicornClient(args.port, args.workers, args.threads) if args.server == "gunicorn" else TestClient(app)
+        try:
+            results = benchmark(app, client, ids, args)
+        finally:
+            client.close()
+
+    results["meta"] = {
+        "commit": git_commit(),
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "dialect": dialect,
+        "rows": counts,
+        "args": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+    }
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"\nresults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file))
+        if regressions:
+            sys.exit(f"\nmore queries per request: {', '.join(regressions)}")
+
+
+# run every scenario, printing and returning the results of each endpoint
+def benchmark(app, client, ids, args):
+    bench = Benchmark(client, ids, args.seed)
+    bench.sign_up()
+
+    # every route should have a scenario, so a new route is benchmarked as soon as it's added
+    routes = {rule.endpoint for rule in app.url_map.iter_rules() if rule.endpoint != "static"}
+    scenarios = [scenario for scenario in bench.scenarios() if scenario.endpoint in routes]
+    for endpoint in sorted(routes - {scenario.endpoint for scenario in scenarios}):
+        print(f"warning: {endpoint} has no benchmark scenario")
+    if args.endpoints:
+        scenarios = [scenario for scenario in scenarios if scenario.endpoint in args.endpoints.split(",")]
+
+    print(f"{args.requests} requests per endpoint, {args.concurrency} concurrent, {args.server}, cache {args.cache}")
+    print(f"{'endpoint':<30} {'method':<6} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'queries':>7}")
+
+    endpoints = {}
+    for scenario in scenarios:
+        # each endpoint reads the same ids in every run, whichever other endpoints are run
+        bench.rng = random.Random(f"{args.seed}:{scenario.endpoint}")
+        targets = scenario.setup(args.requests) if scenario.setup else [None] * args.requests
+        requests = [scenario.build(i, target) for i, target in enumerate(targets)]
+
+        if scenario.method == "GET":
+            for path, body, *_ in requests[:args.warmup]:
+                client.request("GET", path, body, bench.token)
+
+        before = query_totals(client)
+        elapsed, latencies, errors = bench.run(scenario, requests, args.concurrency)
+        queries, counted = wait_for_totals(client, scenario.endpoint, before, len(requests))
+
+        endpoints[scenario.endpoint] = result = {
+            "method": scenario.method,
+            "requests": len(requests),
+            "errors": len(errors),
+            "throughput": round(len(requests) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "queries_per_request": round(queries / counted, 2) if counted else None,
+        }
+        print(
+            f"{scenario.endpoint:<30} {scenario.method:<6} {result['requests']:>8} {result['errors']:>6} {result['throughput']:>8.1f} "
+            f"{result['p50_ms']:>6.1f}ms {result['p95_ms']:>6.1f}ms {result['p99_ms']:>6.1f}ms "
+            f"{'-' if result['queries_per_request'] is None else format(result['queries_per_request'], '.1f'):>7}"
+        )
+        if errors:
+            status, text = errors[0]
+            print(f"    first error ({status}): {text}")
+
+    return {"endpoints": endpoints}
+
+
+# the statements and requests /metrics recorded for an endpoint since an earlier snapshot
+# gunicorn records a request's metrics after sending its response, so wait briefly for the last ones
+def wait_for_totals(client, endpoint, before, expected):
+    deadline = time.monotonic() + client.metrics_delay
+    while True:
+        after = query_totals(client)
+        old = before.get(endpoint, [0.0, 0.0])
+        new = after.get(endpoint, [0.0, 0.0])
+        queries, counted = new[0] - old[0], new[1] - old[1]
+        if counted >= expected or time.monotonic() > deadline:
+            return queries, counted
+        time.sleep(0.05)
+
+
+if __name__ == "__main__":
+    main()
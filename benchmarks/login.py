@@ -0,0 +1,107 @@
+"""
+Login throughput benchmark.
+
+Sends concurrent POST "/auth/login" requests from a pool of threads (like a threaded gunicorn worker) while another
+thread keeps requesting a cheap endpoint, and reports login throughput and the latency of both kinds of request.
+Each run uses a different number of password hashing threads (0 hashes on the request thread).
+
+Run from the project root (uses a temporary SQLite database):
+    python -m benchmarks.login [--logins 64] [--concurrency 16] [--rounds 12] [--workers 0,1,4]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PASSWORD = "Password.123"
+
+
+# return the p-th percentile of a list of numbers
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+# create the app with a given number of hashing threads and a database holding one user
+def create_app(database, workers, rounds):
+    os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{database}"
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark")
+    os.environ["PASSWORD_HASH_WORKERS"] = str(workers)
+    # queue every login and wait for it, so the benchmark measures throughput rather than turning logins away
+    os.environ["PASSWORD_HASH_QUEUE_SIZE"] = "1000"
+    os.environ["PASSWORD_HASH_TIMEOUT"] = "600"
+    os.environ["BCRYPT_LOG_ROUNDS"] = str(rounds)
+
+    from main import app_init, db, passwords
+    from models.users import User
+
+    app = app_init()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add(User(name="Benchmark", email="benchmark@email.com", password=passwords.hash(PASSWORD)))
+        db.session.commit()
+    return app
+
+
+def run(app, logins, concurrency):
+    login_times = []
+    other_times = []
+    done = threading.Event()
+
+    def login():
+        client = app.test_client()
+        start = time.perf_counter()
+        response = client.post("/auth/login", json={"email": "benchmark@email.com", "password": PASSWORD})
+        assert response.status_code == 200, response.json
+        login_times.append(time.perf_counter() - start)
+
+    # keep requesting an endpoint that doesn't hash passwords while the logins run
+    def other():
+        client = app.test_client()
+        while not done.is_set():
+            start = time.perf_counter()
+            client.get("/cache/stats")
+            other_times.append(time.perf_counter() - start)
+            time.sleep(0.01)
+
+    watcher = threading.Thread(target=other)
+    watcher.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(login) for _ in range(logins)]:
+            future.result()
+    elapsed = time.perf_counter() - start
+    done.set()
+    watcher.join()
+
+    return elapsed, login_times, other_times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure login throughput under concurrency.")
+    parser.add_argument("--logins", type=int, default=64, help="number of logins")
+    parser.add_argument("--concurrency", type=int, default=16, help="number of concurrent request threads")
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt work factor")
+    parser.add_argument("--workers", default=f"0,{os.cpu_count() or 1}", help="comma separated numbers of hashing threads to compare")
+    args = parser.parse_args()
+
+    print(f"{args.logins} logins, {args.concurrency} concurrent, bcrypt cost {args.rounds}, {os.cpu_count()} CPUs")
+    print(f"{'hash threads':>12} {'logins/s':>9} {'login p50':>10} {'login p95':>10} {'other p50':>10} {'other p95':>10}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for workers in (int(value) for value in args.workers.split(",")):
+            app = create_app(os.path.join(directory, f"login-{workers}.db"), workers, args.rounds)
+            elapsed, login_times, other_times = run(app, args.logins, args.concurrency)
+            print(
+                f"{workers:>12} {args.logins / elapsed:>9.1f} "
+                f"{statistics.median(login_times) * 1000:>8.0f}ms {percentile(login_times, 95) * 1000:>8.0f}ms "
+                f"{statistics.median(other_times) * 1000:>8.1f}ms {percentile(other_times, 95) * 1000:>8.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
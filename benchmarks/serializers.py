@@ -0,0 +1,81 @@
+"""
+Serializer microbenchmark.
+
+Compares building a marshmallow schema for every request (the old behaviour of the controllers) with
+reusing the schema kept by schemas.registry.get_schema, for a page of posts with authors, comments and
+categories. The objects are transient model instances, so no database is needed.
+
+Run from the project root:
+    python -m benchmarks.serializers [--posts 20] [--comments 5] [--repeat 200]
+"""
+import argparse
+import timeit
+from datetime import date
+
+from main import app_init
+
+# the schemas import the model classes through main, so the app is created before they are imported
+app = app_init()
+
+from models.users import User
+from models.blog_posts import BlogPost
+from models.comments import Comment
+from models.categories import Category
+from schemas.blog_posts import BlogPostSchema
+from schemas.registry import get_schema
+from controllers.blog_posts_controllers import post_detail_fields
+
+
+# build a page of transient posts, each with an author, comments and categories
+def build_posts(post_count, comment_count):
+    author = User(user_id=1, name="Author", email="author@email.com", follower_count=3)
+    commenter = User(user_id=2, name="Commenter", email="commenter@email.com", follower_count=1)
+    categories = [Category(category_id=1, category_name="News"), Category(category_id=2, category_name="Tech")]
+
+    posts = []
+    for post_id in range(1, post_count + 1):
+        post = BlogPost(post_id=post_id, post_title=f"Post {post_id}", post_content="Content " * 20,
+                        posted_date=date(2024, 1, 1), like_count=post_id, author_info=author)
+        post.categories = list(categories)
+        post.comments = [
+            Comment(comment_id=post_id * 100 + i, comment_text="A comment", comment_date=date(2024, 1, 2),
+                    like_count=i, author_info=commenter)
+            for i in range(comment_count)
+        ]
+        posts.append(post)
+    return posts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time post serialization with and without the schema registry.")
+    parser.add_argument("--posts", type=int, default=20, help="posts per page")
+    parser.add_argument("--comments", type=int, default=5, help="comments per post")
+    parser.add_argument("--repeat", type=int, default=200, help="number of pages serialized per measurement")
+    args = parser.parse_args()
+
+    fields = ("post_id",) + post_detail_fields
+    posts = build_posts(args.posts, args.comments)
+
+    # the old behaviour: a new schema is built for every request
+    def per_request():
+        return BlogPostSchema(many=True, only=fields).dump(posts)
+
+    # the new behaviour: the schema for the projection is built once and reused
+    def registry():
+        return get_schema(BlogPostSchema, many=True, only=fields).dump(posts)
+
+    # both must produce the same output
+    assert per_request() == registry()
+
+    # report the best of five runs, per page and per serialized post
+    for name, func in (("per-request schema", per_request), ("registry schema", registry)):
+        best = min(timeit.repeat(func, number=args.repeat, repeat=5)) / args.repeat
+        print(f"{name:<20} {best * 1e6:10.1f} us/page {best * 1e6 / args.posts:8.1f} us/post")
+
+    # the cost of building the schema on its own
+    build = min(timeit.repeat(lambda: BlogPostSchema(many=True, only=fields), number=args.repeat, repeat=5)) / args.repeat
+    print(f"{'schema construction':<20} {build * 1e6:10.1f} us/page")
+
+
+if __name__ == "__main__":
+    main()
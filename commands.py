@@ -1,23 +1,131 @@
-from main import db, bcrypt
+import os
+import time
+import click
+from datetime import timedelta
+from main import db, passwords
 from flask import Blueprint
+from alembic import command as alembic
+from alembic.config import Config
+from alembic.migration import MigrationContext
 from models import User, BlogPost, Comment, Like, Follower, Category
+from utils.counters import recount_all
+from utils.search import reindex_all
+from utils.synthetic import generate
+from utils.transfer import open_export, open_import, export_data, import_data
+from utils.purge import purge_deleted
 
 
 # create blueprint for CLI commands
 db_command = Blueprint("db", __name__)
 
 
-# "flask db create" CLI command - creates database tables using SQLAlchemy
+# folder containing the alembic environment and the migration scripts
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+# the revision matching the tables "flask db create" made before migrations were added
+BASELINE_REVISION = "0001"
+
+
+# alembic configuration pointing at the migrations folder (there is no alembic.ini)
+def alembic_config():
+    config = Config()
+    config.set_main_option("script_location", MIGRATIONS_DIR)
+    return config
+
+
+# the revision a database created before migrations were added is at, from the tables and columns it has
+# returns None for an empty database or one that already records its revision
+def unversioned_revision():
+    with db.engine.connect() as connection:
+        if MigrationContext.configure(connection).get_current_revision() is not None:
+            return None
+
+        inspector = db.inspect(connection)
+        if not inspector.has_table("blogposts"):
+            return None
+
+        # the original schema linked each category row to one post
+        if "post_id" in [column["name"] for column in inspector.get_columns("categories")]:
+            return BASELINE_REVISION
+
+        # "flask db create" with the models of revision 0002 (the home feed timelines were its last change)
+        if inspector.has_table("timelines"):
+            return "0002"
+
+    raise click.ClickException(
+        "The database has tables but no migration revision, and doesn't match the baseline schema. "
+        "Run \"flask db stamp <revision>\" with the revision it matches, then \"flask db upgrade\"."
+    )
+
+
+# "flask db create" CLI command - creates database tables using SQLAlchemy and marks them as up to date with the migrations
 @db_command.cli.command("create")
 def create_db():
     db.create_all()
+    alembic.stamp(alembic_config(), "head")
     print("Tables created...")
 
 
+# "flask db upgrade" CLI command - runs the migrations up to a revision (the latest by default)
+# a database created before migrations were added is first marked as being at the baseline revision
+@db_command.cli.command("upgrade")
+@click.argument("revision", default="head")
+@click.option("--sql", is_flag=True, help="Print the SQL instead of running it.")
+def upgrade_db(revision, sql):
+    if not sql:
+        current = unversioned_revision()
+        if current is not None:
+            alembic.stamp(alembic_config(), current)
+            print(f"Existing tables marked as revision {current}...")
+
+    alembic.upgrade(alembic_config(), revision, sql=sql)
+    print("Database upgraded...")
+
+
+# "flask db downgrade" CLI command - reverts the migrations down to a revision (the previous one by default)
+@db_command.cli.command("downgrade")
+@click.argument("revision", default="-1")
+@click.option("--sql", is_flag=True, help="Print the SQL instead of running it.")
+def downgrade_db(revision, sql):
+    alembic.downgrade(alembic_config(), revision, sql=sql)
+    print("Database downgraded...")
+
+
+# "flask db revision" CLI command - creates a new migration script, optionally generated from the differences between the models and the database
+@db_command.cli.command("revision")
+@click.option("-m", "--message", required=True, help="Description of the migration.")
+@click.option("--autogenerate", is_flag=True, help="Generate the migration from the models.")
+def revision_db(message, autogenerate):
+    alembic.revision(alembic_config(), message=message, autogenerate=autogenerate)
+
+
+# "flask db stamp" CLI command - records a revision as the database's current revision without running migrations
+@db_command.cli.command("stamp")
+@click.argument("revision")
+def stamp_db(revision):
+    alembic.stamp(alembic_config(), revision)
+    print(f"Database marked as revision {revision}...")
+
+
+# "flask db current" CLI command - shows the database's current revision
+@db_command.cli.command("current")
+def current_db():
+    alembic.current(alembic_config())
+
+
+# "flask db history" CLI command - lists the migrations
+@db_command.cli.command("history")
+def history_db():
+    alembic.history(alembic_config())
+
+
 # "flask db drop" CLI command - removes tables from database
 @db_command.cli.command("drop")
 def drop_db():
     db.drop_all()
+    # forget the migration revision too, so "flask db upgrade" starts from an empty database
+    with db.engine.begin() as connection:
+        connection.execute(db.text("DROP TABLE IF EXISTS alembic_version"))
     print("Tables dropped...")
 
 
@@ -28,25 +136,25 @@ def seed_db():
     user1 = User(
         name="Jim Parsons",
         email="jimparsons@gmail.com",
-        password=bcrypt.generate_password_hash("Password.123").decode("utf-8"),
+        password=passwords.hash("Password.123"),
     )
 
     user2 = User(
         name="Lebron James",
         email="lebronjames@gmail.com",
-        password=bcrypt.generate_password_hash("Password.123").decode("utf-8"),
+        password=passwords.hash("Password.123"),
     )
 
     user3 = User(
         name="Christiano Ronaldo",
         email="christianoronaldo@gmail.com",
-        password=bcrypt.generate_password_hash("Password.123").decode("utf-8"),
+        password=passwords.hash("Password.123"),
     )
 
     user4 = User(
         name="Joe Biden",
         email="joebiden@gmail.com",
-        password=bcrypt.generate_password_hash("Password.123").decode("utf-8"),
+        password=passwords.hash("Password.123"),
     )
 
     db.session.add_all([user1, user2, user3, user4])
@@ -186,16 +294,136 @@ def seed_db():
     db.session.commit()
 
     # seed categories
-    category1 = Category(category_name="Sports", post_id=2)
+    category1 = Category(category_name="Sports", name_normalized="sports")
 
-    category2 = Category(category_name="TV", post_id=1)
+    category2 = Category(category_name="TV", name_normalized="tv")
 
-    category3 = Category(category_name="Football", post_id=3)
+    category3 = Category(category_name="Football", name_normalized="football")
 
-    category4 = Category(category_name="Politics", post_id=4)
+    category4 = Category(category_name="Politics", name_normalized="politics")
 
     db.session.add_all([category1, category2, category3, category4])
 
+    # link categories to blog posts
+    blogpost2.categories.append(category1)
+
+    blogpost1.categories.append(category2)
+
+    blogpost3.categories.append(category3)
+
+    blogpost4.categories.append(category4)
+
+    db.session.commit()
+
+    # set the like and follower counters from the seeded likes and followers
+    recount_all()
+
+    # build the search index for the seeded posts
+    reindex_all()
+
     db.session.commit()
 
     print("Database seeded...")
+
+
+# "flask db seed-large" CLI command - adds a large synthetic data set for load testing
+# rows are inserted in bulk batches with one precomputed password hash ("Password.123" for every user), and likes, follows,
+# comments and authorship follow Zipfian distributions. the same --seed always generates the same data
+@db_command.cli.command("seed-large")
+@click.option("--users", default=10000, show_default=True, help="Number of users.")
+@click.option("--posts", default=100000, show_default=True, help="Number of blog posts.")
+@click.option("--comments-per-post", default=3.0, show_default=True, help="Average number of comments per post.")
+@click.option("--likes", default=1000000, show_default=True, help="Number of post likes.")
+@click.option("--follows", default=200000, show_default=True, help="Number of follows.")
+@click.option("--categories", default=50, show_default=True, help="Number of categories.")
+@click.option("--seed", default=1, show_default=True, help="Random seed.")
+@click.option("--zipf-exponent", default=1.1, show_default=True, help="Skew of the likes, follows, comments and authors (higher is more skewed).")
+@click.option("--batch-size", default=10000, show_default=True, help="Rows per INSERT or COPY batch.")
+def seed_large_db(users, posts, comments_per_post, likes, follows, categories, seed, zipf_exponent, batch_size):
+    if users < 1:
+        raise click.BadParameter("there must be at least one user", param_hint="--users")
+
+    generate(
+        users=users, posts=posts, comments_per_post=comments_per_post, likes=likes, follows=follows, categories=categories,
+        password_hash=passwords.hash("Password.123"), seed=seed, zipf_exponent=zipf_exponent, batch_size=batch_size
+    )
+
+    # set the like and follower counters and build the search index for the new rows
+    recount_all()
+    reindex_all()
+    db.session.commit()
+
+    print("Large database seeded...")
+
+
+# "flask db recount" CLI command - rebuilds the like and follower counters in bulk, repairing any drift
+@db_command.cli.command("recount")
+def recount_db():
+    recount_all()
+    db.session.commit()
+    print("Counters rebuilt...")
+
+
+# "flask db reindex" CLI command - rebuilds the full-text search index for every post
+@db_command.cli.command("reindex")
+def reindex_db():
+    reindex_all()
+    db.session.commit()
+    print("Search index rebuilt...")
+
+
+# "flask db export" CLI command - writes every table to a JSONL file ("-" for stdout), gzip compressed with --gzip or a
+# file name ending with ".gz". rows are streamed in batches, so memory use doesn't grow with the size of the database
+@db_command.cli.command("export")
+@click.argument("path")
+@click.option("--gzip", "compress", is_flag=True, help="Compress the file with gzip.")
+@click.option("--batch-size", default=10000, show_default=True, help="Rows read per batch.")
+def export_db(path, compress, batch_size):
+    # progress goes to stderr when the export is written to stdout
+    log = (lambda message: click.echo(message, err=True)) if path == "-" else print
+
+    start = time.perf_counter()
+    with open_export(path, compress) as file:
+        counts = export_data(file, batch_size, log)
+    log_throughput(log, "exported", sum(counts.values()), time.perf_counter() - start)
+
+
+# "flask db import" CLI command - adds the rows of a "flask db export" file ("-" for stdin) to an empty database, keeping
+# their ids. create the tables first with "flask db create" or "flask db upgrade"
+@db_command.cli.command("import")
+@click.argument("path")
+@click.option("--batch-size", default=10000, show_default=True, help="Rows inserted per batch.")
+def import_db(path, batch_size):
+    start = time.perf_counter()
+    with open_import(path) as file:
+        try:
+            counts = import_data(file, batch_size)
+        except ValueError as e:
+            db.session.rollback()
+            raise click.ClickException(str(e))
+
+    # the search index isn't exported, so build it for the imported posts
+    reindex_all()
+    db.session.commit()
+    log_throughput(print, "imported", sum(counts.values()), time.perf_counter() - start)
+
+
+# "flask db purge" CLI command - removes the soft deleted users, posts and comments and every row referencing them, in
+# batches of --batch-size rows per transaction. with --interval it keeps running as a worker, purging every --interval seconds
+@db_command.cli.command("purge")
+@click.option("--older-than", default=0, show_default=True, help="Only purge rows deleted at least this many seconds ago.")
+@click.option("--batch-size", default=1000, show_default=True, help="Rows deleted per transaction.")
+@click.option("--interval", default=0, show_default=True, help="Keep running, purging every this many seconds (0 purges once).")
+def purge_db(older_than, batch_size, interval):
+    while True:
+        start = time.perf_counter()
+        counts = purge_deleted(timedelta(seconds=older_than), batch_size)
+        log_throughput(print, "purged", sum(counts.values()), time.perf_counter() - start)
+
+        if interval <= 0:
+            return
+        time.sleep(interval)
+
+
+def log_throughput(log, action, rows, seconds):
+    log(f"{rows} rows {action} in {seconds:.1f}s ({rows / seconds if seconds > 0 else 0:,.0f} rows/s)...")
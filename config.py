@@ -1,4 +1,6 @@
 import os
+from sqlalchemy.engine import make_url
+from utils.pool import InstrumentedQueuePool
 
 
 class BaseConfig(object):
@@ -14,6 +16,93 @@ class BaseConfig(object):
         
         return db
     
+    # sqlalchemy engine options - connection pool sizing, health checks and the per-statement timeout
+    @property
+    def SQLALCHEMY_ENGINE_OPTIONS(self):
+        return self.engine_options(self.SQLALCHEMY_DATABASE_URI)
+
+    # read replicas - one bind named "replica_<n>" per uri in DATABASE_REPLICA_URIS, with the same engine options as the primary
+    @property
+    def SQLALCHEMY_BINDS(self):
+        uris = [uri.strip() for uri in os.environ.get("DATABASE_REPLICA_URIS", "").split(",") if uri.strip()]
+        return {f"replica_{number}": {"url": uri, **self.engine_options(uri)} for number, uri in enumerate(uris, start=1)}
+
+    # seconds between health checks of each replica
+    @property
+    def REPLICA_CHECK_INTERVAL(self):
+        return float(os.environ.get("REPLICA_CHECK_INTERVAL", 10))
+
+    # seconds a postgresql replica can be behind the primary before reads go to the primary instead
+    @property
+    def REPLICA_MAX_LAG(self):
+        return float(os.environ.get("REPLICA_MAX_LAG", 5))
+
+    # seconds after a write during which the same user reads from the primary, so they see their own writes (0 turns this off)
+    @property
+    def REPLICA_STICKY_SECONDS(self):
+        return float(os.environ.get("REPLICA_STICKY_SECONDS", 5))
+
+    # engine options for a database uri
+    def engine_options(self, uri):
+        url = make_url(uri)
+
+        # test connections before use, so connections closed by the database or a proxy are replaced instead of failing a request
+        options = {"pool_pre_ping": self.DB_POOL_PRE_PING}
+
+        # in-memory sqlite databases use a single static connection, so there is no pool to size
+        if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+            return options
+
+        options.update({
+            "poolclass": InstrumentedQueuePool,
+            "pool_size": self.DB_POOL_SIZE,
+            "max_overflow": self.DB_MAX_OVERFLOW,
+            "pool_timeout": self.DB_POOL_TIMEOUT,
+            "pool_recycle": self.DB_POOL_RECYCLE,
+        })
+
+        # postgresql cancels any statement running longer than the timeout
+        if url.get_backend_name() == "postgresql" and self.DB_STATEMENT_TIMEOUT > 0:
+            options["connect_args"] = {"options": f"-c statement_timeout={self.DB_STATEMENT_TIMEOUT}"}
+
+        return options
+
+    # number of connections each worker process keeps open in its pool
+    # size pools so (gunicorn workers x (pool size + max overflow)) stays below the database's max_connections
+    @property
+    def DB_POOL_SIZE(self):
+        return int(os.environ.get("DB_POOL_SIZE", 5))
+
+    # number of extra connections a worker process can open when its pool is in use (closed again when returned)
+    @property
+    def DB_MAX_OVERFLOW(self):
+        return int(os.environ.get("DB_MAX_OVERFLOW", 10))
+
+    # seconds a request waits for a free connection before failing
+    @property
+    def DB_POOL_TIMEOUT(self):
+        return float(os.environ.get("DB_POOL_TIMEOUT", 30))
+
+    # seconds after which a pooled connection is replaced (-1 keeps connections open), less than any idle timeout of the database or a proxy
+    @property
+    def DB_POOL_RECYCLE(self):
+        return int(os.environ.get("DB_POOL_RECYCLE", 1800))
+
+    # whether connections are tested with a ping before they are handed out
+    @property
+    def DB_POOL_PRE_PING(self):
+        return os.environ.get("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+    # milliseconds a single statement can run before postgresql cancels it (0 for no limit)
+    @property
+    def DB_STATEMENT_TIMEOUT(self):
+        return int(os.environ.get("DB_STATEMENT_TIMEOUT", 30000))
+
+    # connection checkouts that wait at least this many seconds are logged as a warning (0 turns the warning off)
+    @property
+    def DB_POOL_WAIT_WARNING(self):
+        return float(os.environ.get("DB_POOL_WAIT_WARNING", 0.1))
+
     # jwt secret key - required to verify tokens
     @property
     def JWT_SECRET_KEY(self):
@@ -21,9 +110,82 @@ class BaseConfig(object):
         secret = os.environ.get("JWT_SECRET_KEY")
         return secret
 
+    # response cache backend - "memory" (per worker, default), "redis" (shared) or "none"
+    @property
+    def CACHE_BACKEND(self):
+        return os.environ.get("CACHE_BACKEND", "memory")
+
+    # number of seconds a cached response is kept
+    @property
+    def CACHE_TTL(self):
+        return int(os.environ.get("CACHE_TTL", 60))
+
+    # maximum number of responses kept by the "memory" cache backend
+    @property
+    def CACHE_MAX_ENTRIES(self):
+        return int(os.environ.get("CACHE_MAX_ENTRIES", 1024))
+
+    # redis url used by the "redis" cache backend
+    @property
+    def CACHE_REDIS_URL(self):
+        return os.environ.get("CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+
+    # authors with at most this many followers have their new posts written to their followers' timelines (fan-out on write)
+    # posts by authors with more followers are read from the followers table when the feed is requested (fan-out on read)
+    # 0 turns fan-out on write off, so every feed is read from the followers table
+    @property
+    def FEED_FANOUT_THRESHOLD(self):
+        return int(os.environ.get("FEED_FANOUT_THRESHOLD", 0))
+
+
+    # bcrypt work factor for new password hashes - stored hashes with a different cost are rehashed on login
+    @property
+    def BCRYPT_LOG_ROUNDS(self):
+        return int(os.environ.get("BCRYPT_LOG_ROUNDS", 12))
+
+    # number of threads hashing passwords per worker process (0 hashes on the request thread)
+    @property
+    def PASSWORD_HASH_WORKERS(self):
+        return int(os.environ.get("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+
+    # number of password hashes waiting for a hashing thread per worker process - more return 503 straight away
+    @property
+    def PASSWORD_HASH_QUEUE_SIZE(self):
+        return int(os.environ.get("PASSWORD_HASH_QUEUE_SIZE", 4 * self.PASSWORD_HASH_WORKERS))
+
+    # seconds a request waits for its password hash (queued and running) before returning 503
+    # a hash that has started keeps running on its thread after the timeout, only the request stops waiting
+    @property
+    def PASSWORD_HASH_TIMEOUT(self):
+        return float(os.environ.get("PASSWORD_HASH_TIMEOUT", 2))
+
+
+    # number of seconds the identity of a token's user is cached (0 loads it from the database on every request)
+    @property
+    def JWT_IDENTITY_CACHE_TTL(self):
+        return int(os.environ.get("JWT_IDENTITY_CACHE_TTL", 30))
+
+    # maximum number of identities kept in the identity cache
+    @property
+    def JWT_IDENTITY_CACHE_SIZE(self):
+        return int(os.environ.get("JWT_IDENTITY_CACHE_SIZE", 10000))
+
+
+    # what happens when a request runs more SQL statements than its endpoint's budget (see utils/query_budget.py)
+    # "off" doesn't count statements, "log" logs a warning and "raise" fails the request
+    @property
+    def QUERY_BUDGET_MODE(self):
+        return os.environ.get("QUERY_BUDGET_MODE", "off")
+
 
 class DevelopmentConfig(BaseConfig):
     DEBUG=True
+
+    # log endpoints that go over their query budget
+    @property
+    def QUERY_BUDGET_MODE(self):
+        return os.environ.get("QUERY_BUDGET_MODE", "log")
     
 
 class ProductionConfig(BaseConfig):
@@ -33,6 +195,11 @@ class ProductionConfig(BaseConfig):
 class TestConfig(BaseConfig):
     TESTING=True
 
+    # fail requests that go over their query budget
+    @property
+    def QUERY_BUDGET_MODE(self):
+        return os.environ.get("QUERY_BUDGET_MODE", "raise")
+
 
 # get "FLASK_ENV" variable from .flaskenv file
 env = os.environ.get("FLASK_ENV")
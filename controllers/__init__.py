@@ -5,6 +5,9 @@ from controllers.auth_controllers import auth
 from controllers.likes_controllers import likes
 from controllers.followers_controllers import  followers
 from controllers.categories_controllers import category
+from controllers.cache_controllers import cache_stats
+from controllers.feed_controllers import feed
+from controllers.metrics_controllers import metrics
 
 
 registered_controllers = (
@@ -14,5 +17,8 @@ registered_controllers = (
     auth,
     likes,
     followers,
-    category
+    category,
+    cache_stats,
+    feed,
+    metrics
 )
\ No newline at end of file
@@ -1,6 +1,6 @@
-# import Regex, SQLAlchemy, BCrypt and datetime library
+# import Regex, SQLAlchemy, the password hasher and datetime library
 import re
-from main import db, bcrypt
+from main import db, passwords
 from datetime import timedelta
 
 # flask related imports for requests, responses and authentication
@@ -10,6 +10,7 @@ from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identi
 # import exception handling
 from marshmallow.exceptions import ValidationError
 from werkzeug.exceptions import BadRequest
+from utils.passwords import PasswordHasherBusy
 
 # import models
 from models.users import User
@@ -39,6 +40,12 @@ def key_error(e):
     return jsonify({"error": f"The {e} field is required"}), 400
 
 
+# password hasher busy handler - occurs when every password hashing thread stays busy (e.g. during a burst of logins)
+@auth.errorhandler(PasswordHasherBusy)
+def password_hasher_busy(e):
+    return jsonify({"error": "The server is busy, please try again"}), 503, {"Retry-After": "1"}
+
+
 # POST "/auth/register"
 # register a new user and return their json web token
 @auth.route("/register", methods=["POST"])
@@ -54,8 +61,8 @@ def register_user():
     elif "password" not in user_fields:
         return jsonify({"error": "The 'password' field is required"}), 400
 
-    # find the user by email address
-    stmt = db.select(User).filter_by(email=request.json["email"])
+    # find the user by email address - including deleted accounts, which keep their email until they are purged
+    stmt = db.select(User).filter_by(email=request.json["email"]).execution_options(include_deleted=True)
     user = db.session.scalar(stmt)
 
     # check if the user with the given email already exists
@@ -81,10 +88,8 @@ def register_user():
             403
         )
     
-    # hash the password using bcrypt
-    user.password = bcrypt.generate_password_hash(user_fields["password"]).decode(
-        "utf-8"
-    )
+    # hash the password using bcrypt (on the password hashing threads)
+    user.password = passwords.hash(user_fields["password"])
 
     # set the name of the user
     user.name = user_fields["name"]
@@ -123,9 +128,14 @@ def login_user():
     user = db.session.scalar(stmt)
 
     # check if a user with the provided email exists or if the password is incorrect
-    if not user or not bcrypt.check_password_hash(user.password, user_fields["password"]):
+    if not user or not passwords.check(user.password, user_fields["password"]):
         return jsonify({"error": "Invalid username and/or password"}), 401
 
+    # rehash the password if it was hashed with a different work factor than the configured one
+    if passwords.needs_rehash(user.password):
+        user.password = passwords.hash(user_fields["password"])
+        db.session.commit()
+
     # set the expiration time for the access token (1 day)
     expiry = timedelta(days=1)
 
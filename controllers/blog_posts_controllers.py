@@ -1,5 +1,7 @@
-# import SQLAlchemy and datetime library
-from main import db
+# import SQLAlchemy, the response cache and datetime library
+from main import db, cache, replicas
+from sqlalchemy import func
+from sqlalchemy.orm import aliased
 from datetime import date, timedelta, datetime
 
 # flask related imports for requests, responses and authentication
@@ -12,18 +14,38 @@ from werkzeug.exceptions import BadRequest
 
 # import models
 from models.blog_posts import BlogPost
+from models.comments import Comment
 from models.likes import Like
 from models.followers import Follower
 from models.users import User
-from models.categories import Category
+from models.categories import Category, post_categories
+
+# the users who commented on a post, alongside its author
+Commenter = aliased(User)
 
 # import schemas
 from schemas.blog_posts import blogpost_schema, blogposts_schema, BlogPostSchema
 from schemas.categories import category_schema
+from schemas.registry import get_schema
+
+# import pagination, category and search helpers
+from utils.pagination import paginate, get_limit, get_offset, encode_cursor
+from utils.categories import get_or_create_categories, get_or_create_category_ids, category_name_filter, normalize_category_name
+from utils.search import search_post_ids, index_post, index_posts, remove_post
+from utils.streaming import get_stream_format, stream_rows
+from utils.feed import fan_out_posts
+from utils.cache import POST_KEY, USER_KEY
+from utils.conditional import conditional
+from utils.fields import get_fields, load_options
+from utils.identity import current_user_id
+from utils.soft_delete import soft_delete
 
 
 blog_posts = Blueprint("blogposts", __name__, url_prefix="/posts")
 
+# read the blueprint's GET requests from the read replicas
+replicas.route_reads(blog_posts)
+
 
 # validation error handler - catches validation errors and outputs the error
 @blog_posts.errorhandler(ValidationError)
@@ -43,86 +65,164 @@ def key_error(e):
     return jsonify({'error': f'The {e} field is required'}), 400
 
 
+# fields shown by the detailed post views, and allowed in their '?fields=' parameter
+# authors, comments (with their authors) and categories are eager loaded with one query each,
+# so the number of queries stays the same no matter how many posts or comments there are
+post_detail_fields = (
+    "post_content",
+    "like_count",
+    "post_title",
+    "author_info.follower_count",
+    "author_info.name",
+    "author_info.user_id",
+    "categories",
+    "comments.author_info.name",
+    "comments.author_info.user_id",
+    "comments.comment_id",
+    "comments.comment_text",
+    "comments.like_count"
+)
+
+# fields shown by the cached single post view - the author's follower_count changes with every follow, so it is left
+# to the author's own resource ("/users/<user_id>") instead of invalidating every cached post of the author
+post_view_fields = tuple(field for field in post_detail_fields if field != "author_info.follower_count")
+
+
 # GET "/posts"
-# view complete list of blog posts
+# view a page of blog posts, newest first
 @blog_posts.route("/", methods=["GET"])
 def get_posts():
-    # query all blog posts from the database
-    stmt = db.select(BlogPost)
-    posts = db.session.scalars(stmt)
+    # get the requested fields (all detailed fields by default)
+    fields = get_fields(("post_id",) + post_detail_fields)
+
+    # query blog posts, loading only the columns and related information needed for the fields
+    stmt = db.select(BlogPost).options(*load_options(BlogPost, fields, BlogPost.posted_date))
+    sort_columns = (BlogPost.posted_date, BlogPost.post_id)
+
+    # stream every post (as a json array or ndjson) if requested, instead of returning one page
+    stream_format = get_stream_format()
+    if stream_format:
+        return stream_rows(stmt, sort_columns, get_schema(BlogPostSchema, only=fields), stream_format, descending=True)
+
+    posts, next_cursor = paginate(stmt, sort_columns, descending=True)
 
-    # define an empty list to append serialized posts
-    serialized_posts = []
-    
     # define a schema to filter and serialize the post data
-    filtered_schema = BlogPostSchema(
-        only=(
-            "post_content",
-            "like_count",
-            "post_title",
-            "post_id",
-            "author_info.follower_count",
-            "author_info.name",
-            "author_info.user_id",
-            "categories",
-            "comments.author_info.name",
-            "comments.author_info.user_id",
-            "comments.comment_id",
-            "comments.comment_text",
-            "comments.like_count"
-        )
-    )
+    # like and follower counts are read from the stored counter columns
+    filtered_schema = get_schema(BlogPostSchema, many=True, only=fields)
 
-    for post in posts:
-        # calculate and set the like count for each post
-        like_count = db.session.query(Like).filter_by(post_id=post.post_id).count()
-        post.like_count = like_count
-        
-        # calculate and set the follower count for each post's author
-        follower_count = db.session.query(Follower).filter_by(followed_id=post.author_id).count()
-        post.author_info.follower_count = follower_count
-
-        for comment in post.comments:
-            # calculate and set the like count for each comment
-            like_count = db.session.query(Like).filter_by(comment_id=comment.comment_id).count()
-            comment.like_count = like_count
-            
-            # get and set the author's name for each comment
-            author_name = db.session.query(User).filter_by(user_id=comment.author_id).first()
-            comment.author_name = author_name.name
-        
-        # serialize the post data using the filtered schema and append to the list
-        serialized_post = filtered_schema.dump(post)
-        serialized_posts.append(serialized_post)
-    
-    # return the serialized posts as JSON
-    return jsonify(serialized_posts), 200
+    # serialize the posts and return them as JSON with the cursor for the next page
+    return jsonify({"posts": filtered_schema.dump(posts), "next_cursor": next_cursor}), 200
 
 
 # GET "/posts/compact"
-# view a compact list of posts (titles and ID)
+# view a compact page of posts (titles and ID), newest first
 @blog_posts.route("/compact", methods=["GET"])
 def get_posts_list():
-    # query all blog posts from the database
-    stmt = db.select(BlogPost)
-    posts = db.session.scalars(stmt)
+    # get the requested fields (all compact fields by default)
+    fields = get_fields(("post_title", "author_info.user_id", "author_info.name", "post_id"))
+
+    # query a page of blog posts, loading only the columns and authors needed for the fields
+    stmt = db.select(BlogPost).options(*load_options(BlogPost, fields, BlogPost.posted_date))
+    posts, next_cursor = paginate(stmt, (BlogPost.posted_date, BlogPost.post_id), descending=True)
     
     # define a schema to filter and serialize the post data (compact view)
-    filtered_schema = BlogPostSchema(
+    filtered_schema = get_schema(BlogPostSchema,
         many=True,  # indicating that we are serializing multiple posts
-        only=("post_title", "author_info.user_id", "author_info.name", "post_id")
+        only=fields
     )
     
-    # serialize the post data using the filtered schema and return as JSON
-    return jsonify(filtered_schema.dump(posts)), 200
+    # serialize the post data using the filtered schema and return as JSON with the cursor for the next page
+    return jsonify({"posts": filtered_schema.dump(posts), "next_cursor": next_cursor}), 200
+
+
+# GET "/posts/search?q=<query>"
+# search blog posts by title and content, most relevant first
+@blog_posts.route("/search", methods=["GET"])
+def search_posts():
+    # check that a search query was provided
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({'error': 'The \'q\' parameter is required'}), 400
+
+    # query one extra post id from the search index to check if there is another page
+    limit = get_limit()
+    offset = get_offset()
+    post_ids = search_post_ids(query, limit + 1, offset)
+
+    # if an extra post id was returned, the next page starts after this one
+    next_cursor = None
+    if len(post_ids) > limit:
+        post_ids = post_ids[:limit]
+        next_cursor = encode_cursor([offset + limit])
+
+    # get the requested fields (all search result fields by default)
+    fields = get_fields(("post_id", "post_title", "post_content", "like_count", "author_info.name",
+                         "author_info.user_id", "categories"))
+
+    # load the matching posts and the related information needed for the fields, keeping the search ranking order
+    stmt = db.select(BlogPost).where(BlogPost.post_id.in_(post_ids)).options(*load_options(BlogPost, fields))
+    posts = {post.post_id: post for post in db.session.scalars(stmt)}
+    posts = [posts[post_id] for post_id in post_ids if post_id in posts]
+
+    # define a schema to filter and serialize the post data (search results)
+    filtered_schema = get_schema(BlogPostSchema, many=True, only=fields)
+
+    # return the serialized posts as JSON with the cursor for the next page
+    return jsonify({"posts": filtered_schema.dump(posts), "next_cursor": next_cursor}), 200
+
+
+# validators for conditional GET "/posts/<post_id>" - one query for the columns that change when the post view changes
+def post_validators(post_id):
+    # summaries of the post's comments and categories, as correlated subqueries
+    def comment_summary(expression):
+        return db.select(expression).where(Comment.post_id == BlogPost.post_id).scalar_subquery()
+
+    # the newest update to the details (and so the names) of the post's commenters
+    commenters_updated = (
+        db.select(func.max(Commenter.updated_date))
+        .join(Comment, Comment.author_id == Commenter.user_id)
+        .where(Comment.post_id == BlogPost.post_id)
+        .scalar_subquery()
+    )
+
+    def category_summary(expression):
+        return db.select(expression).where(post_categories.c.post_id == BlogPost.post_id).scalar_subquery()
+
+    stmt = (
+        db.select(
+            BlogPost.updated_date,
+            comment_summary(func.max(func.coalesce(Comment.updated_date, Comment.comment_date))),
+            BlogPost.like_count,
+            User.name,
+            commenters_updated,
+            comment_summary(func.count()),
+            comment_summary(func.sum(Comment.like_count)),
+            category_summary(func.count()),
+            category_summary(func.sum(post_categories.c.category_id))
+        )
+        .join(User, BlogPost.author_id == User.user_id)
+        .where(BlogPost.post_id == post_id)
+    )
+    row = db.session.execute(stmt).first()
+
+    # the post doesn't exist - the view returns a 404 error
+    if row is None:
+        return (None,)
+
+    return tuple(row)
 
 
 # GET "/posts/<post_id>"
 # view a single blog post by 'post_id'
 @blog_posts.route("/<int:post_id>", methods=["GET"])
+@conditional(post_validators)
+@cache.cached(POST_KEY, post_view_fields)
 def view_post(post_id: int):
-    # query the blog post with the given post_id from the database
-    stmt = db.select(BlogPost).filter_by(post_id=post_id)
+    # get the requested fields (all detailed fields except the author's follower_count by default)
+    fields = get_fields(post_view_fields)
+
+    # query the blog post with the given post_id, loading only the columns and related information needed for the fields
+    stmt = db.select(BlogPost).filter_by(post_id=post_id).options(*load_options(BlogPost, fields))
     post = db.session.scalar(stmt)
 
     # if the post doesn't exist return a 404 error
@@ -133,27 +233,8 @@ def view_post(post_id: int):
     serialized_posts = []
     
     # define a schema to filter and serialize the post data (detailed view)
-    filtered_schema = BlogPostSchema(
-        only=("post_content", "like_count", "post_title", "author_info.follower_count",
-              "author_info.name", "author_info.user_id", "categories",
-              "comments.author_info.name", "comments.author_info.user_id",
-              "comments.comment_id", "comments.comment_text", "comments.like_count")
-    )
-    
-    # calculate the like count for the post
-    like_count = db.session.query(Like).filter_by(post_id=post.post_id).count()
-    post.like_count = like_count
-    
-    # calculate the follower count for the post's author
-    follower_count = db.session.query(Follower).filter_by(followed_id=post.author_id).count()
-    post.author_info.follower_count = follower_count
-    
-    # iterate through comments to calculate like counts and author names
-    for comment in post.comments:
-        like_count = db.session.query(Like).filter_by(comment_id=comment.comment_id).count()
-        comment.like_count = like_count
-        author_name = db.session.query(User).filter_by(user_id=comment.author_id).first()
-        comment.author_name = author_name.name
+    # like counts are read from the stored counter columns
+    filtered_schema = get_schema(BlogPostSchema, only=fields)
     
     # serialize the post data using the filtered schema and append it to the list
     serialized_post = filtered_schema.dump(post)
@@ -164,133 +245,199 @@ def view_post(post_id: int):
 
 
 # GET "/posts/category/<category_name>"
-# view posts by category name
+# view a page of posts by category name, newest first
 @blog_posts.route("/category/<category_name>", methods=["GET"])
 def view_category(category_name):
-    # query all blog posts from the database
-    stmt = db.select(BlogPost)
-    posts = db.session.scalars(stmt)
-    
-    # initialize a list to store posts that belong to the specified category
-    category_posts = []
-    
-    # loop through all blog posts and their associated categories
-    for post in posts:
-        for category in post.categories:
-            # check if the lowercase category name matches the requested category name
-            if category_name.lower() in category.category_name.lower():
-                # if it matches, add the post to the category_posts list and break the loop
-                category_posts.append(post)
-                break
+    # match categories by exact name or by name prefix (default)
+    match = request.args.get("match", "prefix")
+    if match not in ("exact", "prefix"):
+        return jsonify({'error': 'The \'match\' parameter must be \'exact\' or \'prefix\''}), 400
+
+    # get the requested fields (all detailed fields by default)
+    fields = get_fields(post_detail_fields)
+
+    # find the matching categories using the normalized name index
+    category_ids = db.select(Category.category_id).where(category_name_filter(category_name, match))
+
+    # query a page of blog posts linked to those categories, loading only what is needed for the fields
+    post_ids = db.select(post_categories.c.post_id).where(post_categories.c.category_id.in_(category_ids))
+    stmt = db.select(BlogPost).where(BlogPost.post_id.in_(post_ids)).options(*load_options(BlogPost, fields, BlogPost.posted_date))
+    posts, next_cursor = paginate(stmt, (BlogPost.posted_date, BlogPost.post_id), descending=True)
         
     # define a schema to filter and serialize the post data (detailed view)
-    filtered_schema = BlogPostSchema(
-        only=("post_content", "like_count", "post_title", "author_info.follower_count",
-              "author_info.name", "author_info.user_id", "categories",
-              "comments.author_info.name", "comments.author_info.user_id",
-              "comments.comment_id", "comments.comment_text", "comments.like_count")
-    )
-    
-    # initialize a list to store serialized post data
-    serialized_posts = []
-    
-    # iterate through posts in the specified category
-    for post in category_posts:
-        # calculate the like count for the post
-        like_count = db.session.query(Like).filter_by(post_id=post.post_id).count()
-        post.like_count = like_count
-        
-        # calculate the follower count for the post's author
-        follower_count = db.session.query(Follower).filter_by(followed_id=post.author_id).count()
-        post.author_info.follower_count = follower_count
-        
-        # iterate through comments to calculate like counts and author info
-        for comment in post.comments:
-            like_count = db.session.query(Like).filter_by(comment_id=comment.comment_id).count()
-            comment.like_count = like_count
-            author_info = db.session.query(User).filter_by(user_id=comment.author_id).first()
-            comment.author_info = author_info
-        
-        # serialize the post data using the filtered schema and append it to the list
-        serialized_post = filtered_schema.dump(post)
-        serialized_posts.append(serialized_post)
+    # like and follower counts are read from the stored counter columns
+    filtered_schema = get_schema(BlogPostSchema, many=True, only=fields)
     
-    # return the serialized post data as JSON
-    return jsonify(serialized_posts), 200
+    # return the serialized post data as JSON with the cursor for the next page
+    return jsonify({"posts": filtered_schema.dump(posts), "next_cursor": next_cursor}), 200
 
 
-# POST "/posts"
-# create a new blog post - requires authentication
-@blog_posts.route("/", methods=["POST"])
-@jwt_required()
-def create_post():
-    # get the user's identity (user_id) from the JWT token
-    id = get_jwt_identity()
-    q = db.select(User).filter_by(user_id=id)
-    user = db.session.scalar(q)
-    
-    # load the JSON data from the request into the post_json variable
-    post_json = (request.json)
-    
+# maximum number of posts created by one "/posts/batch" request
+MAX_BATCH_SIZE = 500
+
+# maximum lengths of a post's text fields
+MAX_FIELD_LENGTHS = {"post_title": 50, "post_content": 5000}
+
+
+# check a post's title or content (if given) is a non-empty string within its maximum length
+# returns a (message, status code) tuple if it isn't, otherwise None
+def text_field_error(post_json, field):
+    if field not in post_json:
+        return None
+
+    value = post_json[field]
+    if type(value) != str:
+        return (f'\'{field}\' must be a string', 403)
+    elif not value.strip():
+        return (f'\'{field}\' must not be empty', 403)
+    elif len(value) > MAX_FIELD_LENGTHS[field]:
+        return (f'\'{field}\' must be less than {MAX_FIELD_LENGTHS[field]} characters', 403)
+
+    return None
+
+
+# validate the JSON of a new post and return its loaded data, its category names and an error
+# the error is a (message, status code) tuple if the post is invalid, otherwise None
+def load_new_post(post_json, user_id):
+    if type(post_json) != dict:
+        return None, None, ('Each post must be a JSON object', 400)
+
+    # copy the post so the request data isn't changed
+    post_json = dict(post_json)
+
     # add author_id, posted_date, updated_date, and initial like_count to the post_json
-    post_json["author_id"] = id
+    post_json["author_id"] = user_id
     post_json["posted_date"] = datetime.now()
     post_json["updated_date"] = datetime.now()
     post_json["like_count"] = 0
- 
+
     # check if 'categories' field is in post_json and handle it
-    categories = []
-    if "categories" in post_json:
-        categories = post_json["categories"]
-        del post_json["categories"]
-
-    # check for the presence and length of 'post_title' and 'post_content' fields
-    if "post_title" not in post_json:
-        return jsonify({'error': 'The \'post_title\' field is required'}), 400
-    elif len(post_json["post_title"]) > 50:
-        return jsonify({'error': '\'post_title\' must be less than 50 characters'}), 403
-    if "post_content" not in post_json:
-        return jsonify({'error': 'The \'post_content\' field is required'}), 400
-    elif len(post_json["post_content"]) > 5000:
-        return jsonify({'error': '\'post_content\' must be less than 5000 characters'}), 403
-    
+    categories = post_json.pop("categories", None) or []
+
+    # check for the presence, type and length of 'post_title' and 'post_content' fields
+    for field in ("post_title", "post_content"):
+        if field not in post_json:
+            return None, None, (f'The \'{field}\' field is required', 400)
+        error = text_field_error(post_json, field)
+        if error:
+            return None, None, error
+
+    # check if categories provided is a string or a list of strings
+    if type(categories) == list:
+        for each in categories:
+            if type(each) != str:
+                return None, None, ('\'categories\' list must contain strings', 403)
+    elif type(categories) == str:
+        categories = [categories]
+    else:
+        return None, None, ('The \'categories\' field must be a string or list', 403)
+
+    # category names are compared normalized, so one of only spaces would be an empty category
+    if any(not normalize_category_name(name) for name in categories):
+        return None, None, ('\'categories\' must not contain empty names', 403)
+
     # load the post_json data into a BlogPostSchema
-    post_json = blogpost_schema.load(post_json)
-    
+    try:
+        post_json = blogpost_schema.load(post_json)
+    except ValidationError as e:
+        return None, None, (f"Validation Error - `{e}`", 403)
+
+    return post_json, categories, None
+
+
+# POST "/posts"
+# create a new blog post - requires authentication
+@blog_posts.route("/", methods=["POST"])
+@jwt_required()
+def create_post():
+    # get the user's identity (user_id) from the JWT token claims
+    id = current_user_id()
+
+    # validate the post (including its categories) before anything is written
+    post_json, categories, error = load_new_post(request.json, id)
+    if error:
+        return jsonify({'error': error[0]}), error[1]
+
     # create a BlogPost object with the loaded data
     post = BlogPost(**post_json)
-    
-    # add the new post to the database
+
+    # link the post to its categories, creating any categories that don't exist yet
+    if categories:
+        post.categories = get_or_create_categories(categories)
+
+    # add the new post to the database, the search index and the followers' timelines
     db.session.add(post)
-    
-    # commit the changes to the database
+    index_post(post)
+    post_id = post.post_id
+    fan_out_posts(id, [post_id])
+
+    # commit the post and its categories together
     db.session.commit()
-    
-    # handle categories if provided
-    if categories:
-        # check if categories provided is a list
-        if type(categories) == list:
-            for each in categories:
-                if type(each) == str:
-                    category = Category()
-                    category.category_name = each
-                    category.post_id = post.post_id
-                    db.session.add(category)
-                else:
-                    return jsonify({'error': '\'categories\' list must contain strings'}), 403
-        elif type(categories) == str:
-            category = Category()
-            category.category_name = categories
-            category.post_id = post.post_id
-            db.session.add(category)
-        else:
-            return jsonify({'error': 'The \'categories\' field must be a string or list'}), 403
-        
-    # commit any changes related to categories
+
+    # the author's cached profile lists their posts
+    cache.delete(USER_KEY.format(user_id=id))
+
+    # return a success message with the new post_id (read before the commit, which expires the post)
+    return jsonify({"message": "New blog post created successfully.", "post_id": post_id}), 200
+
+
+# POST "/posts/batch"
+# create many blog posts (with their categories) in one transaction - requires authentication
+# the number of queries is the same no matter how many posts are created
+@blog_posts.route("/batch", methods=["POST"])
+@jwt_required()
+def create_posts_batch():
+    # get the user's identity (user_id) from the JWT token claims
+    id = current_user_id()
+
+    # the request body must be a list of posts
+    posts_json = request.json
+    if type(posts_json) != list or not posts_json:
+        return jsonify({'error': 'The request body must be a list of posts'}), 400
+    if len(posts_json) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'A batch can contain at most {MAX_BATCH_SIZE} posts'}), 400
+
+    # validate every post up front, collecting the errors by position in the list
+    rows = []
+    post_category_names = []
+    errors = []
+    for index, post_json in enumerate(posts_json):
+        post, categories, error = load_new_post(post_json, id)
+        if error:
+            errors.append({"index": index, "error": error[0]})
+            continue
+        rows.append(post)
+        post_category_names.append(categories)
+
+    # nothing is created if any post is invalid
+    if errors:
+        return jsonify({"errors": errors}), 400
+
+    # look up (or create) every category used by the batch
+    category_ids = get_or_create_category_ids(name for names in post_category_names for name in names)
+
+    # insert the posts with one statement, returning their ids in the order they were given
+    stmt = db.insert(BlogPost).returning(BlogPost.post_id, sort_by_parameter_order=True)
+    post_ids = db.session.scalars(stmt, rows).all()
+
+    # link the posts to their categories with one statement
+    links = []
+    for post_id, names in zip(post_ids, post_category_names):
+        for category_id in dict.fromkeys(category_ids[normalize_category_name(name)] for name in names):
+            links.append({"post_id": post_id, "category_id": category_id})
+    if links:
+        db.session.execute(db.insert(post_categories), links)
+
+    # add the new posts to the search index and the followers' timelines, and commit everything together
+    index_posts(post_ids)
+    fan_out_posts(id, post_ids)
     db.session.commit()
-    
-    # return a success message with the new post_id
-    return jsonify({"message": "New blog post created successfully.", "post_id": post.post_id}), 200
+
+    # the author's cached profile lists their posts
+    cache.delete(USER_KEY.format(user_id=id))
+
+    # return a success message with the new post ids, in the order the posts were given
+    return jsonify({"message": f"{len(post_ids)} blog posts created successfully.", "post_ids": post_ids}), 200
 
 
 # PUT "/posts/<post_id>"
@@ -301,12 +448,8 @@ def update_post(post_id: int):
     # load the JSON data from the request into the post_fields variable
     post_fields = blogpost_schema.load(request.json)
 
-    # get the user's identity (user_id) from the JWT token
-    user_id = get_jwt_identity()
-
-    # query the User table to get the user's data
-    stmt = db.select(User).filter_by(user_id=user_id)
-    user = db.session.scalar(stmt)
+    # get the user's identity (user_id) from the JWT token claims
+    user_id = current_user_id()
 
     # query the BlogPost table to get the post that needs to be updated
     stmt = db.select(BlogPost).filter_by(post_id=post_id)
@@ -317,16 +460,16 @@ def update_post(post_id: int):
         return jsonify({'error': f'post with ID {post_id} does not exist'}), 400
     
     # check if the user attempting to update the post is the owner
-    if post.author_id != user.user_id:
+    if post.author_id != user_id:
         return jsonify({'error': f'you are not the owner of the post with ID {post_id}'}), 401
     
-    # check for the presence and length of 'post_title' and 'post_content'
+    # check for the presence, type and length of 'post_title' and 'post_content'
     if "post_title" not in post_fields and "post_content" not in post_fields:
         return jsonify({'error': 'The \'post_title\' and/or \'post_content\' field is required'}), 400
-    elif "post_title" in post_fields and len(post_fields["post_title"]) > 50:
-        return jsonify({'error': '\'post_title\' must be less than 50 characters'}), 403
-    elif "post_content" in post_fields and len(post_fields["post_content"]) > 5000:
-        return jsonify({'error': '\'post_content\' must be less than 5000 characters'}), 403
+    for field in ("post_title", "post_content"):
+        error = text_field_error(post_fields, field)
+        if error:
+            return jsonify({'error': error[0]}), error[1]
     
     # update the post's title and content if provided in the request
     if "post_title" in post_fields:
@@ -337,9 +480,15 @@ def update_post(post_id: int):
     # update the post's updated_date with the current timestamp
     post.updated_date = datetime.now()
 
+    # refresh the post in the search index
+    index_post(post)
+
     # commit the changes to the database
     db.session.commit()
 
+    # remove the cached post and the author's cached profile (which lists the post's title)
+    cache.delete(POST_KEY.format(post_id=post_id), USER_KEY.format(user_id=user_id))
+
     # return a success message with the updated post_id
     return jsonify({"message": "post updated successfully", "post_id": post.post_id}), 200
 
@@ -349,12 +498,8 @@ def update_post(post_id: int):
 @blog_posts.route("/<int:post_id>", methods=["DELETE"])
 @jwt_required()
 def delete_post(post_id: int):
-    # get the user's identity (user_id) from the JWT token
-    user_id = get_jwt_identity()
-
-    # query the User table to get the user's data
-    stmt = db.select(User).filter_by(user_id=user_id)
-    user = db.session.scalar(stmt)
+    # get the user's identity (user_id) from the JWT token claims
+    user_id = current_user_id()
 
     # query the BlogPost table to get the post that needs to be deleted
     stmt = db.select(BlogPost).filter_by(post_id=post_id)
@@ -365,14 +510,19 @@ def delete_post(post_id: int):
         return jsonify({'error': f'post with ID {post_id} does not exist'}), 400
     
     # check if the user attempting to delete the post is the owner
-    if post.author_id != user.user_id:
+    if post.author_id != user_id:
         return jsonify({'error': f'you are not the owner of the post with ID {post_id}'}), 401
 
-    # delete the post from the database
-    db.session.delete(post)
+    # mark the post as deleted (one UPDATE, which hides it and its comments from every query) and remove it from the
+    # search index - "flask db purge" deletes the row, its comments, likes, category links and timeline entries later
+    soft_delete(post)
+    remove_post(post_id)
     
     # commit the changes to the database
     db.session.commit()
 
+    # remove the cached post and the author's cached profile (which lists the post)
+    cache.delete(POST_KEY.format(post_id=post_id), USER_KEY.format(user_id=user_id))
+
     # return a success message with the deleted post_id
-    return jsonify({"message": "post deleted successfully.", "post_id": post.post_id}), 200
\ No newline at end of file
+    return jsonify({"message": "post deleted successfully.", "post_id": post_id}), 200
\ No newline at end of file
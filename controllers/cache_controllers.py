@@ -0,0 +1,15 @@
+# import the response cache
+from main import cache
+
+# flask related imports for responses
+from flask import Blueprint, jsonify
+
+
+cache_stats = Blueprint("cache", __name__, url_prefix="/cache")
+
+
+# GET "/cache/stats"
+# view the response cache hit and miss counters for this worker
+@cache_stats.route("/stats", methods=["GET"])
+def get_cache_stats():
+    return jsonify(cache.stats()), 200
@@ -1,5 +1,5 @@
-# import SQLAlchemy
-from main import db
+# import SQLAlchemy and the response cache
+from main import db, cache
 
 # flask related imports for requests, responses and authentication
 from flask import Blueprint, jsonify, request
@@ -18,6 +18,11 @@ from models.blog_posts import BlogPost
 from schemas.categories import category_schema, categories_schema
 from schemas.blog_posts import blogpost_schema
 
+# import category helpers
+from utils.categories import get_or_create_categories, normalize_category_name
+from utils.cache import POST_KEY
+from utils.identity import current_user_id
+
 
 category = Blueprint("category", __name__, url_prefix="/category")
 
@@ -45,40 +50,42 @@ def key_error(e):
 @category.route("/<int:post_id>", methods=["POST"])
 @jwt_required()
 def new_category(post_id : int):
-    # get the user's identity (user_id) from the JWT token
-    id = get_jwt_identity()
-
-    # query the Category table to get existing categories for the post
-    stmt = db.select(Category).filter_by(post_id=post_id)
-    categories = db.session.scalars(stmt)
-    response = categories_schema.dump(categories)
+    # get the user's identity (user_id) from the JWT token claims
+    id = current_user_id()
 
     # query the BlogPost table to get the post by its ID
-    post = db.session.query(BlogPost).get(post_id)
+    post = db.session.get(BlogPost, post_id)
 
     # check if the post with the given ID exists
     if not post:
         return(jsonify({"error": f"post not found with ID {post_id}"})), 400
 
     # check if the user attempting to add a category is the owner of the post
-    if str(post.author_info.user_id) != str(id):
+    if post.author_id != id:
         return(jsonify({"error": "you are not the owner of this blog post"})), 401
 
+    # check that the category is a string
+    if type(request.json["category"]) != str:
+        return(jsonify({"error": "The 'category' field must be a string"})), 403
+
+    # check that the category has a name once normalized (not only spaces)
+    if not normalize_category_name(request.json["category"]):
+        return(jsonify({"error": "The 'category' field must not be empty"})), 403
+
+    # get the category by its normalized name, creating it if it doesn't exist yet
+    category = get_or_create_categories([request.json["category"]])[0]
+
     # check if the requested category already exists for this post
-    for category in response:
-        if category["category_name"] == request.json["category"]:
-            return(jsonify({"error": "category already exists."})), 400
-    
-    # create a new category JSON object
-    category_json = {}
-    category_json["category_name"] = request.json["category"]
-    category_json["post_id"] = post_id
-    category = Category(**category_json)
-
-    # add the new category to the database
-    db.session.add(category)
+    if category in post.categories:
+        return(jsonify({"error": "category already exists."})), 400
+
+    # link the category to the post
+    post.categories.append(category)
     db.session.commit()
 
+    # remove the cached post, which lists its categories
+    cache.delete(POST_KEY.format(post_id=post_id))
+
     # return a success message with the post_id
     return jsonify({"message": "New category added successfully.", "post_id": post_id}), 200
 
@@ -88,34 +95,36 @@ def new_category(post_id : int):
 @category.route("/<int:post_id>", methods=["DELETE"])
 @jwt_required()
 def delete_category(post_id : int):
-    # get the user's identity (user_id) from the JWT token
-    id = get_jwt_identity()
+    # get the user's identity (user_id) from the JWT token claims
+    id = current_user_id()
 
     # query the BlogPost table to get the post by its ID
-    post = db.session.query(BlogPost).get(post_id)
+    post = db.session.get(BlogPost, post_id)
 
     # check if the post with the given ID exists
     if not post:
         return(jsonify({"error": f"post not found with ID {post_id}"})), 400
 
     # check if the user attempting to delete a category is the owner of the post
-    if str(post.author_info.user_id) != str(id):
+    if post.author_id != id:
         return(jsonify({"error": "you are not the owner of this blog post"})), 401
 
-    # query the Category table to check if the specified category exists for this post
-    stmt = db.select(Category).filter_by(post_id=post_id, category_name=request.json["category"])
-    category = db.session.scalar(stmt)
-    response = category_schema.dump(category)
+    # check that the category is a string
+    if type(request.json["category"]) != str:
+        return(jsonify({"error": "The 'category' field must be a string"})), 403
 
-    if response:
-        # if the category exists, delete it from the database
-        db.session.delete(category)
+    # find the category on this post by its normalized name
+    name = normalize_category_name(request.json["category"])
+    category = next((each for each in post.categories if each.name_normalized == name), None)
+
+    if category:
+        # if the category exists, unlink it from the post (the category itself is kept for other posts)
+        post.categories.remove(category)
         db.session.commit()
+
+        # remove the cached post, which lists its categories
+        cache.delete(POST_KEY.format(post_id=post_id))
         return jsonify({"message":"category deleted successfully", "post_id": post_id}), 200
     else:
         # if the category does not exist, return an error
         return jsonify({"error": "category does not exist"}), 400
-    
-    
-    
-    
@@ -1,5 +1,7 @@
-# import SQLAlchemy and datetime library
-from main import db
+# import SQLAlchemy, the response cache and datetime library
+from main import db, cache, replicas
+from sqlalchemy import func
+from sqlalchemy.orm import selectinload
 from datetime import date, timedelta, datetime
 
 # flask related imports for requests, responses and authentication
@@ -18,11 +20,22 @@ from models.blog_posts import BlogPost
 
 # import schemas 
 from schemas.comments import comment_schema, comments_schema, CommentSchema
+from schemas.registry import get_schema
+
+# import pagination and cache keys
+from utils.pagination import paginate
+from utils.cache import POST_KEY
+from utils.conditional import conditional
+from utils.identity import current_user_id
+from utils.soft_delete import soft_delete
 
 
 
 comments = Blueprint("comments", __name__, url_prefix="/comments")
 
+# read the blueprint's GET requests from the read replicas
+replicas.route_reads(comments)
+
 
 # validation error handler - catches validation errors and outputs the error
 @comments.errorhandler(ValidationError)
@@ -42,28 +55,32 @@ def key_error(e):
     return jsonify({'error': f'the {e} field is required'}), 400
 
 
+# validators for conditional GET "/comments/<post_id>" - one query for the columns that change when the comments change
+def comments_validators(post_id):
+    stmt = db.select(
+        func.max(func.coalesce(Comment.updated_date, Comment.comment_date)),
+        func.count(),
+        func.sum(Comment.like_count),
+        func.max(User.updated_date)
+    ).join(User, Comment.author_id == User.user_id).where(Comment.post_id == post_id)
+    return tuple(db.session.execute(stmt).first())
+
+
 # GET "/comments/<post_id>"
-# view all comments on a blog post (by post_id)
+# view comments on a blog post (by post_id), one page at a time
 @comments.route("/<int:post_id>", methods=["GET"])
+@conditional(comments_validators)
 def get_post_comments(post_id: int):
-    # query the Comment table to get all comments related to a specific post ID
-    stmt = db.select(Comment).filter_by(post_id=post_id)
-    comments = db.session.scalars(stmt)
+    # query the Comment table to get a page of comments related to a specific post ID
+    stmt = db.select(Comment).filter_by(post_id=post_id).options(selectinload(Comment.author_info))
+    comments, next_cursor = paginate(stmt, (Comment.comment_date, Comment.comment_id))
     
     # define the schema for comment serialization, specifying which fields to include
-    filtered_schema = CommentSchema(many=True, only=("comment_id", "comment_text", "comment_date", "like_count", "author_info.name", "author_info.user_id", "updated_date"))
-    
-    # serialize the comments using the specified schema
-    response = filtered_schema.dump(comments)
-    
-    # calculate and update the like_count for each comment
-    for comment in response:
-        # query the Like table to count the number of likes for this comment
-        q = db.select(Like).filter_by(post_id=post_id)
-        comment["like_count"] = db.session.query(Like).filter_by(comment_id=comment["comment_id"]).count()
+    # like_count is read from the stored counter column
+    filtered_schema = get_schema(CommentSchema, many=True, only=("comment_id", "comment_text", "comment_date", "like_count", "author_info.name", "author_info.user_id", "updated_date"))
         
     # return the serialized comments
-    return jsonify({"comments": filtered_schema.dump(response)}), 200
+    return jsonify({"comments": filtered_schema.dump(comments), "next_cursor": next_cursor}), 200
 
 
 # POST "/comments/<post_id>"
@@ -71,12 +88,8 @@ def get_post_comments(post_id: int):
 @comments.route("/<int:post_id>", methods=["POST"])
 @jwt_required()
 def like_post(post_id: int):
-    # get the user's identity from the JWT token
-    id = get_jwt_identity()
-
-    # query the User table to get user information based on the user's ID
-    stmt = db.select(User).filter_by(user_id=id)
-    user = db.session.scalar(stmt)
+    # get the user's identity from the JWT token claims
+    id = current_user_id()
 
     # load and validate the comment data from the request JSON
     comment_json = comment_schema.load(request.json)
@@ -89,14 +102,14 @@ def like_post(post_id: int):
         return jsonify({'error': '\'comment_text\' must be less than 500 characters'}), 403
     
     # query the BlogPost table to get the post related to the specified post_id
-    post = db.session.query(BlogPost).get(post_id)
+    post = db.session.get(BlogPost, post_id)
 
     # if the post doesn't exist, return an error message
     if not post:
         return(jsonify({"message": f"post not found with ID {post_id}"})), 400
     
     # assign the user's ID and other necessary fields to the comment JSON
-    comment_json["author_id"] = user.user_id
+    comment_json["author_id"] = id
     comment_json["post_id"] = post_id
     comment_json["comment_date"] = datetime.now()
     comment_json["updated_date"] = datetime.now()
@@ -107,6 +120,9 @@ def like_post(post_id: int):
     # add the comment to the database session and commit the changes
     db.session.add(comment)
     db.session.commit()
+
+    # remove the cached post, which lists its comments
+    cache.delete(POST_KEY.format(post_id=post_id))
     
     # return a success message with the comment's ID
     return jsonify({"message": "new comment created successfully", "comment_id": comment.comment_id}), 200
@@ -127,12 +143,8 @@ def update_comment(comment_id: int):
     elif len(comment_json["comment_text"]) > 500:
         return jsonify({'error': '\'comment_text\' must be less than 500 characters'}), 403
 
-    # get the user's identity from the JWT token
-    user_id = get_jwt_identity()
-
-    # query the User table to get user information based on the user's ID
-    stmt1 = db.select(User).filter_by(user_id=user_id)
-    user = db.session.scalar(stmt1)
+    # get the user's identity from the JWT token claims
+    user_id = current_user_id()
     
     # query the Comment table to get the comment based on the specified comment_id
     stmt2 = db.select(Comment).filter_by(comment_id=comment_id)
@@ -143,16 +155,20 @@ def update_comment(comment_id: int):
         return jsonify({'error': f'comment with ID {comment_id} does not exist'}), 400
 
     # check if the user is the owner of the comment
-    if comment.author_id != user.user_id:
+    if comment.author_id != user_id:
         return jsonify({'error': f'you are not the owner of the comment with ID {comment_id}'}), 401
 
     # update the comment's text and the 'updated_date' field
     comment.comment_text = comment_json["comment_text"]
     comment.updated_date = datetime.now()
+    post_id = comment.post_id
 
     # commit the changes to the database
     db.session.commit()
 
+    # remove the cached post, which lists its comments
+    cache.delete(POST_KEY.format(post_id=post_id))
+
     # return a success message with the comment's ID
     return jsonify({"message": "comment updated successfully", "comment_id": comment.comment_id}), 200
 
@@ -162,12 +178,8 @@ def update_comment(comment_id: int):
 @comments.route("/<int:comment_id>", methods=["DELETE"])
 @jwt_required()
 def delete_comment(comment_id: int):
-    # get the user's identity from the JWT token
-    user_id = get_jwt_identity()
-
-    # query the User table to get user information based on the user's ID
-    stmt1 = db.select(User).filter_by(user_id=user_id)
-    user = db.session.scalar(stmt1)
+    # get the user's identity from the JWT token claims
+    user_id = current_user_id()
 
     # query the Comment table to get the comment based on the specified comment_id
     stmt2 = db.select(Comment).filter_by(comment_id=comment_id)
@@ -178,12 +190,16 @@ def delete_comment(comment_id: int):
         return jsonify({'error': f'comment with ID {comment_id} does not exist'}), 400
 
     # check if the user is the owner of the comment
-    if comment.author_id != user.user_id:
+    if comment.author_id != user_id:
         return jsonify({'error': f'you are not the owner of the comment with ID {comment_id}'}), 401
 
-    # delete the comment from the database
-    db.session.delete(comment)
+    # mark the comment as deleted, hiding it from every query - "flask db purge" deletes the row and its likes later
+    soft_delete(comment)
+    post_id = comment.post_id
     db.session.commit()
 
+    # remove the cached post, which lists its comments
+    cache.delete(POST_KEY.format(post_id=post_id))
+
     # return a success message with the deleted comment's ID
-    return jsonify({"message": "comment deleted successfully", "comment_id": f"{comment.comment_id}"}), 200
\ No newline at end of file
+    return jsonify({"message": "comment deleted successfully", "comment_id": f"{comment_id}"}), 200
\ No newline at end of file
@@ -0,0 +1,49 @@
+# flask related imports for requests, responses and authentication
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required
+
+# import exception handling
+from werkzeug.exceptions import BadRequest
+
+# import models
+from models.blog_posts import BlogPost
+
+# import schemas and the detailed post fields
+from schemas.blog_posts import BlogPostSchema
+from schemas.registry import get_schema
+from controllers.blog_posts_controllers import post_detail_fields
+
+# import the feed and field helpers
+from utils.feed import feed_page
+from utils.fields import get_fields, load_options
+from utils.identity import current_user_id
+
+
+feed = Blueprint("feed", __name__, url_prefix="/feed")
+
+
+# bad request error handler - occurs when invalid requests are sent
+@feed.errorhandler(BadRequest)
+def bad_request_error(e):
+    return jsonify({'error': e.description}), 400
+
+
+# GET "/feed"
+# view a page of posts by the users the current user follows, newest first - requires authentication
+@feed.route("/", methods=["GET"])
+@jwt_required()
+def get_feed():
+    # get the user's identity from the JWT token claims
+    id = current_user_id()
+
+    # get the requested fields (all detailed fields by default)
+    fields = get_fields(("post_id",) + post_detail_fields)
+
+    # query a page of the feed, loading only the columns and related information needed for the fields
+    posts, next_cursor = feed_page(id, load_options(BlogPost, fields, BlogPost.posted_date))
+
+    # define a schema to filter and serialize the post data
+    filtered_schema = get_schema(BlogPostSchema, many=True, only=fields)
+
+    # serialize the posts and return them as JSON with the cursor for the next page
+    return jsonify({"posts": filtered_schema.dump(posts), "next_cursor": next_cursor}), 200
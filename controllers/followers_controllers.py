@@ -1,5 +1,5 @@
-# import SQLAlchemy
-from main import db
+# import SQLAlchemy and the response cache
+from main import db, cache, replicas
 
 # flask related imports for requests, responses and authentication
 from flask import Blueprint, jsonify, request, abort
@@ -8,6 +8,7 @@ from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identi
 # import exception handling
 from marshmallow.exceptions import ValidationError
 from werkzeug.exceptions import BadRequest
+from sqlalchemy.exc import IntegrityError
 
 # import models
 from models.followers import Follower
@@ -15,10 +16,22 @@ from models.users import User
 
 # import schemas
 from schemas.followers import follower_schema, followers_schema, FollowerSchema
+from schemas.registry import get_schema
+
+# import pagination, inserts and counters
+from utils.pagination import paginate
+from utils.inserts import insert_unique, delete_returning
+from utils.counters import adjust_follower_count
+from utils.cache import USER_KEY
+from utils.feed import backfill_timeline, clear_timeline
+from utils.identity import current_user_id
 
 
 followers = Blueprint("followers", __name__, url_prefix="/followers")
 
+# read the blueprint's GET requests from the read replicas
+replicas.route_reads(followers)
+
 
 # validation error handler - catches validation errors and outputs the error
 @followers.errorhandler(ValidationError)
@@ -43,37 +56,38 @@ def key_error(e):
 @followers.route("/<int:user_id>", methods=["POST"])
 @jwt_required()
 def follow_user(user_id: int):
-    # get the user's identity from the JWT token
-    id = get_jwt_identity()
+    # get the user's identity from the JWT token claims
+    id = current_user_id()
 
-    # query the User table to get user information based on the user's ID
-    stmt1 = db.select(User).filter_by(user_id=id)
-    user = db.session.scalar(stmt1)
+    # if the user is trying to follow themselves, return a message
+    if id == user_id:
+        return(jsonify({"error": "You can't follow yourself"})), 400
 
-    # query the Follower table to check if the user is already following the specified user_id
-    stmt2 = db.select(Follower).filter_by(follower_id=id, followed_id=user_id)
-    follow = db.session.scalar(stmt2)
-    response = follower_schema.dump(follow)
+    # insert the follow record unless the user already follows the specified user (a unique constraint on follower_id and followed_id)
+    try:
+        follow_id = insert_unique(Follower, Follower.follow_id, follower_id=id, followed_id=user_id)
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error": f"user with ID {user_id} not found."}), 404
 
     # if the user is already following the specified user, return a message
-    if response:
+    if follow_id is None:
         return(jsonify({"error": "You already follow this user"})), 400
-    # if the user is trying to follow themselves, return a message
-    elif user.user_id == user_id:
-        return(jsonify({"error": "You can't follow yourself"})), 400
-    else:
-        # create a new Follower record to represent the follow relationship
-        follow_json = {}
-        follow_json["follower_id"] = user.user_id
-        follow_json["followed_id"] = user_id
-        follow = Follower(**follow_json)
 
-        # add the follow record to the database and commit the changes
-        db.session.add(follow)
-        db.session.commit()
+    # increment the followed user's follower_count in the same transaction (no user is updated if they don't exist)
+    if not adjust_follower_count(user_id, 1):
+        db.session.rollback()
+        return jsonify({"error": f"user with ID {user_id} not found."}), 404
 
-        # return a success message with the follow_id
-        return jsonify({"message": f"Followed user {user_id} successfully.", "follow_id": follow.follow_id}), 200
+    # add the followed user's fanned out posts to the follower's timeline
+    backfill_timeline(id, user_id)
+    db.session.commit()
+
+    # remove the followed user's cached profile, which shows their follower_count (cached posts don't show it)
+    cache.delete(USER_KEY.format(user_id=user_id))
+
+    # return a success message with the follow_id
+    return jsonify({"message": f"Followed user {user_id} successfully.", "follow_id": follow_id}), 200
 
 
 # DELETE "/followers/<user_id>"
@@ -81,56 +95,50 @@ def follow_user(user_id: int):
 @followers.route("/<int:user_id>", methods=["DELETE"])
 @jwt_required()
 def delete_post_like(user_id: int):
-    # get the user's identity from the JWT token
-    id = get_jwt_identity()
+    # get the user's identity from the JWT token claims
+    id = current_user_id()
 
-    # query the User table to get user information based on the user's ID
-    stmt1 = db.select(User).filter_by(user_id=id)
-    user = db.session.scalar(stmt1)
-
-    # query the Follower table to find the follow relationship between the current user and the specified user_id
-    stmt2 = db.select(Follower).filter_by(follower_id=user.user_id, followed_id=user_id)
-    follow = db.session.scalar(stmt2)
+    # delete the follow relationship between the current user and the specified user_id (only the creator's follow can match)
+    follow_id = delete_returning(Follower, Follower.follow_id, follower_id=id, followed_id=user_id)
 
     # if the follow relationship doesn't exist, return a bad request (400) with an error message
-    if not follow:
+    if follow_id is None:
         return(jsonify({"error": "this follow doesn't exist"})), 400
 
-    # check if the current user is the creator of this follow relationship
-    if follow.follower_id != user.user_id:
-        return(jsonify({"error": "you are not the creator of this follow"})), 400
-
-    # delete the follow relationship from the database and commit the changes
-    db.session.delete(follow)
+    # decrement the followed user's follower_count and remove their posts from the follower's timeline in the same transaction
+    adjust_follower_count(user_id, -1)
+    clear_timeline(id, user_id)
     db.session.commit()
 
+    # remove the followed user's cached profile, which shows their follower_count (cached posts don't show it)
+    cache.delete(USER_KEY.format(user_id=user_id))
+
     # return a success message with the follow_id
-    return jsonify({"message": "unfollowed successfully", "follow_id": f"{follow.follow_id}"}), 200
+    return jsonify({"message": "unfollowed successfully", "follow_id": f"{follow_id}"}), 200
 
 
 # GET "/followers/<user_id>"
-# get a list of followers by user_id
+# get a list of followers by user_id, one page at a time
 @followers.route("/<int:user_id>", methods=["GET"])
 def get_post_likes(user_id: int):
-    # query the Follower table to find all followers of the specified user_id
+    # query the Follower table to find a page of followers of the specified user_id
     stmt1 = db.select(Follower).filter_by(followed_id=user_id)
-    followers = db.session.scalars(stmt1)
+    followers, next_cursor = paginate(stmt1, (Follower.follow_id,))
 
     # define the schema to filter and format the follower data
-    filtered_schema = FollowerSchema(many=True, only=("follower_id", "follow_id"))
+    filtered_schema = get_schema(FollowerSchema, many=True, only=("follower_id", "follow_id"))
 
     # serialize the follower data using the schema
     json = filtered_schema.dump(followers)
 
-    # iterate through each follower in the JSON data
-    for follower in json:
-        # query the User table to get additional information about the follower
-        stmt2 = db.select(User).filter_by(user_id=follower["follower_id"])
-        user = db.session.scalar(stmt2)
+    # query the User table once for the names of every follower in the page
+    follower_ids = [follower["follower_id"] for follower in json]
+    stmt2 = db.select(User.user_id, User.name).where(User.user_id.in_(follower_ids))
+    names = dict(db.session.execute(stmt2).all()) if follower_ids else {}
 
-        # add the follower's name and user_id to the JSON data
-        follower["follower_name"] = user.name
-        follower["follower_id"] = user.user_id
+    # add each follower's name to the JSON data
+    for follower in json:
+        follower["follower_name"] = names.get(follower["follower_id"])
 
     # return the JSON data containing the followers and their information
-    return jsonify({"followers": json }), 200
\ No newline at end of file
+    return jsonify({"followers": json, "next_cursor": next_cursor}), 200
\ No newline at end of file
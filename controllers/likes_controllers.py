@@ -1,5 +1,6 @@
-# import SQLAlchemy
-from main import db
+# import SQLAlchemy and the response cache
+from main import db, cache, replicas
+from sqlalchemy.orm import selectinload
 
 # flask related imports for requests, responses and authentication
 from flask import Blueprint, jsonify, request,  abort
@@ -8,6 +9,7 @@ from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identi
 # import exception handling
 from marshmallow.exceptions import ValidationError
 from werkzeug.exceptions import BadRequest
+from sqlalchemy.exc import IntegrityError
 
 # import models
 from models.likes import Like
@@ -15,10 +17,21 @@ from models.users import User
 
 # import schemas
 from schemas.likes import like_schema, likes_schema, LikeSchema
+from schemas.registry import get_schema
+
+# import pagination, inserts and counters
+from utils.pagination import paginate
+from utils.inserts import insert_unique, delete_returning
+from utils.counters import adjust_post_likes, adjust_comment_likes
+from utils.cache import POST_KEY, USER_KEY
+from utils.identity import current_user_id
 
 
 likes = Blueprint("likes", __name__, url_prefix="/likes")
 
+# read the blueprint's GET requests from the read replicas
+replicas.route_reads(likes)
+
 
 # validation error handler - catches validation errors and outputs the error
 @likes.errorhandler(ValidationError)
@@ -39,33 +52,39 @@ def key_error(e):
 
 
 # GET "/likes/post/<post_id>"
-# view which users liked a blog post by post_id
+# view which users liked a blog post by post_id, one page at a time
 @likes.route("/post/<int:post_id>", methods=["GET"])
 def get_post_likes(post_id: int):
-    # query the Like table to find all likes for the specified post_id
-    stmt = db.select(Like).filter_by(post_id=post_id)
-    likes = db.session.scalars(stmt)
+    # query the Like table to find a page of likes for the specified post_id, eager loading the likers
+    stmt = db.select(Like).filter_by(post_id=post_id).options(selectinload(Like.liker_info))
+    likes, next_cursor = paginate(stmt, (Like.like_id,))
 
     # define the schema to filter and format the like data
-    filtered_schema = LikeSchema(many=True, only=("like_id", "liker_info.name", "liker_info.user_id"))
+    filtered_schema = get_schema(LikeSchema, many=True, only=("like_id", "liker_info.name", "liker_info.user_id"))
 
     # serialize the like data using the schema
-    return jsonify({"likers": filtered_schema.dump(likes) }), 200
+    return jsonify({"likers": filtered_schema.dump(likes), "next_cursor": next_cursor}), 200
 
 
 # GET "/likes/comment/<comment_id>"
-# view which users liked a comment by comment_id
+# view which users liked a comment by comment_id, one page at a time
 @likes.route("/comment/<int:comment_id>", methods=["GET"])
 def get_comment_likes(comment_id: int):
-    # query the Like table to find all likes for the specified comment_id
-    stmt = db.select(Like).filter_by(comment_id=comment_id)
-    likes = db.session.scalars(stmt)
+    # query the Like table to find a page of likes for the specified comment_id, eager loading the likers
+    stmt = db.select(Like).filter_by(comment_id=comment_id).options(selectinload(Like.liker_info))
+    likes, next_cursor = paginate(stmt, (Like.like_id,))
 
     # define the schema to filter and format the like data
-    filtered_schema = LikeSchema(many=True, only=("like_id", "liker_info.name", "liker_info.user_id"))
+    filtered_schema = get_schema(LikeSchema, many=True, only=("like_id", "liker_info.name", "liker_info.user_id"))
 
     # serialize the like data using the schema
-    return jsonify({"likers": filtered_schema.dump(likes) }), 200
+    return jsonify({"likers": filtered_schema.dump(likes), "next_cursor": next_cursor}), 200
+
+
+# roll back the current transaction and return a not found error
+def not_found(name, id):
+    db.session.rollback()
+    return jsonify({"error": f"{name} with ID {id} not found."}), 404
 
 
 # POST "/likes/post/<post_id>"
@@ -73,30 +92,27 @@ def get_comment_likes(comment_id: int):
 @likes.route("/post/<int:post_id>", methods=["POST"])
 @jwt_required()
 def like_post(post_id : int):
-    # get the user's identity from the JSON Web Token
-    id = get_jwt_identity()
+    # get the user's identity from the JSON Web Token claims
+    id = current_user_id()
 
-    # query the User table to find the user based on the identity
-    stmt1 = db.select(User).filter_by(user_id=id)
-    user = db.session.scalar(stmt1)
-
-    # query the Like table to check if the user has already liked this post
-    stmt2 = db.select(Like).filter_by(liker_id=id, post_id=post_id)
-    like = db.session.scalar(stmt2)
+    # insert the like unless the user already liked this post (a unique constraint on liker_id and post_id)
+    try:
+        like_id = insert_unique(Like, Like.like_id, liker_id=id, post_id=post_id)
+    except IntegrityError:
+        return not_found("post", post_id)
 
     # if a like already exists, return a message
-    if like:
+    if like_id is None:
         return(jsonify({"error": "Like already exists."})), 400
-    else:
-        # if no like exists, create a new like entry
-        like_json = {}
-        like_json["liker_id"] = user.user_id
-        like_json["post_id"] = post_id
-        like = Like(**like_json)
-
-        db.session.add(like)
-        db.session.commit()
-        return jsonify({"message": "New like created successfully.", "like_id": like.like_id}), 200
+
+    # increment the post's like_count in the same transaction (no post is updated if it doesn't exist)
+    if not adjust_post_likes(post_id, 1):
+        return not_found("post", post_id)
+    db.session.commit()
+
+    # remove the cached post (like_count) and the liker's cached profile (likes)
+    cache.delete(POST_KEY.format(post_id=post_id), USER_KEY.format(user_id=id))
+    return jsonify({"message": "New like created successfully.", "like_id": like_id}), 200
 
 
 # POST "/likes/comment/<comment_id>"
@@ -104,30 +120,89 @@ def like_post(post_id : int):
 @likes.route("/comment/<int:comment_id>", methods=["POST"])
 @jwt_required()
 def like_comment(comment_id : int):
-    # get the user's identity from the JSON Web Token
-    id = get_jwt_identity()
-
-    # query the User table to find the user based on the identity
-    stmt1 = db.select(User).filter_by(user_id=id)
-    user = db.session.scalar(stmt1)
+    # get the user's identity from the JSON Web Token claims
+    id = current_user_id()
 
-    # query the Like table to check if the user has already liked this comment
-    stmt2 = db.select(Like).filter_by(liker_id=id, comment_id=comment_id)
-    like = db.session.scalar(stmt2)
+    # insert the like unless the user already liked this comment (a unique constraint on liker_id and comment_id)
+    try:
+        like_id = insert_unique(Like, Like.like_id, liker_id=id, comment_id=comment_id)
+    except IntegrityError:
+        return not_found("comment", comment_id)
 
     # if a like already exists, return a message
-    if like:
+    if like_id is None:
         return(jsonify({"error": "Like already exists."})), 400
-    else:
-        # if no like exists, create a new like entry
-        like_json = {}
-        like_json["liker_id"] = user.user_id
-        like_json["comment_id"] = comment_id
-        like = Like(**like_json)
-
-        db.session.add(like)
+
+    # increment the comment's like_count in the same transaction (no post_id is returned if it doesn't exist)
+    post_id = adjust_comment_likes(comment_id, 1)
+    if post_id is None:
+        return not_found("comment", comment_id)
+    db.session.commit()
+
+    # remove the cached post (comment like_count) and the liker's cached profile (likes)
+    cache.delete(POST_KEY.format(post_id=post_id), USER_KEY.format(user_id=id))
+    return jsonify({"message": "New like created successfully.", "like_id": like_id}), 200
+
+
+# POST "/likes/post/<post_id>/toggle"
+# like a blog post, or remove the like if the user already liked it - requires authentication
+@likes.route("/post/<int:post_id>/toggle", methods=["POST"])
+@jwt_required()
+def toggle_post_like(post_id: int):
+    # get the user's identity from the JSON Web Token claims
+    id = current_user_id()
+
+    # try to insert the like first, then remove the existing like if there was one
+    try:
+        like_id = insert_unique(Like, Like.like_id, liker_id=id, post_id=post_id)
+    except IntegrityError:
+        return not_found("post", post_id)
+
+    liked = like_id is not None
+    if not liked:
+        like_id = delete_returning(Like, Like.like_id, liker_id=id, post_id=post_id)
+
+    # adjust the post's like_count in the same transaction (nothing changes if a concurrent request removed the like first)
+    if like_id is not None:
+        if not adjust_post_likes(post_id, 1 if liked else -1):
+            return not_found("post", post_id)
         db.session.commit()
-        return jsonify({"message": "New like created successfully.", "like_id": like.like_id}), 200
+
+        # remove the cached post (like_count) and the liker's cached profile (likes)
+        cache.delete(POST_KEY.format(post_id=post_id), USER_KEY.format(user_id=id))
+
+    return jsonify({"message": "post liked" if liked else "post unliked", "liked": liked, "like_id": like_id}), 200
+
+
+# POST "/likes/comment/<comment_id>/toggle"
+# like a comment, or remove the like if the user already liked it - requires authentication
+@likes.route("/comment/<int:comment_id>/toggle", methods=["POST"])
+@jwt_required()
+def toggle_comment_like(comment_id: int):
+    # get the user's identity from the JSON Web Token claims
+    id = current_user_id()
+
+    # try to insert the like first, then remove the existing like if there was one
+    try:
+        like_id = insert_unique(Like, Like.like_id, liker_id=id, comment_id=comment_id)
+    except IntegrityError:
+        return not_found("comment", comment_id)
+
+    liked = like_id is not None
+    if not liked:
+        like_id = delete_returning(Like, Like.like_id, liker_id=id, comment_id=comment_id)
+
+    # adjust the comment's like_count in the same transaction (nothing changes if a concurrent request removed the like first)
+    if like_id is not None:
+        post_id = adjust_comment_likes(comment_id, 1 if liked else -1)
+        if post_id is None:
+            return not_found("comment", comment_id)
+        db.session.commit()
+
+        # remove the cached post (comment like_count) and the liker's cached profile (likes)
+        cache.delete(POST_KEY.format(post_id=post_id), USER_KEY.format(user_id=id))
+
+    return jsonify({"message": "comment liked" if liked else "comment unliked", "liked": liked, "like_id": like_id}), 200
 
 
 # DELETE "/likes/post/<post_id>"
@@ -135,30 +210,24 @@ def like_comment(comment_id : int):
 @likes.route("/post/<int:post_id>", methods=["DELETE"])
 @jwt_required()
 def delete_post_like(post_id: int):
-    # get the user's identity from the JSON Web Token
-    user_id = get_jwt_identity()
+    # get the user's identity from the JSON Web Token claims
+    user_id = current_user_id()
 
-    # query the User table to find the user based on the identity
-    stmt1 = db.select(User).filter_by(user_id=user_id)
-    user = db.session.scalar(stmt1)
-
-    # query the Like table to find the like associated with the user and post
-    stmt2 = db.select(Like).filter_by(post_id=post_id, liker_id=user_id)
-    like = db.session.scalar(stmt2)
+    # delete the user's like of the post (only the creator's like can match)
+    like_id = delete_returning(Like, Like.like_id, post_id=post_id, liker_id=user_id)
 
     # if the like doesn't exist, return an error response
-    if not like:
+    if like_id is None:
         return(jsonify({"error": "like doesn't exist"})), 400
 
-    # if the user is not the creator of the like, return an error response
-    if like.liker_id != user.user_id:
-        return(jsonify({"error": "you are not the creator of this like"})), 400
-
-    # delete the like and commit the change to the database
-    db.session.delete(like)
+    # decrement the post's like_count in the same transaction
+    adjust_post_likes(post_id, -1)
     db.session.commit()
 
-    return jsonify({"message":"like deleted successfully", "like_id": f"{like.like_id}"}), 200
+    # remove the cached post (like_count) and the liker's cached profile (likes)
+    cache.delete(POST_KEY.format(post_id=post_id), USER_KEY.format(user_id=user_id))
+
+    return jsonify({"message":"like deleted successfully", "like_id": f"{like_id}"}), 200
 
 
 # DELETE "/likes/comment/<comment_id>"
@@ -166,28 +235,21 @@ def delete_post_like(post_id: int):
 @likes.route("/comment/<int:comment_id>", methods=["DELETE"])
 @jwt_required()
 def delete_comment_like(comment_id: int):
-    # get the user's identity from the JSON Web Token
-    user_id = get_jwt_identity()
-
-    # query the User table to find the user based on the identity
-    stmt1 = db.select(User).filter_by(user_id=user_id)
-    user = db.session.scalar(stmt1)
+    # get the user's identity from the JSON Web Token claims
+    user_id = current_user_id()
 
-    # query the Like table to find the like associated with the user and comment
-    stmt2 = db.select(Like).filter_by(comment_id=comment_id, liker_id=user_id)
-    like = db.session.scalar(stmt2)
+    # delete the user's like of the comment (only the creator's like can match)
+    like_id = delete_returning(Like, Like.like_id, comment_id=comment_id, liker_id=user_id)
 
     # if the like doesn't exist, return an error response
-    if not like:
+    if like_id is None:
         return(jsonify({"error": "like doesn't exist"})), 400
 
-    # if the user is not the creator of the like, return an error response
-    if like.liker_id != user.user_id:
-        return(jsonify({"error": "you are not the creator of this like"})), 400
-
-    # delete the like and commit the change to the database
-    db.session.delete(like)
+    # decrement the comment's like_count in the same transaction
+    post_id = adjust_comment_likes(comment_id, -1)
     db.session.commit()
-    
-    return jsonify({"message":"like deleted successfully", "like_id": f"{like.like_id}"}), 200
 
+    # remove the cached post (comment like_count) and the liker's cached profile (likes)
+    cache.delete(POST_KEY.format(post_id=post_id), USER_KEY.format(user_id=user_id))
+    
+    return jsonify({"message":"like deleted successfully", "like_id": f"{like_id}"}), 200
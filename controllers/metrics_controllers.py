@@ -0,0 +1,16 @@
+# import the prometheus metrics
+from prometheus_client import CONTENT_TYPE_LATEST
+from utils.metrics import latest_metrics
+
+# flask related imports for responses
+from flask import Blueprint
+
+
+metrics = Blueprint("metrics", __name__, url_prefix="/metrics")
+
+
+# GET "/metrics"
+# view request latency, SQL statement and connection pool metrics of every worker in the prometheus text format
+@metrics.route("", methods=["GET"])
+def get_metrics():
+    return latest_metrics(), 200, {"Content-Type": CONTENT_TYPE_LATEST}
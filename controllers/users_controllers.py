@@ -1,6 +1,8 @@
-# import Regex, SQLAlchemy and BCrypt
+# import Regex, datetime, SQLAlchemy, BCrypt and the response cache
 import re
-from main import db, bcrypt
+from datetime import datetime
+from main import db, passwords, cache, replicas
+from sqlalchemy.orm import selectinload
 
 # flask related imports for requests, responses and authentication
 from flask import Blueprint, jsonify, request, abort
@@ -9,21 +11,39 @@ from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identi
 # import exception handling
 from marshmallow.exceptions import ValidationError
 from werkzeug.exceptions import BadRequest
+from utils.passwords import PasswordHasherBusy
 
 # import models
 from models.users import User
 from models.likes import Like
 from models.followers import Follower
 from models.comments import Comment
+from models.blog_posts import BlogPost
 
 # import schemas
 from schemas.users import user_schema, users_schema, UserSchema
 from schemas.comments import CommentSchema
 from schemas.likes import likes_schema, LikeSchema
+from schemas.registry import get_schema
+
+# import pagination and cache keys
+from utils.pagination import paginate
+from utils.cache import POST_KEY, USER_KEY
+from utils.fields import get_fields, load_options
+from utils.streaming import get_stream_format, stream_rows
+from utils.identity import current_user_id, identities
+from utils.soft_delete import soft_delete
+from utils.counters import remove_user_counts
 
 
 users = Blueprint("users", __name__, url_prefix="/users")
 
+# read the blueprint's GET requests from the read replicas
+replicas.route_reads(users)
+
+# fields shown by the detailed user view, and allowed in its '?fields=' parameter
+user_detail_fields = ("name", "email", "follower_count", "followers", "likes.like_id", "likes.post_id", "likes.comment_id", "blog_posts.post_title", "blog_posts.post_id")
+
 
 # validation error handler - catches validation errors and outputs the error
 @users.errorhandler(ValidationError)
@@ -43,49 +63,63 @@ def key_error(e):
     return jsonify({'error': f'The {e} field is required'}), 400
 
 
+# password hasher busy handler - occurs when every password hashing thread stays busy
+@users.errorhandler(PasswordHasherBusy)
+def password_hasher_busy(e):
+    return jsonify({"error": "The server is busy, please try again"}), 503, {"Retry-After": "1"}
+
+
 # GET "/users"
-# list of all users (compact view)
+# list of users (compact view), one page at a time
 @users.route("/", methods=["GET"])
 def get_users():
-    # query all users from the User table
-    stmt = db.select(User)
-    users = db.session.scalars(stmt)
+    # get the requested fields (all compact fields by default)
+    fields = get_fields(("user_id", "name", "email", "follower_count"))
 
-    # define the schema to filter and structure the user data
-    filtered_schema = UserSchema(many=True, only=("user_id", "name", "email", "follower_count"))
+    # query users from the User table, loading only the columns needed for the fields
+    stmt = db.select(User).options(*load_options(User, fields))
+
+    # stream every user (as a json array or ndjson) if requested, instead of returning one page
+    stream_format = get_stream_format()
+    if stream_format:
+        return stream_rows(stmt, (User.user_id,), get_schema(UserSchema, only=fields), stream_format)
+
+    users, next_cursor = paginate(stmt, (User.user_id,))
+
+    # define the schema to filter and structure the user data (follower_count is the stored counter column)
+    filtered_schema = get_schema(UserSchema, many=True, only=fields)
 
     # dump and filter user data based on the schema
     filtered = filtered_schema.dump(users)
 
-    # iterate through the filtered users to calculate and update follower counts
-    for user in filtered:
-        # query the Follower table to count followers for each user
-        user["follower_count"] = db.session.query(Follower).filter_by(followed_id=user["user_id"]).count()
-        
-    return jsonify({"users": filtered }), 200
+    return jsonify({"users": filtered, "next_cursor": next_cursor}), 200
 
 # GET "/users/<user_id>"
 # view user details by user_id (detailed view)
 @users.route("/<int:user_id>", methods=["GET"])
+@cache.cached(USER_KEY, user_detail_fields)
 def view_user(user_id: int):
-    # query the User table to get user details based on user_id
-    stmt = db.select(User).filter_by(user_id=user_id)
+    # get the requested fields (all detailed fields by default)
+    fields = get_fields(user_detail_fields)
+
+    # query the User table to get user details based on user_id, loading only the columns, followers, likes and blog posts needed for the fields
+    stmt = db.select(User).filter_by(user_id=user_id).options(*load_options(User, fields))
     user = db.session.scalar(stmt)
 
-    # calculate and update the user's follower count by querying the Follower table
-    user.follower_count = db.session.query(Follower).filter_by(followed_id=user_id).count()
+    if not user:
+        return(jsonify({"error": "user does not exist"})), 400
 
-    # define the schema to filter and structure the user data
-    filtered_schema = UserSchema(only=("name", "email", "follower_count", "followers", "likes.like_id", "likes.post_id", "likes.comment_id", "blog_posts.post_title", "blog_posts.post_id"))
+    # define the schema to filter and structure the user data (follower_count is the stored counter column)
+    filtered_schema = get_schema(UserSchema, only=fields)
 
     # dump and filter user data based on the schema
     json = filtered_schema.dump(user)
 
     # iterate through the user's likes and remove null values for comment_id and post_id
-    for like in json["likes"]:
-        if like["comment_id"] is None:
+    for like in json.get("likes", []):
+        if like.get("comment_id", 0) is None:
             del like["comment_id"]
-        if like["post_id"] is None:
+        if like.get("post_id", 0) is None:
             del like["post_id"]
 
     return jsonify(json), 200
@@ -95,22 +129,15 @@ def view_user(user_id: int):
 # view a user's posts by user_id
 @users.route("/posts/<int:user_id>", methods=["GET"])
 def view_user_posts(user_id: int):
-    # query the User table to get user details based on user_id
-    stmt = db.select(User).filter_by(user_id=user_id)
+    # query the User table to get user details based on user_id, eager loading their blog posts
+    stmt = db.select(User).filter_by(user_id=user_id).options(selectinload(User.blog_posts))
     user = db.session.scalar(stmt)
 
     if not user:
         return(jsonify({"error": "user does not exist"})), 400
 
-    # calculate and update the user's follower count by querying the Follower table
-    user.follower_count = db.session.query(Follower).filter_by(followed_id=user_id).count()
-
-    # iterate through the user's blog posts and calculate the like count for each post
-    for post in user.blog_posts:
-        post.like_count = db.session.query(Like).filter_by(post_id=post.post_id).count()
-
-    # define the schema to filter and structure the user's blog post data
-    filtered_schema = UserSchema(only=("blog_posts.updated_date", "blog_posts.posted_date", "blog_posts.post_title", "blog_posts.post_id", "blog_posts.post_content", "blog_posts.like_count"))
+    # define the schema to filter and structure the user's blog post data (like_count is the stored counter column)
+    filtered_schema = get_schema(UserSchema, only=("blog_posts.updated_date", "blog_posts.posted_date", "blog_posts.post_title", "blog_posts.post_id", "blog_posts.post_content", "blog_posts.like_count"))
 
     # dump and filter the user's blog post data based on the schema
     return jsonify(filtered_schema.dump(user)), 200
@@ -124,17 +151,13 @@ def view_user_comments(user_id: int):
     stmt = db.select(Comment).filter_by(author_id=user_id)
     comments_scalars = db.session.scalars(stmt)
 
-    # define the schema to filter and structure the user's comment data
-    filtered_schema = CommentSchema(many=True, only=("comment_id", "comment_text", "comment_date", "updated_date", "post_id", "like_count"))
+    # define the schema to filter and structure the user's comment data (like_count is the stored counter column)
+    filtered_schema = get_schema(CommentSchema, many=True, only=("comment_id", "comment_text", "comment_date", "updated_date", "post_id", "like_count"))
 
     # dump and filter the user's comment data based on the schema
     comments = filtered_schema.dump(comments_scalars)
 
-    # calculate and update the like count for each comment
-    for comment in comments:
-        comment["like_count"] = db.session.query(Like).filter_by(comment_id=comment["comment_id"]).count()
-
-    # return the user's comments with their updated like counts
+    # return the user's comments with their like counts
     return jsonify({"comments": comments}), 200
 
 
@@ -147,7 +170,7 @@ def view_user_likes(user_id: int):
     likes_scalars = db.session.scalars(stmt)
 
     # define the schema to filter and structure the user's like data
-    filtered_schema = LikeSchema(many=True, only=("comment_id", "like_id", "post_id"))
+    filtered_schema = get_schema(LikeSchema, many=True, only=("comment_id", "like_id", "post_id"))
 
     # dump and filter the user's like data based on the schema
     likes = filtered_schema.dump(likes_scalars)
@@ -168,12 +191,15 @@ def view_user_likes(user_id: int):
 @users.route("/", methods=["PUT"])
 @jwt_required()
 def update_post():
-    # get the user's ID from the JWT token
-    id = get_jwt_identity()
+    # get the user's ID from the JWT token claims
+    id = current_user_id()
 
-    # query the User table to get the user based on user_id
-    stmt = db.select(User).filter_by(user_id=id)
-    user = db.session.scalar(stmt)
+    # get the user based on user_id to update their details
+    user = db.session.get(User, id)
+
+    # the user was deleted, but their identity is still cached by this worker
+    if user is None:
+        return jsonify({"error": "The user for this token doesn't exist"}), 401
 
     # get the updated user information from the request JSON
     user_fields = request.json
@@ -197,10 +223,65 @@ def update_post():
         if re.match(pattern, user_fields["password"]) is None:
             return jsonify({'error': 'The \'password\' field must be at least 8 characters and must contain an upper-case character, a symbol, and a number.'}), 403
         # hash and store the new password
-        user.password = bcrypt.generate_password_hash(user_fields["password"]).decode("utf-8")
+        user.password = passwords.hash(user_fields["password"])
+
+    # record when the details were updated
+    user.updated_date = datetime.now()
+
+    # cached posts show the author's and commenters' names, so find the posts to remove from the cache
+    post_ids = []
+    if "name" in user_fields:
+        authored = db.select(BlogPost.post_id).filter_by(author_id=id)
+        commented = db.select(Comment.post_id).filter_by(author_id=id)
+        post_ids = db.session.scalars(db.union(authored, commented)).all()
 
     # commit the changes to the database
     db.session.commit()
 
+    # remove the user's cached profile, the cached posts showing their name and their cached identity
+    cache.delete(USER_KEY.format(user_id=id), *(POST_KEY.format(post_id=post_id) for post_id in post_ids))
+    identities.delete(id)
+
     # return a success message
     return jsonify({"message": "updated user details"}), 200
+
+
+# DELETE "/users"
+# delete the logged in user's account with their posts and comments - requires authentication
+@users.route("/", methods=["DELETE"])
+@jwt_required()
+def delete_user():
+    # get the user's ID from the JWT token claims
+    id = current_user_id()
+
+    # get the user to delete
+    user = db.session.get(User, id)
+
+    # the user was already deleted, but their identity is still cached by this worker
+    if user is None:
+        return jsonify({"error": "The user for this token doesn't exist"}), 401
+
+    # cached posts show the user's posts and comments, so find the posts to remove from the cache (before they are hidden)
+    authored = db.select(BlogPost.post_id).filter_by(author_id=id)
+    commented = db.select(Comment.post_id).filter_by(author_id=id)
+    post_ids = set(db.session.scalars(db.union(authored, commented)))
+
+    # take the user's likes and follows off the like and follower counts, which are shown with the posts and users
+    liked_post_ids, followed_ids = remove_user_counts(id)
+    post_ids.update(liked_post_ids)
+
+    # mark the user as deleted - one UPDATE of their row, which hides them and their posts, comments, likes and follows
+    # from every query. "flask db purge" deletes the rows later
+    soft_delete(user)
+
+    # commit the changes to the database
+    db.session.commit()
+
+    # remove the cached profiles of the user and the users they followed, the cached posts and the user's cached identity
+    # (their tokens stop working)
+    user_keys = (USER_KEY.format(user_id=user_id) for user_id in [id, *followed_ids])
+    cache.delete(*user_keys, *(POST_KEY.format(post_id=post_id) for post_id in post_ids))
+    identities.delete(id)
+
+    # return a success message with the deleted user's ID
+    return jsonify({"message": "user deleted successfully", "user_id": id}), 200
@@ -0,0 +1,23 @@
+# gunicorn settings - loaded automatically when gunicorn is started from the project root
+import glob
+import os
+import tempfile
+
+
+# each worker writes its prometheus metrics to files in this directory, so /metrics reports the totals of every worker
+# must be set before the app (and prometheus_client) is imported by the workers
+multiprocess_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "blog-api-metrics"))
+
+from prometheus_client import multiprocess
+
+
+# remove the metrics files of the previous run when the server starts
+def on_starting(server):
+    os.makedirs(multiprocess_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(multiprocess_dir, "*.db")):
+        os.remove(path)
+
+
+# tell prometheus_client a worker exited - its counters and histograms stay in the totals
+def child_exit(server, worker):
+    multiprocess.mark_process_dead(worker.pid)
@@ -5,14 +5,19 @@ from config import app_config
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_marshmallow import Marshmallow
-from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
+from utils.cache import ResponseCache
+from utils.passwords import PasswordHasher
+from utils.replicas import Replicas, RoutingSession
 
 
 # register instances of classes as variables
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 ma = Marshmallow()
-bcrypt = Bcrypt()
+passwords = PasswordHasher()
+cache = ResponseCache()
+jwt = JWTManager()
+replicas = Replicas()
 
 
 def app_init():
@@ -27,18 +32,54 @@ def app_init():
     # set app configuration to settings in config.py file
     app.config.from_object("config.app_config")
 
-    # create json web token object
-    jwt = JWTManager(app)
-
     # connect to sqlalchemy database
     db.init_app(app)
 
+    # enforce foreign keys (and their ON DELETE CASCADE) on sqlite, which ignores them by default
+    from utils.sqlite import enable_foreign_keys
+
+    with app.app_context():
+        enable_foreign_keys(db.engines.values())
+
+    # log slow and failed connection checkouts from the pool
+    from utils.pool import log_pool_waits
+
+    log_pool_waits(app)
+
+    # route reads to the read replicas, if any are configured
+    replicas.init_app(app)
+
+    # hide soft deleted users, posts and comments from every query until "flask db purge" removes them
+    from utils.soft_delete import hide_deleted_rows
+
+    hide_deleted_rows()
+
+    # record request latency and SQL statement metrics for /metrics
+    from utils.metrics import init_metrics
+
+    with app.app_context():
+        init_metrics(app, db.engines.values())
+
+    # check the number of SQL statements each request runs against its endpoint's budget (in development and tests)
+    from utils.query_budget import init_query_budgets
+
+    with app.app_context():
+        init_query_budgets(app, db.engines.values())
+
     # connect schemas with marshmallow
     ma.init_app(app)
 
-    # connect jwt and bcrypt. allows for authentication
+    # connect jwt and the password hasher. allows for authentication
     jwt.init_app(app)
-    bcrypt.init_app(app)
+    passwords.init_app(app)
+
+    # load the user for each authenticated request, through the identity cache
+    from utils.identity import identities
+
+    identities.init_app(app)
+
+    # create the response cache backend
+    cache.init_app(app)
 
     # register CLI commands with app instance
     from commands import db_command
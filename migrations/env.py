@@ -0,0 +1,68 @@
+# alembic environment - runs migrations against the flask app's database
+# the "flask db upgrade/downgrade/revision/stamp/current/history" commands in commands.py run this inside the app context
+from alembic import context
+
+# import SQLAlchemy and every model, so the metadata is complete for autogenerate
+from main import db
+import models
+
+
+# the metadata autogenerate compares the database against
+target_metadata = db.metadata
+
+
+# skip the sqlite full-text search tables and the postgresql-only search index when comparing, since they only exist on one database
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == "table" and name.startswith("blogposts_fts"):
+        return False
+    if type_ == "index" and name == "ix_blogposts_search_vector":
+        return context.get_context().dialect.name == "postgresql"
+    return True
+
+
+# "--sql" mode - write the migration sql to stdout instead of running it
+def run_migrations_offline():
+    context.configure(
+        url=db.engine.url.render_as_string(hide_password=False),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        compare_type=True,
+        include_object=include_object,
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+# run the migrations on a connection from the app's engine
+def run_migrations_online():
+    with db.engine.connect() as connection:
+        # batch mode copies a table and drops the original, which would delete the rows referencing it through ON DELETE
+        # CASCADE foreign keys - so foreign keys are off while migrating (the pragma must run outside a transaction)
+        if connection.dialect.name == "sqlite":
+            connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+            connection.commit()
+
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            compare_type=True,
+            include_object=include_object,
+            # sqlite can't alter constraints or columns, so tables are copied and recreated ("batch" mode)
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+        # the connection goes back to the pool, so turn foreign keys back on for the app
+        if connection.dialect.name == "sqlite":
+            connection.commit()
+            connection.exec_driver_sql("PRAGMA foreign_keys=ON")
+            connection.commit()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
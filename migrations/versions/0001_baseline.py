@@ -0,0 +1,91 @@
+"""baseline - the tables created by "flask db create" before migrations were added
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.Text(), nullable=False),
+        sa.Column("email", sa.Text(), nullable=False),
+        sa.Column("password", sa.Text(), nullable=False),
+        sa.Column("follower_count", sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint("user_id"),
+        sa.UniqueConstraint("email"),
+    )
+    op.create_table(
+        "blogposts",
+        sa.Column("post_id", sa.Integer(), nullable=False),
+        sa.Column("post_title", sa.Text(), nullable=False),
+        sa.Column("post_content", sa.Text(), nullable=False),
+        sa.Column("posted_date", sa.DateTime(), nullable=False),
+        sa.Column("updated_date", sa.DateTime(), nullable=False),
+        sa.Column("author_id", sa.Integer(), nullable=False),
+        sa.Column("like_count", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["author_id"], ["users.user_id"]),
+        sa.PrimaryKeyConstraint("post_id"),
+    )
+    op.create_table(
+        "followers",
+        sa.Column("follow_id", sa.Integer(), nullable=False),
+        sa.Column("follower_id", sa.Integer(), nullable=False),
+        sa.Column("followed_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["followed_id"], ["users.user_id"]),
+        sa.ForeignKeyConstraint(["follower_id"], ["users.user_id"]),
+        sa.PrimaryKeyConstraint("follow_id"),
+    )
+    op.create_table(
+        "categories",
+        sa.Column("category_id", sa.Integer(), nullable=False),
+        sa.Column("category_name", sa.Text(), nullable=False),
+        sa.Column("post_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["post_id"], ["blogposts.post_id"]),
+        sa.PrimaryKeyConstraint("category_id"),
+    )
+    op.create_table(
+        "comments",
+        sa.Column("comment_id", sa.Integer(), nullable=False),
+        sa.Column("comment_text", sa.Text(), nullable=False),
+        sa.Column("comment_date", sa.DateTime(), nullable=False),
+        sa.Column("updated_date", sa.DateTime(), nullable=True),
+        sa.Column("author_id", sa.Integer(), nullable=False),
+        sa.Column("post_id", sa.Integer(), nullable=False),
+        sa.Column("like_count", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["author_id"], ["users.user_id"]),
+        sa.ForeignKeyConstraint(["post_id"], ["blogposts.post_id"]),
+        sa.PrimaryKeyConstraint("comment_id"),
+    )
+    op.create_table(
+        "likes",
+        sa.Column("like_id", sa.Integer(), nullable=False),
+        sa.Column("liker_id", sa.Integer(), nullable=False),
+        sa.Column("post_id", sa.Integer(), nullable=True),
+        sa.Column("comment_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["comment_id"], ["comments.comment_id"]),
+        sa.ForeignKeyConstraint(["liker_id"], ["users.user_id"]),
+        sa.ForeignKeyConstraint(["post_id"], ["blogposts.post_id"]),
+        sa.PrimaryKeyConstraint("like_id"),
+    )
+
+
+def downgrade():
+    op.drop_table("likes")
+    op.drop_table("comments")
+    op.drop_table("categories")
+    op.drop_table("followers")
+    op.drop_table("blogposts")
+    op.drop_table("users")
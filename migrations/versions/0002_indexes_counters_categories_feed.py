@@ -0,0 +1,178 @@
+"""keyset indexes, counters, normalized categories, search, unique likes/follows and timelines
+
+Brings a baseline database up to the schema the models declare before migrations were added:
+- like/follower counter defaults, recounted from the likes and followers tables
+- categories normalized into one row per name, linked to posts through post_categories
+- the full-text search vector (postgresql) or FTS5 table (sqlite)
+- the (sort key) indexes used by keyset pagination and the home feed
+- unique likes and follows, removing duplicate rows first
+- the timelines table and blogposts.fanned_out flag used by the home feed
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:01
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+
+# revision identifiers, used by Alembic
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+# name of the database dialect the migration runs against
+def _dialect():
+    return op.get_bind().dialect.name
+
+
+def upgrade():
+    dialect = _dialect()
+
+    # counters default to 0 for new rows
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.alter_column("follower_count", existing_type=sa.Integer(), server_default="0")
+
+    with op.batch_alter_table("comments") as batch_op:
+        batch_op.alter_column("like_count", existing_type=sa.Integer(), server_default="0")
+        batch_op.create_index("ix_comments_post_id_comment_date_comment_id", ["post_id", "comment_date", "comment_id"])
+
+    # new blog post columns - fanned_out is false for existing posts, so the feed reads them from the followers table
+    with op.batch_alter_table("blogposts") as batch_op:
+        batch_op.alter_column("like_count", existing_type=sa.Integer(), server_default="0")
+        batch_op.add_column(sa.Column("fanned_out", sa.Boolean(), nullable=False, server_default=sa.false()))
+        batch_op.add_column(sa.Column("search_vector", sa.Text().with_variant(TSVECTOR(), "postgresql"), nullable=True))
+        batch_op.create_index("ix_blogposts_posted_date_post_id", ["posted_date", "post_id"])
+        batch_op.create_index("ix_blogposts_author_id_posted_date", ["author_id", "posted_date", "post_id"])
+
+    # build the search index for the existing posts
+    if dialect == "postgresql":
+        op.execute(
+            "UPDATE blogposts SET search_vector = "
+            "setweight(to_tsvector('english', coalesce(post_title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(post_content, '')), 'B')"
+        )
+        op.create_index("ix_blogposts_search_vector", "blogposts", ["search_vector"], postgresql_using="gin")
+    elif dialect == "sqlite":
+        op.execute("CREATE VIRTUAL TABLE IF NOT EXISTS blogposts_fts USING fts5(post_title, post_content, tokenize='porter unicode61')")
+        op.execute("INSERT INTO blogposts_fts (rowid, post_title, post_content) SELECT post_id, post_title, post_content FROM blogposts")
+
+    # categories - link each post to the first category row with the same normalized name, then remove the other rows
+    op.create_table(
+        "post_categories",
+        sa.Column("post_id", sa.Integer(), nullable=False),
+        sa.Column("category_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["category_id"], ["categories.category_id"]),
+        sa.ForeignKeyConstraint(["post_id"], ["blogposts.post_id"]),
+        sa.PrimaryKeyConstraint("post_id", "category_id"),
+    )
+    op.create_index("ix_post_categories_category_id_post_id", "post_categories", ["category_id", "post_id"])
+
+    op.add_column("categories", sa.Column("name_normalized", sa.Text(), nullable=True))
+    op.execute("UPDATE categories SET name_normalized = lower(trim(category_name))")
+    op.execute(
+        "INSERT INTO post_categories (post_id, category_id) "
+        "SELECT DISTINCT c.post_id, (SELECT min(k.category_id) FROM categories k WHERE k.name_normalized = c.name_normalized) "
+        "FROM categories c WHERE c.post_id IS NOT NULL"
+    )
+    op.execute("DELETE FROM categories WHERE category_id NOT IN (SELECT min(category_id) FROM categories GROUP BY name_normalized)")
+
+    with op.batch_alter_table("categories") as batch_op:
+        batch_op.drop_column("post_id")
+        batch_op.alter_column("name_normalized", existing_type=sa.Text(), nullable=False)
+        batch_op.create_unique_constraint("categories_name_normalized_key", ["name_normalized"])
+        batch_op.create_index("ix_categories_name_normalized_pattern", ["name_normalized"], postgresql_ops={"name_normalized": "text_pattern_ops"})
+
+    # likes and follows - keep the first of any duplicate rows, then make them unique
+    op.execute(
+        "DELETE FROM likes WHERE post_id IS NOT NULL AND like_id NOT IN "
+        "(SELECT min(like_id) FROM likes WHERE post_id IS NOT NULL GROUP BY liker_id, post_id)"
+    )
+    op.execute(
+        "DELETE FROM likes WHERE comment_id IS NOT NULL AND like_id NOT IN "
+        "(SELECT min(like_id) FROM likes WHERE comment_id IS NOT NULL GROUP BY liker_id, comment_id)"
+    )
+    op.execute("DELETE FROM followers WHERE follow_id NOT IN (SELECT min(follow_id) FROM followers GROUP BY follower_id, followed_id)")
+
+    with op.batch_alter_table("likes") as batch_op:
+        batch_op.create_unique_constraint("uq_likes_liker_id_post_id", ["liker_id", "post_id"])
+        batch_op.create_unique_constraint("uq_likes_liker_id_comment_id", ["liker_id", "comment_id"])
+        batch_op.create_index("ix_likes_post_id_like_id", ["post_id", "like_id"])
+
+    with op.batch_alter_table("followers") as batch_op:
+        batch_op.create_unique_constraint("uq_followers_follower_id_followed_id", ["follower_id", "followed_id"])
+        batch_op.create_index("ix_followers_followed_id_follow_id", ["followed_id", "follow_id"])
+
+    # set every counter from the (deduplicated) likes and followers
+    op.execute("UPDATE blogposts SET like_count = (SELECT count(*) FROM likes WHERE likes.post_id = blogposts.post_id)")
+    op.execute("UPDATE comments SET like_count = (SELECT count(*) FROM likes WHERE likes.comment_id = comments.comment_id)")
+    op.execute("UPDATE users SET follower_count = (SELECT count(*) FROM followers WHERE followers.followed_id = users.user_id)")
+
+    # home feed timelines
+    op.create_table(
+        "timelines",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("post_id", sa.Integer(), nullable=False),
+        sa.Column("posted_date", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["post_id"], ["blogposts.post_id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.user_id"]),
+        sa.PrimaryKeyConstraint("user_id", "post_id"),
+    )
+    op.create_index("ix_timelines_user_id_posted_date_post_id", "timelines", ["user_id", "posted_date", "post_id"])
+
+
+def downgrade():
+    dialect = _dialect()
+
+    op.drop_index("ix_timelines_user_id_posted_date_post_id", table_name="timelines")
+    op.drop_table("timelines")
+
+    with op.batch_alter_table("followers") as batch_op:
+        batch_op.drop_index("ix_followers_followed_id_follow_id")
+        batch_op.drop_constraint("uq_followers_follower_id_followed_id", type_="unique")
+
+    with op.batch_alter_table("likes") as batch_op:
+        batch_op.drop_index("ix_likes_post_id_like_id")
+        batch_op.drop_constraint("uq_likes_liker_id_comment_id", type_="unique")
+        batch_op.drop_constraint("uq_likes_liker_id_post_id", type_="unique")
+
+    # categories - copy each category back onto one row per linked post, then remove the unlinked rows
+    with op.batch_alter_table("categories") as batch_op:
+        batch_op.drop_index("ix_categories_name_normalized_pattern")
+        batch_op.drop_constraint("categories_name_normalized_key", type_="unique")
+        batch_op.add_column(sa.Column("post_id", sa.Integer(), nullable=True))
+        batch_op.create_foreign_key("categories_post_id_fkey", "blogposts", ["post_id"], ["post_id"])
+
+    op.execute(
+        "INSERT INTO categories (category_name, name_normalized, post_id) "
+        "SELECT c.category_name, c.name_normalized, pc.post_id FROM post_categories pc JOIN categories c ON c.category_id = pc.category_id"
+    )
+    op.drop_index("ix_post_categories_category_id_post_id", table_name="post_categories")
+    op.drop_table("post_categories")
+    op.execute("DELETE FROM categories WHERE post_id IS NULL")
+
+    with op.batch_alter_table("categories") as batch_op:
+        batch_op.drop_column("name_normalized")
+
+    if dialect == "postgresql":
+        op.drop_index("ix_blogposts_search_vector", table_name="blogposts")
+    elif dialect == "sqlite":
+        op.execute("DROP TABLE IF EXISTS blogposts_fts")
+
+    with op.batch_alter_table("blogposts") as batch_op:
+        batch_op.drop_index("ix_blogposts_author_id_posted_date")
+        batch_op.drop_index("ix_blogposts_posted_date_post_id")
+        batch_op.drop_column("search_vector")
+        batch_op.drop_column("fanned_out")
+        batch_op.alter_column("like_count", existing_type=sa.Integer(), server_default=None)
+
+    with op.batch_alter_table("comments") as batch_op:
+        batch_op.drop_index("ix_comments_post_id_comment_date_comment_id")
+        batch_op.alter_column("like_count", existing_type=sa.Integer(), server_default=None)
+
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.alter_column("follower_count", existing_type=sa.Integer(), server_default=None)
@@ -0,0 +1,42 @@
+"""secondary indexes on the foreign key columns not covered by another index
+
+comments.author_id, likes.comment_id and timelines.post_id. The other foreign keys are the leading
+column of an existing index or unique constraint (e.g. likes.liker_id of uq_likes_liker_id_post_id,
+blogposts.author_id of ix_blogposts_author_id_posted_date), which serves the same lookups.
+On postgresql the indexes are built concurrently, so writes to the tables aren't blocked while they build.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:02
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+# (index name, table, columns)
+INDEXES = [
+    ("ix_comments_author_id", "comments", ["author_id"]),
+    ("ix_likes_comment_id", "likes", ["comment_id"]),
+    ("ix_timelines_post_id", "timelines", ["post_id"]),
+]
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,108 @@
+"""ON DELETE CASCADE foreign keys
+
+Deleting a user, post, comment or category now deletes the rows referencing it in the database: a post's comments,
+likes, category links and timeline entries, a comment's likes, and a user's posts, comments, likes, follows (both ways)
+and timeline. Rows left behind by earlier deletes (sqlite didn't enforce foreign keys) are removed first, and the
+like/follower counters recounted if any were.
+On postgresql the new constraints are added NOT VALID and validated afterwards, so the tables are only locked briefly.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:03
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+# (table, column, referred table, referred column) - parents before children, so orphans are removed in one pass
+FOREIGN_KEYS = [
+    ("blogposts", "author_id", "users", "user_id"),
+    ("comments", "author_id", "users", "user_id"),
+    ("comments", "post_id", "blogposts", "post_id"),
+    ("likes", "liker_id", "users", "user_id"),
+    ("likes", "post_id", "blogposts", "post_id"),
+    ("likes", "comment_id", "comments", "comment_id"),
+    ("followers", "follower_id", "users", "user_id"),
+    ("followers", "followed_id", "users", "user_id"),
+    ("post_categories", "post_id", "blogposts", "post_id"),
+    ("post_categories", "category_id", "categories", "category_id"),
+    ("timelines", "user_id", "users", "user_id"),
+    ("timelines", "post_id", "blogposts", "post_id"),
+]
+
+# the foreign keys were created without names - postgresql names them "<table>_<column>_fkey", and sqlite batch mode
+# reflects them with this naming convention, so both databases use the same names
+NAMING_CONVENTION = {"fk": "%(table_name)s_%(column_0_name)s_fkey"}
+
+
+# name of the database dialect the migration runs against
+def _dialect():
+    return op.get_bind().dialect.name
+
+
+def _constraint_name(table, column):
+    return f"{table}_{column}_fkey"
+
+
+# the tables of the foreign keys, in order, with their foreign keys
+def _by_table():
+    tables = {}
+    for table, column, referred_table, referred_column in FOREIGN_KEYS:
+        tables.setdefault(table, []).append((column, referred_table, referred_column))
+    return tables
+
+
+# replace every foreign key with one with the given ON DELETE action
+def _replace_foreign_keys(ondelete, not_valid):
+    for table, foreign_keys in _by_table().items():
+        with op.batch_alter_table(table, naming_convention=NAMING_CONVENTION) as batch_op:
+            for column, referred_table, referred_column in foreign_keys:
+                name = _constraint_name(table, column)
+                batch_op.drop_constraint(name, type_="foreignkey")
+                batch_op.create_foreign_key(
+                    name, referred_table, [column], [referred_column], ondelete=ondelete, postgresql_not_valid=not_valid
+                )
+
+
+def upgrade():
+    dialect = _dialect()
+    offline = op.get_context().as_sql
+
+    # remove rows pointing at rows that no longer exist, which the new constraints would reject
+    removed = 0
+    for table, column, referred_table, referred_column in FOREIGN_KEYS:
+        stmt = (
+            f"DELETE FROM {table} WHERE {column} IS NOT NULL AND NOT EXISTS "
+            f"(SELECT 1 FROM {referred_table} WHERE {referred_table}.{referred_column} = {table}.{column})"
+        )
+        if offline:
+            op.execute(stmt)
+        else:
+            removed += op.get_bind().execute(sa.text(stmt)).rowcount
+
+    # the row counts aren't known when writing the sql ("--sql"), so the counters are always recounted then
+    if removed or offline:
+        op.execute("UPDATE blogposts SET like_count = (SELECT count(*) FROM likes WHERE likes.post_id = blogposts.post_id)")
+        op.execute("UPDATE comments SET like_count = (SELECT count(*) FROM likes WHERE likes.comment_id = comments.comment_id)")
+        op.execute("UPDATE users SET follower_count = (SELECT count(*) FROM followers WHERE followers.followed_id = users.user_id)")
+
+    _replace_foreign_keys("CASCADE", not_valid=dialect == "postgresql")
+
+    # check the existing rows against the new constraints after the transaction that added them commits - validating
+    # doesn't block reads or writes
+    if dialect == "postgresql":
+        with op.get_context().autocommit_block():
+            for table, column, referred_table, referred_column in FOREIGN_KEYS:
+                op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {_constraint_name(table, column)}")
+
+
+def downgrade():
+    _replace_foreign_keys(None, not_valid=False)
@@ -0,0 +1,75 @@
+"""soft delete columns
+
+users.deleted_at, blogposts.deleted_at and comments.deleted_at, set when the row is deleted and hidden from every query
+until "flask db purge" removes it, with partial indexes holding only the deleted rows for the purge.
+Adding a nullable column without a default doesn't rewrite the table on postgresql, and the indexes are built
+concurrently, so writes to the tables aren't blocked.
+Downgrading deletes the rows waiting to be purged first, which would otherwise reappear.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:04
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+TABLES = ["users", "blogposts", "comments"]
+
+# the rows waiting to be purged: deleted users, posts deleted or written by them, and comments deleted, written by them
+# or on those posts
+DELETED_USERS = "SELECT user_id FROM users WHERE deleted_at IS NOT NULL"
+DELETED_POSTS = f"SELECT post_id FROM blogposts WHERE deleted_at IS NOT NULL OR author_id IN ({DELETED_USERS})"
+DELETED_COMMENTS = (
+    f"SELECT comment_id FROM comments WHERE deleted_at IS NOT NULL OR author_id IN ({DELETED_USERS}) OR post_id IN ({DELETED_POSTS})"
+)
+
+# delete the rows waiting to be purged, children first - sqlite's foreign keys are off while migrating, so nothing cascades
+PURGE = [
+    f"DELETE FROM likes WHERE liker_id IN ({DELETED_USERS}) OR post_id IN ({DELETED_POSTS}) OR comment_id IN ({DELETED_COMMENTS})",
+    f"DELETE FROM comments WHERE comment_id IN ({DELETED_COMMENTS})",
+    f"DELETE FROM post_categories WHERE post_id IN ({DELETED_POSTS})",
+    f"DELETE FROM timelines WHERE post_id IN ({DELETED_POSTS}) OR user_id IN ({DELETED_USERS})",
+    f"DELETE FROM followers WHERE follower_id IN ({DELETED_USERS}) OR followed_id IN ({DELETED_USERS})",
+    f"DELETE FROM blogposts WHERE post_id IN ({DELETED_POSTS})",
+    "DELETE FROM users WHERE deleted_at IS NOT NULL",
+    "UPDATE blogposts SET like_count = (SELECT count(*) FROM likes WHERE likes.post_id = blogposts.post_id)",
+    "UPDATE comments SET like_count = (SELECT count(*) FROM likes WHERE likes.comment_id = comments.comment_id)",
+    "UPDATE users SET follower_count = (SELECT count(*) FROM followers WHERE followers.followed_id = users.user_id)",
+]
+
+
+def upgrade():
+    for table in TABLES:
+        op.add_column(table, sa.Column("deleted_at", sa.DateTime(), nullable=True))
+
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.create_index(
+                f"ix_{table}_deleted_at", table, ["deleted_at"], postgresql_concurrently=True, if_not_exists=True,
+                postgresql_where=sa.text("deleted_at IS NOT NULL"), sqlite_where=sa.text("deleted_at IS NOT NULL")
+            )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute(f"DELETE FROM blogposts_fts WHERE rowid IN ({DELETED_POSTS})")
+    for stmt in PURGE:
+        op.execute(stmt)
+
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.drop_index(f"ix_{table}_deleted_at", table_name=table, postgresql_concurrently=True, if_exists=True)
+
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column("deleted_at")
@@ -0,0 +1,29 @@
+"""users.updated_date
+
+Set when a user updates their details. The conditional GETs of "/posts/<post_id>" and "/comments/<post_id>" include the
+newest update of the post's commenters, so renaming a commenter changes the ETag of the posts showing the name.
+Adding a nullable column without a default doesn't rewrite the table on postgresql.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 00:00:05
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("users", sa.Column("updated_date", sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("updated_date")
@@ -4,6 +4,6 @@ from models.categories import Category
 from models.comments import Comment
 from models.likes import Like
 from models.followers import Follower
-
+from models.timelines import Timeline
 
 
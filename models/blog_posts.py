@@ -1,23 +1,38 @@
 from main import db
+from sqlalchemy.dialects.postgresql import TSVECTOR
 
 class BlogPost(db.Model):
     # Define the name of the database table
     __tablename__ = "blogposts"
 
+    # index the (posted_date, post_id) sort key used for keyset pagination, the same key per author for the home feed,
+    # the full-text search vector with a GIN index on postgresql and the deleted posts waiting to be purged
+    __table_args__ = (
+        db.Index("ix_blogposts_posted_date_post_id", "posted_date", "post_id"),
+        db.Index("ix_blogposts_author_id_posted_date", "author_id", "posted_date", "post_id"),
+        db.Index("ix_blogposts_search_vector", "search_vector", postgresql_using="gin").ddl_if(dialect="postgresql"),
+        db.Index("ix_blogposts_deleted_at", "deleted_at", postgresql_where=db.text("deleted_at IS NOT NULL"), sqlite_where=db.text("deleted_at IS NOT NULL")),
+    )
+
     # define the columns of the blog post table
     post_id = db.Column(db.Integer, primary_key=True, nullable=False)  # unique identifier for the blog post
     post_title = db.Column(db.Text, nullable=False)  # title of the blog post
     post_content = db.Column(db.Text, nullable=False)  # content of the blog post
     posted_date = db.Column(db.DateTime, nullable=False)  # date when the post was created
     updated_date = db.Column(db.DateTime, nullable=False)  # date when the post was last updated
-    author_id = db.Column(db.Integer, db.ForeignKey("users.user_id"), nullable=False)  # ID of the author of the post
-    like_count = db.Column(db.Integer)  # count of likes on the post
+    author_id = db.Column(db.Integer, db.ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False)  # ID of the author of the post (deleted with the author)
+    like_count = db.Column(db.Integer, default=0, server_default="0")  # count of likes on the post, kept up to date by the likes controllers
+    fanned_out = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())  # whether the post was written to its author's followers' timelines when it was created
+    search_vector = db.deferred(db.Column(db.Text().with_variant(TSVECTOR(), "postgresql")))  # full-text search vector of the title and content (postgresql only, not loaded by default)
+    deleted_at = db.Column(db.DateTime)  # when the post was deleted - deleted posts are hidden from every query (see utils/soft_delete.py) until "flask db purge" removes them
 
     # define a relationship with the User model to retrieve author information
     author_info = db.relationship("User")
 
     # define a relationship with the Comment model, allowing cascade delete (when a post is deleted, its comments are deleted)
-    comments = db.relationship("Comment", cascade="all, delete")
+    # the database deletes them (ON DELETE CASCADE), so passive_deletes stops the ORM loading and deleting them one at a time
+    comments = db.relationship("Comment", cascade="all, delete", passive_deletes=True)
 
-    # define a relationship with the Category model, allowing cascade delete (when a post is deleted, its categories are deleted)
-    categories = db.relationship("Category", cascade="all, delete")
+    # define a many-to-many relationship with the Category model through the post_categories table
+    # (when a post is deleted, the database deletes its links to categories but the categories are kept for other posts)
+    categories = db.relationship("Category", secondary="post_categories", passive_deletes=True)
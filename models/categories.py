@@ -1,10 +1,23 @@
 from main import db
 
+# association table linking blog posts to categories (many-to-many) - a link is deleted with its post or category
+post_categories = db.Table(
+    "post_categories",
+    db.Column("post_id", db.Integer, db.ForeignKey("blogposts.post_id", ondelete="CASCADE"), primary_key=True),  # ID of the blog post
+    db.Column("category_id", db.Integer, db.ForeignKey("categories.category_id", ondelete="CASCADE"), primary_key=True),  # ID of the category
+    db.Index("ix_post_categories_category_id_post_id", "category_id", "post_id")  # index for finding the posts in a category
+)
+
 class Category(db.Model):
     # define the name of the database table
     __tablename__ = "categories"
 
+    # index the normalized name for prefix (LIKE 'abc%') lookups on postgresql
+    __table_args__ = (
+        db.Index("ix_categories_name_normalized_pattern", "name_normalized", postgresql_ops={"name_normalized": "text_pattern_ops"}),
+    )
+
     # define the columns of the category table
     category_id = db.Column(db.Integer, primary_key=True, nullable=False)  # unique identifier for the category
-    category_name = db.Column(db.Text, nullable=False)  # name of the category
-    post_id = db.Column(db.Integer, db.ForeignKey("blogposts.post_id"))  # ID of the associated blog post
\ No newline at end of file
+    category_name = db.Column(db.Text, nullable=False)  # name of the category, as first entered
+    name_normalized = db.Column(db.Text, nullable=False, unique=True)  # lowercased name of the category, used for lookups
\ No newline at end of file
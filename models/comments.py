@@ -4,14 +4,22 @@ class Comment(db.Model):
     # define the name of the database table
     __tablename__ = "comments"
 
+    # index comments by post and the (comment_date, comment_id) sort key used for keyset pagination, and the deleted
+    # comments waiting to be purged
+    __table_args__ = (
+        db.Index("ix_comments_post_id_comment_date_comment_id", "post_id", "comment_date", "comment_id"),
+        db.Index("ix_comments_deleted_at", "deleted_at", postgresql_where=db.text("deleted_at IS NOT NULL"), sqlite_where=db.text("deleted_at IS NOT NULL")),
+    )
+
     # define the columns of the comment table
     comment_id = db.Column(db.Integer, primary_key=True, nullable=False)  # unique identifier for the comment
     comment_text = db.Column(db.Text, nullable=False)  # text content of the comment
     comment_date = db.Column(db.DateTime, nullable=False)  # date and time when the comment was created
     updated_date = db.Column(db.DateTime)  # date and time when the comment was last updated (nullable)
-    author_id = db.Column(db.Integer, db.ForeignKey("users.user_id"), nullable=False)  # ID of the comment author
-    post_id = db.Column(db.Integer, db.ForeignKey("blogposts.post_id"), nullable=False)  # ID of the associated blog post
-    like_count = db.Column(db.Integer)  # count of likes received by this comment
+    author_id = db.Column(db.Integer, db.ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False, index=True)  # ID of the comment author (indexed for listing a user's comments, deleted with the author)
+    post_id = db.Column(db.Integer, db.ForeignKey("blogposts.post_id", ondelete="CASCADE"), nullable=False)  # ID of the associated blog post (deleted with the post)
+    like_count = db.Column(db.Integer, default=0, server_default="0")  # count of likes received by this comment, kept up to date by the likes controllers
+    deleted_at = db.Column(db.DateTime)  # when the comment was deleted - deleted comments are hidden from every query (see utils/soft_delete.py) until "flask db purge" removes them
 
     # define a relationship with the User model to retrieve comment author information
     author_info = db.relationship(
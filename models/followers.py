@@ -4,11 +4,20 @@ class Follower(db.Model):
     # define the name of the database table associated with this model
     __tablename__ = "followers"
 
+    # index followers by followed user and follow_id, the sort key used for keyset pagination
+    # a user can follow another user once
+    __table_args__ = (
+        db.Index("ix_followers_followed_id_follow_id", "followed_id", "follow_id"),
+        db.UniqueConstraint("follower_id", "followed_id", name="uq_followers_follower_id_followed_id"),
+    )
+
     # unique identifier for each follower relationship
     follow_id = db.Column(db.Integer, primary_key=True, nullable=False)
 
+    # the database deletes a follow when either user is deleted (ON DELETE CASCADE)
+
     # ID of the user who is following another user (foreign key to the "users" table)
-    follower_id = db.Column(db.Integer, db.ForeignKey("users.user_id"), nullable=False)
+    follower_id = db.Column(db.Integer, db.ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False)
 
     # ID of the user being followed (foreign key to the "users" table)
-    followed_id = db.Column(db.Integer, db.ForeignKey("users.user_id"), nullable=False)
\ No newline at end of file
+    followed_id = db.Column(db.Integer, db.ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False)
\ No newline at end of file
@@ -4,17 +4,27 @@ class Like(db.Model):
     # define the name of the database table associated with this model
     __tablename__ = "likes"
 
+    # index likes by post and like_id, the sort key used for keyset pagination
+    # a user can like each post and each comment once (NULL post/comment ids don't conflict)
+    __table_args__ = (
+        db.Index("ix_likes_post_id_like_id", "post_id", "like_id"),
+        db.UniqueConstraint("liker_id", "post_id", name="uq_likes_liker_id_post_id"),
+        db.UniqueConstraint("liker_id", "comment_id", name="uq_likes_liker_id_comment_id"),
+    )
+
     # unique identifier for each like
     like_id = db.Column(db.Integer, primary_key=True)
 
+    # the database deletes a like with its user, post or comment (ON DELETE CASCADE)
+
     # ID of the user who performed the like (foreign key to the "users" table)
-    liker_id = db.Column(db.Integer, db.ForeignKey("users.user_id"), nullable=False)
+    liker_id = db.Column(db.Integer, db.ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False)
 
     # ID of the blog post that was liked (foreign key to the "blogposts" table)
-    post_id = db.Column(db.Integer, db.ForeignKey("blogposts.post_id"))
+    post_id = db.Column(db.Integer, db.ForeignKey("blogposts.post_id", ondelete="CASCADE"))
 
-    # ID of the comment that was liked (foreign key to the "comments" table)
-    comment_id = db.Column(db.Integer, db.ForeignKey("comments.comment_id"))
+    # ID of the comment that was liked (foreign key to the "comments" table, indexed for counting and deleting a comment's likes)
+    comment_id = db.Column(db.Integer, db.ForeignKey("comments.comment_id", ondelete="CASCADE"), index=True)
 
     # establish a relationship with the user who performed the like (overlaps with "likes" relationship in User model)
     liker_info = db.relationship(
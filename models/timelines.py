@@ -0,0 +1,21 @@
+from main import db
+
+class Timeline(db.Model):
+    # define the name of the database table associated with this model
+    # each row is a post written ("fanned out") to the home feed of one of its author's followers when it was created
+    __tablename__ = "timelines"
+
+    # index each user's timeline by the (posted_date, post_id) sort key used for keyset pagination
+    __table_args__ = (
+        db.Index("ix_timelines_user_id_posted_date_post_id", "user_id", "posted_date", "post_id"),
+    )
+
+    # ID of the user whose feed contains the post (foreign key to the "users" table, deleted with the user)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.user_id", ondelete="CASCADE"), primary_key=True)
+
+    # ID of the post in the feed (foreign key to the "blogposts" table, indexed for the database to remove a deleted post
+    # from every timeline)
+    post_id = db.Column(db.Integer, db.ForeignKey("blogposts.post_id", ondelete="CASCADE"), primary_key=True, index=True)
+
+    # copy of the post's posted_date, so a page of the timeline can be read from the index alone
+    posted_date = db.Column(db.DateTime, nullable=False)
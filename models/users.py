@@ -4,6 +4,11 @@ class User(db.Model):
     # define the name of the database table associated with this model
     __tablename__ = "users"
 
+    # index the deleted users waiting to be purged
+    __table_args__ = (
+        db.Index("ix_users_deleted_at", "deleted_at", postgresql_where=db.text("deleted_at IS NOT NULL"), sqlite_where=db.text("deleted_at IS NOT NULL")),
+    )
+
     # unique identifier for each user
     user_id = db.Column(db.Integer, primary_key=True)
 
@@ -16,28 +21,42 @@ class User(db.Model):
     # user's hashed password
     password = db.Column(db.Text, nullable=False)
 
-    # count of followers for this user
-    follower_count = db.Column(db.Integer)
+    # count of followers for this user, kept up to date by the followers controllers
+    follower_count = db.Column(db.Integer, default=0, server_default="0")
+
+    # date and time when the user last updated their details (nullable) - posts and comments show the user's name, so
+    # their conditional GETs check it
+    updated_date = db.Column(db.DateTime)
+
+    # when the user deleted their account - deleted users are hidden from every query (see utils/soft_delete.py) until
+    # "flask db purge" removes them
+    deleted_at = db.Column(db.DateTime)
+
+    # the relationships below are deleted with the user by the database (ON DELETE CASCADE foreign keys), so
+    # passive_deletes stops the ORM loading and deleting every row itself
 
     # define a one-to-many relationship with blog posts authored by this user
     blog_posts = db.relationship(
         "BlogPost", 
         back_populates="author_info",
-        cascade="all, delete"
+        cascade="all, delete",
+        passive_deletes=True
     )
 
     # define a one-to-many relationship with followers (users who follow this user).
     followers = db.relationship( 
         "Follower",
         primaryjoin="User.user_id==Follower.followed_id",
-        cascade="all, delete"
+        cascade="all, delete",
+        passive_deletes=True
     )
 
     # define a one-to-many relationship with likes (likes created by this user).
     likes = db.relationship(
         "Like",
         primaryjoin="User.user_id==Like.liker_id",
-        cascade="all, delete"
+        cascade="all, delete",
+        passive_deletes=True
     )
 
 
@@ -4,7 +4,7 @@ from marshmallow import fields, validate
 class CategorySchema(ma.Schema):
     
     class Meta:
-        fields = "category_id", "category_name", "post_id"
+        fields = "category_id", "category_name"
 
 category_schema = CategorySchema()
 categories_schema = CategorySchema(many=True)
\ No newline at end of file
@@ -0,0 +1,17 @@
+from functools import lru_cache
+
+
+# return a schema for a projection (only) of a schema class, building it once and reusing it for later requests
+# building a schema copies its fields and resolves nested schemas for the 'only' list, which costs more than
+# dumping a few objects; dumping keeps no state between calls, so one schema can be shared by every request
+def get_schema(schema_class, only=None, many=False):
+    # sort the fields so the same projection in a different order shares one schema
+    if only is not None:
+        only = tuple(sorted(set(only)))
+    return _build_schema(schema_class, only, many)
+
+
+# the number of cached schemas is bounded, since '?fields=' lets clients request many different projections
+@lru_cache(maxsize=512)
+def _build_schema(schema_class, only, many):
+    return schema_class(only=only, many=many)
@@ -0,0 +1,30 @@
+# the app, client and max_queries fixtures, with query budgets enforced on every request
+pytest_plugins = ["utils.pytest_plugin"]
+
+import pytest
+
+
+PASSWORD = "Password.123"
+
+
+# register a user, returning the Authorization header for their requests
+@pytest.fixture
+def sign_up(client):
+    def sign_up(name="Test User", email="test@example.com"):
+        response = client.post("/auth/register", json={"name": name, "email": email, "password": PASSWORD})
+        assert response.status_code == 200, response.get_json()
+        return {"Authorization": f"Bearer {response.get_json()['token']}"}
+
+    return sign_up
+
+
+# create a post as a user, returning its post_id
+@pytest.fixture
+def new_post(client):
+    def new_post(headers, title="Test post", categories=()):
+        body = {"post_title": title, "post_content": "Test post content", "categories": list(categories)}
+        response = client.post("/posts/", json=body, headers=headers)
+        assert response.status_code == 200, response.get_json()
+        return response.get_json()["post_id"]
+
+    return new_post
@@ -0,0 +1,53 @@
+from main import cache
+from utils.cache import LRUCache
+
+
+# every variant counts against max_entries, and the least recently used keys are evicted with all their variants
+def test_lru_cache_counts_variants():
+    lru = LRUCache(max_entries=3, ttl=60)
+    lru.set("post:1", "a", b"1a")
+    lru.set("post:1", "b", b"1b")
+    lru.set("post:2", "a", b"2a")
+    assert len(lru) == 3
+
+    lru.set("post:3", "a", b"3a")
+    assert len(lru) == 2
+    assert lru.get("post:1", "a") is None and lru.get("post:2", "a") == b"2a"
+
+    lru.delete("post:2", "post:3")
+    assert len(lru) == 0
+
+
+# only the checked fields, limit and cursor make a new variant - other query parameters share the cached response
+def test_cached_view_variants(app, client, sign_up, new_post):
+    app.config["CACHE_BACKEND"] = "memory"
+    cache.init_app(app)
+    post_id = new_post(sign_up())
+
+    assert client.get(f"/posts/{post_id}").headers["X-Cache"] == "MISS"
+    assert client.get(f"/posts/{post_id}?utm_source=feed").headers["X-Cache"] == "HIT"
+    assert client.get(f"/posts/{post_id}?fields=post_title").headers["X-Cache"] == "MISS"
+    assert client.get(f"/posts/{post_id}?fields=post_title,").headers["X-Cache"] == "HIT"
+    assert client.get(f"/posts/{post_id}?fields=nope").status_code == 400
+    assert len(cache.backend) == 2
+
+
+# a follow only removes the followed user's cached profile - the cached post doesn't show their follower_count
+def test_follow_keeps_cached_posts(app, client, sign_up, new_post, max_queries):
+    app.config["CACHE_BACKEND"] = "memory"
+    cache.init_app(app)
+    author = sign_up("Author", "author@example.com")
+    follower = sign_up("Follower", "follower@example.com")
+    post_id = new_post(author)
+
+    response = client.get(f"/posts/{post_id}")
+    assert "follower_count" not in response.get_json()[0]["author_info"]
+    assert client.get(f"/posts/{post_id}?fields=author_info.follower_count").status_code == 400
+    assert client.get("/users/1").get_json()["follower_count"] == 0
+
+    with max_queries(4):
+        assert client.post("/followers/1", headers=follower).status_code == 200
+    assert client.get(f"/posts/{post_id}").headers["X-Cache"] == "HIT"
+    response = client.get("/users/1")
+    assert response.headers["X-Cache"] == "MISS"
+    assert response.get_json()["follower_count"] == 1
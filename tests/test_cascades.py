@@ -0,0 +1,87 @@
+from main import db
+from models.blog_posts import BlogPost
+from models.comments import Comment
+from models.users import User
+
+
+# the number of rows in each table referencing posts, comments or users
+def row_counts():
+    tables = ["blogposts", "comments", "likes", "followers", "post_categories", "timelines", "users"]
+    return {table: db.session.scalar(db.text(f"SELECT count(*) FROM {table}")) for table in tables}
+
+
+# an author (user 1) with a post in two categories, commented on and liked by 10 readers who follow the author, with
+# every comment liked - the post is fanned out to the readers' timelines
+def populate(app, client, sign_up, new_post, readers=10):
+    app.config["FEED_FANOUT_THRESHOLD"] = 1000
+    author = sign_up("Author", "author@example.com")
+    headers = [sign_up(f"Reader {i}", f"reader{i}@example.com") for i in range(readers)]
+    for reader in headers:
+        client.post("/followers/1", headers=reader)
+    post_id = new_post(author, categories=["Sports", "News"])
+
+    for reader in headers:
+        comment_id = client.post(f"/comments/{post_id}", json={"comment_text": "Comment"}, headers=reader).get_json()["comment_id"]
+        client.post(f"/likes/post/{post_id}", headers=reader)
+        client.post(f"/likes/comment/{comment_id}", headers=author)
+
+    # start from an empty session, so no child rows are already loaded
+    db.session.remove()
+    return post_id, headers
+
+
+# deleting a post through the ORM is one DELETE - the database removes its comments, their likes, the post's likes,
+# category links and timeline entries, and the ORM doesn't load any of them
+def test_delete_post_cascades_in_the_database(app, client, sign_up, new_post, max_queries):
+    post_id, _ = populate(app, client, sign_up, new_post)
+    assert row_counts() == {
+        "blogposts": 1, "comments": 10, "likes": 20, "followers": 10, "post_categories": 2, "timelines": 10, "users": 11,
+    }
+
+    post = db.session.get(BlogPost, post_id)
+    with max_queries(1) as statements:
+        db.session.delete(post)
+        db.session.commit()
+
+    assert statements[0].lstrip().startswith("DELETE FROM blogposts")
+    assert row_counts() == {
+        "blogposts": 0, "comments": 0, "likes": 0, "followers": 10, "post_categories": 0, "timelines": 0, "users": 11,
+    }
+    # the categories themselves are kept for other posts
+    assert db.session.scalar(db.text("SELECT count(*) FROM categories")) == 2
+
+
+# deleting a comment removes its likes
+def test_delete_comment_cascades_to_likes(app, client, sign_up, new_post, max_queries):
+    populate(app, client, sign_up, new_post, readers=2)
+
+    comment = db.session.get(Comment, 1)
+    with max_queries(1):
+        db.session.delete(comment)
+        db.session.commit()
+
+    assert db.session.scalar(db.text("SELECT count(*) FROM likes WHERE comment_id IS NOT NULL")) == 1
+    assert row_counts()["comments"] == 1
+
+
+# deleting a user removes their posts (with everything referencing them), comments, likes and follows in both directions
+def test_delete_user_cascades_in_the_database(app, client, sign_up, new_post, max_queries):
+    _, readers = populate(app, client, sign_up, new_post, readers=3)
+    client.post("/followers/3", headers=readers[0])
+    db.session.remove()
+
+    # the author, whose post everything else is attached to
+    author = db.session.get(User, 1)
+    with max_queries(1):
+        db.session.delete(author)
+        db.session.commit()
+    assert row_counts() == {
+        "blogposts": 0, "comments": 0, "likes": 0, "followers": 1, "post_categories": 0, "timelines": 0, "users": 3,
+    }
+
+    # a reader who follows another reader
+    reader = db.session.get(User, 2)
+    with max_queries(1):
+        db.session.delete(reader)
+        db.session.commit()
+    assert row_counts()["followers"] == 0
@@ -0,0 +1,20 @@
+# creating a post or adding a category runs the same statements however many of its categories are new
+def test_create_post_with_new_categories(client, sign_up, max_queries):
+    headers = sign_up()
+    body = {"post_title": "Post", "post_content": "Content", "categories": ["One", "Two", "Three", "Four", "Five", "one"]}
+
+    with max_queries(10):
+        response = client.post("/posts/", json=body, headers=headers)
+    assert response.status_code == 200
+
+    post = client.get(f"/posts/{response.get_json()['post_id']}").get_json()[0]
+    assert post["categories"] == ["One", "Two", "Three", "Four", "Five"]
+
+
+def test_new_category(client, sign_up, new_post):
+    headers = sign_up()
+    post_id = new_post(headers, categories=["Sports"])
+
+    assert client.post(f"/category/{post_id}", json={"category": "Music"}, headers=headers).status_code == 200
+    assert client.post(f"/category/{post_id}", json={"category": " music"}, headers=headers).status_code == 400
+    assert client.get(f"/posts/{post_id}").get_json()[0]["categories"] == ["Sports", "Music"]
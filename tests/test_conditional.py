@@ -0,0 +1,34 @@
+# renaming a commenter changes the etags of the post and its comments, so clients don't keep showing the old name
+def test_commenter_rename_changes_etags(client, sign_up, new_post):
+    author = sign_up("Author", "author@example.com")
+    commenter = sign_up("Commenter", "commenter@example.com")
+    post_id = new_post(author)
+    client.post(f"/comments/{post_id}", json={"comment_text": "Nice post"}, headers=commenter)
+
+    urls = [f"/posts/{post_id}", f"/comments/{post_id}"]
+    etags = {url: client.get(url).headers["ETag"] for url in urls}
+    for url in urls:
+        assert client.get(url, headers={"If-None-Match": etags[url]}).status_code == 304
+
+    assert client.put("/users/", json={"name": "Renamed"}, headers=commenter).status_code == 200
+
+    for url in urls:
+        response = client.get(url, headers={"If-None-Match": etags[url]})
+        assert response.status_code == 200
+        assert "Renamed" in response.get_data(as_text=True)
+
+
+# a like changes the response without updating any date, so If-Modified-Since can't answer 304
+def test_like_is_not_hidden_by_if_modified_since(client, sign_up, new_post):
+    author = sign_up("Author", "author@example.com")
+    post_id = new_post(author)
+    response = client.get(f"/posts/{post_id}")
+    assert "Last-Modified" not in response.headers
+
+    assert client.post(f"/likes/post/{post_id}", headers=author).status_code in (200, 201)
+    response = client.get(f"/posts/{post_id}", headers={"If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"})
+    assert response.status_code == 200
+    assert response.get_json()[0]["like_count"] == 1
+
+    # the etag follows the like
+    assert client.get(f"/posts/{post_id}", headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
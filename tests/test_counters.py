@@ -0,0 +1,56 @@
+from main import db
+from models.blog_posts import BlogPost
+from models.comments import Comment
+from models.users import User
+
+
+# the like and follower counts shown by the api
+def counts(client, post_id):
+    post = client.get(f"/posts/{post_id}").get_json()[0]
+    return post["like_count"], post["comments"][0]["like_count"], client.get("/users/1").get_json()["follower_count"]
+
+
+# likes, unlikes, follows and unfollows keep the stored counters in step with the rows, including repeated requests
+def test_counters_follow_likes_and_follows(client, sign_up, new_post):
+    author = sign_up("Author", "author@example.com")
+    readers = [sign_up(f"Reader {i}", f"reader{i}@example.com") for i in range(3)]
+    post_id = new_post(author)
+    comment_id = client.post(f"/comments/{post_id}", json={"comment_text": "Comment"}, headers=author).get_json()["comment_id"]
+
+    for headers in readers:
+        assert client.post(f"/likes/post/{post_id}", headers=headers).status_code == 200
+        assert client.post(f"/likes/comment/{comment_id}", headers=headers).status_code == 200
+        assert client.post("/followers/1", headers=headers).status_code == 200
+    assert counts(client, post_id) == (3, 3, 3)
+
+    # repeating a like or follow doesn't count it twice
+    assert client.post(f"/likes/post/{post_id}", headers=readers[0]).status_code == 400
+    assert client.post("/followers/1", headers=readers[0]).status_code == 400
+    assert counts(client, post_id) == (3, 3, 3)
+
+    assert client.delete(f"/likes/post/{post_id}", headers=readers[0]).status_code == 200
+    assert client.delete(f"/likes/comment/{comment_id}", headers=readers[1]).status_code == 200
+    assert client.delete("/followers/1", headers=readers[2]).status_code == 200
+    assert counts(client, post_id) == (2, 2, 2)
+
+
+# "flask db recount" rebuilds counters that drifted from the likes and followers tables
+def test_recount_command_repairs_drift(app, client, sign_up, new_post):
+    author = sign_up("Author", "author@example.com")
+    reader = sign_up("Reader", "reader@example.com")
+    post_id = new_post(author)
+    comment_id = client.post(f"/comments/{post_id}", json={"comment_text": "Comment"}, headers=author).get_json()["comment_id"]
+    client.post(f"/likes/post/{post_id}", headers=reader)
+    client.post(f"/likes/comment/{comment_id}", headers=reader)
+    client.post("/followers/1", headers=reader)
+
+    # corrupt the counters behind the api's back
+    db.session.execute(db.update(BlogPost).values(like_count=7))
+    db.session.execute(db.update(Comment).values(like_count=None))
+    db.session.execute(db.update(User).values(follower_count=-2))
+    db.session.commit()
+    assert counts(client, post_id) == (7, None, -2)
+
+    result = app.test_cli_runner().invoke(args=["db", "recount"])
+    assert result.exit_code == 0, result.output
+    assert counts(client, post_id) == (1, 1, 1)
@@ -0,0 +1,91 @@
+import pytest
+
+from main import db
+from models.blog_posts import BlogPost
+from models.timelines import Timeline
+
+
+# follow next_cursor through every page of a user's feed, returning the post ids
+def feed_ids(client, headers, limit=2):
+    ids, cursor = [], None
+    while True:
+        url = f"/feed/?limit={limit}" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200, response.get_json()
+        page = response.get_json()
+        assert len(page["posts"]) <= limit
+        ids.extend(post["post_id"] for post in page["posts"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+def timeline_ids(user_id):
+    return set(db.session.scalars(db.select(Timeline.post_id).filter_by(user_id=user_id)))
+
+
+# a reader (user 1) following two authors (users 2 and 3), and a third author (user 4) nobody follows
+@pytest.fixture
+def users(sign_up):
+    return [sign_up(f"User {i}", f"user{i}@example.com") for i in range(4)]
+
+
+# the feed pages through the posts of followed authors only, newest first, whether posts are pulled or fanned out
+# a threshold of 0 reads every post through the followers table, 1000 fans every post out to the timelines
+@pytest.mark.parametrize("threshold", [0, 1000])
+def test_feed_shows_followed_authors(app, client, users, new_post, threshold):
+    app.config["FEED_FANOUT_THRESHOLD"] = threshold
+    reader, first, second, other = users
+    client.post("/followers/2", headers=reader)
+    client.post("/followers/3", headers=reader)
+
+    post_ids = [new_post(author, f"Post {i}") for i, author in enumerate([first, second, other, first, second, other])]
+    followed = [post_id for post_id, author in zip(post_ids, [2, 3, 4, 2, 3, 4]) if author != 4]
+
+    assert feed_ids(client, reader) == followed[::-1]
+    assert timeline_ids(1) == (set(followed) if threshold else set())
+    # the authors don't follow anyone, so their feeds are empty
+    assert feed_ids(client, first) == []
+
+
+# following an author adds their earlier fanned out posts to the feed, unfollowing removes them
+@pytest.mark.parametrize("threshold", [0, 1000])
+def test_feed_backfill_and_unfollow(app, client, users, new_post, threshold):
+    app.config["FEED_FANOUT_THRESHOLD"] = threshold
+    reader, first, second, _ = users
+    client.post("/followers/3", headers=reader)
+    earlier = [new_post(first, "Earlier 1"), new_post(first, "Earlier 2")]
+    assert feed_ids(client, reader) == []
+
+    client.post("/followers/2", headers=reader)
+    later = new_post(second, "Later")
+    assert feed_ids(client, reader) == [later] + earlier[::-1]
+    assert timeline_ids(1) == ({later, *earlier} if threshold else set())
+
+    client.delete("/followers/2", headers=reader)
+    assert feed_ids(client, reader) == [later]
+    assert timeline_ids(1) == ({later} if threshold else set())
+
+
+# with a threshold of 1, posts by an author with one follower are fanned out and posts by an author with two are pulled
+# the feed merges both sources into one order
+def test_feed_merges_fanned_out_and_pulled_posts(app, client, users, new_post):
+    app.config["FEED_FANOUT_THRESHOLD"] = 1
+    reader, first, second, other = users
+    client.post("/followers/2", headers=reader)
+    client.post("/followers/3", headers=reader)
+    client.post("/followers/3", headers=other)
+
+    post_ids = [new_post(author, f"Post {i}") for i, author in enumerate([first, second, first, second])]
+    fanned_out = dict(db.session.execute(db.select(BlogPost.post_id, BlogPost.fanned_out)).all())
+
+    assert [fanned_out[post_id] for post_id in post_ids] == [True, False, True, False]
+    assert timeline_ids(1) == {post_ids[0], post_ids[2]}
+    assert feed_ids(client, reader, limit=1) == post_ids[::-1]
+    assert feed_ids(client, other) == [post_ids[3], post_ids[1]]
+
+
+# the feed needs a signed in user and a valid cursor
+def test_feed_errors(client, users):
+    assert client.get("/feed/").status_code == 401
+    assert client.get("/feed/?cursor=not-a-cursor", headers=users[0]).status_code == 400
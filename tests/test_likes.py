@@ -0,0 +1,91 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from main import db
+from models.followers import Follower
+from models.likes import Like
+
+
+# the number of like and follow rows in the database
+def rows(model, **filters):
+    return db.session.scalar(db.select(db.func.count()).select_from(model).filter_by(**filters))
+
+
+# a repeated like or follow is rejected with a single INSERT ... ON CONFLICT DO NOTHING, leaving one row
+def test_duplicate_like_and_follow(client, sign_up, new_post, max_queries):
+    author = sign_up("Author", "author@example.com")
+    reader = sign_up("Reader", "reader@example.com")
+    post_id = new_post(author)
+    comment_id = client.post(f"/comments/{post_id}", json={"comment_text": "Comment"}, headers=author).get_json()["comment_id"]
+
+    for url in (f"/likes/post/{post_id}", f"/likes/comment/{comment_id}", "/followers/1"):
+        assert client.post(url, headers=reader).status_code == 200
+        with max_queries(2) as statements:
+            response = client.post(url, headers=reader)
+        assert response.status_code == 400
+        assert not any(statement.lstrip().upper().startswith("SELECT") for statement in statements)
+
+    assert rows(Like, liker_id=2, post_id=post_id) == 1
+    assert rows(Like, liker_id=2, comment_id=comment_id) == 1
+    assert rows(Follower, follower_id=2, followed_id=1) == 1
+
+
+# liking or following something that doesn't exist is a 404, and following yourself is a 400
+def test_like_and_follow_missing_targets(client, sign_up):
+    reader = sign_up("Reader", "reader@example.com")
+    assert client.post("/likes/post/99", headers=reader).status_code == 404
+    assert client.post("/likes/comment/99", headers=reader).status_code == 404
+    assert client.post("/likes/post/99/toggle", headers=reader).status_code == 404
+    assert client.post("/followers/99", headers=reader).status_code == 404
+    assert client.post("/followers/1", headers=reader).status_code == 400
+    assert rows(Like) == rows(Follower) == 0
+
+
+# the unique constraints reject duplicates that bypass the endpoints
+@pytest.mark.parametrize("model, values", [
+    (Like, {"liker_id": 2, "post_id": 1}),
+    (Like, {"liker_id": 2, "comment_id": 1}),
+    (Follower, {"follower_id": 2, "followed_id": 1}),
+])
+def test_unique_constraints(client, sign_up, new_post, model, values):
+    author = sign_up("Author", "author@example.com")
+    sign_up("Reader", "reader@example.com")
+    post_id = new_post(author)
+    client.post(f"/comments/{post_id}", json={"comment_text": "Comment"}, headers=author)
+
+    db.session.add(model(**values))
+    db.session.commit()
+    db.session.add(model(**values))
+    with pytest.raises(IntegrityError):
+        db.session.commit()
+    db.session.rollback()
+
+
+# toggling likes, then unlikes, keeping like_count and the rows in step
+@pytest.mark.parametrize("kind", ["post", "comment"])
+def test_toggle_like(client, sign_up, new_post, kind):
+    author = sign_up("Author", "author@example.com")
+    reader = sign_up("Reader", "reader@example.com")
+    post_id = new_post(author)
+    comment_id = client.post(f"/comments/{post_id}", json={"comment_text": "Comment"}, headers=author).get_json()["comment_id"]
+    target_id = post_id if kind == "post" else comment_id
+
+    def like_count():
+        post = client.get(f"/posts/{post_id}").get_json()[0]
+        return post["like_count"] if kind == "post" else post["comments"][0]["like_count"]
+
+    response = client.post(f"/likes/{kind}/{target_id}/toggle", headers=reader)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["liked"] is True and body["message"] == f"{kind} liked"
+    assert like_count() == 1 and rows(Like, liker_id=2) == 1
+
+    response = client.post(f"/likes/{kind}/{target_id}/toggle", headers=reader)
+    assert response.status_code == 200
+    assert response.get_json() == {"message": f"{kind} unliked", "liked": False, "like_id": body["like_id"]}
+    assert like_count() == 0 and rows(Like, liker_id=2) == 0
+
+    # the toggled like can be liked again, and removed by the plain endpoints
+    assert client.post(f"/likes/{kind}/{target_id}/toggle", headers=reader).get_json()["liked"] is True
+    assert client.delete(f"/likes/{kind}/{target_id}", headers=reader).status_code == 200
+    assert like_count() == 0 and rows(Like, liker_id=2) == 0
@@ -0,0 +1,93 @@
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+
+from main import db
+
+
+# rows written by the api before migrations were added - counters left unset, categories stored once per post in
+# mixed case, a duplicated like and follow, and a like on a comment that was deleted without its likes
+BASELINE_ROWS = [
+    "INSERT INTO users (user_id, name, email, password) VALUES (1, 'Author', 'author@example.com', 'x'), "
+    "(2, 'Reader', 'reader@example.com', 'x'), (3, 'Other', 'other@example.com', 'x')",
+    "INSERT INTO blogposts (post_id, post_title, post_content, posted_date, updated_date, author_id) VALUES "
+    "(1, 'Football season', 'The football season starts', '2026-01-01 00:00:00', '2026-01-01 00:00:00', 1), "
+    "(2, 'Baking bread', 'Sourdough takes time', '2026-01-02 00:00:00', '2026-01-02 00:00:00', 1)",
+    "INSERT INTO categories (category_id, category_name, post_id) VALUES (1, 'Sports', 1), (2, ' sports ', 2), (3, 'Food', 2)",
+    "INSERT INTO comments (comment_id, comment_text, comment_date, author_id, post_id) VALUES "
+    "(1, 'Great post', '2026-01-03 00:00:00', 2, 1)",
+    "INSERT INTO likes (like_id, liker_id, post_id, comment_id) VALUES "
+    "(1, 2, 1, NULL), (2, 2, 1, NULL), (3, 3, 1, NULL), (4, 3, NULL, 1), (5, 2, NULL, 99)",
+    "INSERT INTO followers (follow_id, follower_id, followed_id) VALUES (1, 2, 1), (2, 2, 1), (3, 3, 1)",
+]
+
+
+def run(cli, *args):
+    result = cli.invoke(args=["db", *args])
+    assert result.exit_code == 0, result.output
+    return result.output
+
+
+# a database created by "flask db create" before migrations were added (no alembic_version table), with data
+# written while sqlite didn't enforce foreign keys (the pragma must run outside a transaction)
+def create_baseline(cli):
+    db.drop_all(bind_key=None)
+    run(cli, "upgrade", "0001")
+    with db.engine.connect() as connection:
+        connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        connection.commit()
+        connection.exec_driver_sql("DROP TABLE alembic_version")
+        for statement in BASELINE_ROWS:
+            connection.exec_driver_sql(statement)
+        connection.commit()
+        connection.exec_driver_sql("PRAGMA foreign_keys=ON")
+        connection.commit()
+
+
+# "flask db upgrade" recognises the baseline database and migrates it to the models' schema, keeping its data
+def test_upgrade_populated_baseline(app, client):
+    cli = app.test_cli_runner()
+    create_baseline(cli)
+
+    assert "Existing tables marked as revision 0001" in run(cli, "upgrade")
+
+    # the migrated schema matches the models, including the secondary indexes (the search index differs on sqlite, as
+    # migrations/env.py skips when autogenerating)
+    with db.engine.connect() as connection:
+        context = MigrationContext.configure(connection, opts={"compare_type": True})
+        differences = [
+            diff for diff in compare_metadata(context, db.metadata)
+            if "blogposts_fts" not in str(diff) and "ix_blogposts_search_vector" not in str(diff)
+        ]
+        assert differences == []
+        indexes = {index["name"] for table in ("comments", "likes") for index in db.inspect(connection).get_indexes(table)}
+    assert {"ix_comments_author_id", "ix_likes_comment_id"} <= indexes
+
+    # the posts, comments and users are kept, with the duplicates and the orphaned like removed and the counters recounted
+    first, second = client.get("/posts/1").get_json()[0], client.get("/posts/2").get_json()[0]
+    assert (first["post_title"], first["like_count"], first["categories"]) == ("Football season", 2, ["Sports"])
+    assert sorted(second["categories"]) == ["Food", "Sports"]
+    assert [(comment["comment_text"], comment["like_count"]) for comment in first["comments"]] == [("Great post", 1)]
+    assert client.get("/users/1").get_json()["follower_count"] == 2
+    assert db.session.scalar(db.text("SELECT count(*) FROM likes")) == 3
+    assert db.session.scalar(db.text("SELECT count(*) FROM categories")) == 2
+
+    # the existing posts are searchable and listed by category
+    assert [post["post_id"] for post in client.get("/posts/search?q=sourdough").get_json()["posts"]] == [2]
+    assert len(client.get("/posts/category/sports").get_json()["posts"]) == 2
+
+
+# downgrading to the baseline puts the categories back on one row per post and keeps the other data
+def test_downgrade_to_baseline_keeps_data(app):
+    cli = app.test_cli_runner()
+    create_baseline(cli)
+    run(cli, "upgrade")
+
+    run(cli, "downgrade", "0001")
+    rows = db.session.execute(db.text("SELECT post_id, lower(trim(category_name)) FROM categories ORDER BY post_id, 2")).all()
+    assert rows == [(1, "sports"), (2, "food"), (2, "sports")]
+    assert db.session.scalar(db.text("SELECT count(*) FROM blogposts")) == 2
+    assert db.session.scalar(db.text("SELECT count(*) FROM comments")) == 1
+
+    # the baseline tables don't match the models the app fixture drops, so remove them with the migrations
+    db.session.remove()
+    run(cli, "downgrade", "base")
@@ -0,0 +1,89 @@
+import base64
+import json
+
+import pytest
+
+
+# follow next_cursor from the first page to the last, returning the ids of every item
+def all_pages(client, path, items, id_field, limit=2):
+    ids, cursor = [], None
+    while True:
+        separator = "&" if "?" in path else "?"
+        url = f"{path}{separator}limit={limit}" + (f"&cursor={cursor}" if cursor else "")
+        page = client.get(url).get_json()
+        assert len(page[items]) <= limit
+        ids.extend(item[id_field] for item in page[items])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+def encode(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def test_posts_pages_newest_first(client, sign_up, new_post):
+    headers = sign_up()
+    post_ids = [new_post(headers, f"Post {i}", ["Sports"]) for i in range(5)]
+
+    assert all_pages(client, "/posts/", "posts", "post_id") == post_ids[::-1]
+    assert all_pages(client, "/posts/compact", "posts", "post_id", limit=3) == post_ids[::-1]
+    # the category view doesn't show post ids, the titles are unique
+    assert all_pages(client, "/posts/category/sports", "posts", "post_title") == [f"Post {i}" for i in range(5)][::-1]
+
+
+def test_users_and_comments_pages(client, sign_up, new_post):
+    headers = [sign_up(f"User {i}", f"user{i}@example.com") for i in range(5)]
+    post_id = new_post(headers[0])
+    comment_ids = [
+        client.post(f"/comments/{post_id}", json={"comment_text": f"Comment {i}"}, headers=user).get_json()["comment_id"]
+        for i, user in enumerate(headers)
+    ]
+
+    assert all_pages(client, "/users/", "users", "user_id") == [1, 2, 3, 4, 5]
+    assert all_pages(client, f"/comments/{post_id}", "comments", "comment_id") == comment_ids
+
+
+# a page ends exactly at the last item - the cursor is null, not a cursor to an empty page
+def test_last_full_page_has_no_cursor(client, sign_up, new_post):
+    headers = sign_up()
+    for i in range(4):
+        new_post(headers, f"Post {i}")
+
+    first = client.get("/posts/?limit=2").get_json()
+    second = client.get(f"/posts/?limit=2&cursor={first['next_cursor']}").get_json()
+    assert len(second["posts"]) == 2
+    assert second["next_cursor"] is None
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-base64!",
+    encode({"date": 1}),
+    encode([1]),
+    encode(["yesterday", 1]),
+    base64.urlsafe_b64encode(b"not json").decode(),
+])
+def test_invalid_cursor(client, cursor):
+    response = client.get(f"/posts/?cursor={cursor}")
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "The 'cursor' parameter is invalid"
+
+
+@pytest.mark.parametrize("query, error", [
+    ("limit=0", "The 'limit' parameter must be between 1 and 100"),
+    ("limit=101", "The 'limit' parameter must be between 1 and 100"),
+    ("limit=ten", "The 'limit' parameter must be a number"),
+    ("q=post&cursor=" + encode([-1]), "The 'cursor' parameter is invalid"),
+])
+def test_invalid_limit_and_search_cursor(client, query, error):
+    path = "/posts/search" if query.startswith("q=") else "/users/"
+    response = client.get(f"{path}?{query}")
+    assert response.status_code == 400
+    assert response.get_json()["error"] == error
+
+
+def test_search_pages(client, sign_up, new_post):
+    headers = sign_up()
+    post_ids = {new_post(headers, f"Match {i}") for i in range(5)}
+    ids = all_pages(client, "/posts/search?q=match", "posts", "post_id")
+    assert sorted(ids) == sorted(post_ids)
@@ -0,0 +1,31 @@
+import threading
+import time
+
+import pytest
+
+from utils.passwords import PasswordHasher, PasswordHasherBusy
+
+
+# a hash is turned away straight away once every hashing thread and queue slot is taken
+def test_full_queue_is_busy(app):
+    app.config.update(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE_SIZE=1, PASSWORD_HASH_TIMEOUT=10)
+    hasher = PasswordHasher(app)
+    release = threading.Event()
+
+    # one hash running and one queued, from two request threads
+    requests = [threading.Thread(target=hasher._run, args=(release.wait,)) for _ in range(2)]
+    for thread in requests:
+        thread.start()
+    while hasher._slots._value:
+        time.sleep(0.001)
+
+    start = time.perf_counter()
+    with pytest.raises(PasswordHasherBusy):
+        hasher._run(lambda: "hashed")
+    assert time.perf_counter() - start < 1
+
+    # the slots are freed when the hashes finish
+    release.set()
+    for thread in requests:
+        thread.join()
+    assert hasher._run(lambda: "hashed") == "hashed"
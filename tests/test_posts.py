@@ -0,0 +1,48 @@
+import pytest
+
+
+INVALID_POSTS = [
+    ({"post_title": 5, "post_content": "Content"}, "'post_title' must be a string"),
+    ({"post_title": "Title", "post_content": ["Content"]}, "'post_content' must be a string"),
+    ({"post_title": "  ", "post_content": "Content"}, "'post_title' must not be empty"),
+    ({"post_title": "Title", "post_content": ""}, "'post_content' must not be empty"),
+    ({"post_title": "Title", "post_content": "Content", "categories": [" "]}, "'categories' must not contain empty names"),
+    ({"post_title": "Title", "post_content": "Content", "categories": ["Sports", 3]}, "'categories' list must contain strings"),
+]
+
+
+# an invalid post is rejected with a validation error instead of failing the request
+@pytest.mark.parametrize("body, error", INVALID_POSTS)
+def test_create_post_rejects_invalid_fields(client, sign_up, body, error):
+    response = client.post("/posts/", json=body, headers=sign_up())
+    assert response.status_code == 403
+    assert response.get_json()["error"] == error
+
+
+# each invalid post of a batch is reported by its position, and nothing is created
+def test_batch_reports_invalid_posts(client, sign_up):
+    headers = sign_up()
+    valid = {"post_title": "Title", "post_content": "Content", "categories": ["Sports"]}
+    response = client.post("/posts/batch", json=[valid] + [body for body, _ in INVALID_POSTS], headers=headers)
+    assert response.status_code == 400
+    assert response.get_json()["errors"] == [{"index": index + 1, "error": error} for index, (_, error) in enumerate(INVALID_POSTS)]
+
+    assert client.get("/posts/").get_json()["posts"] == []
+    assert client.get("/posts/category/sports").get_json()["posts"] == []
+
+
+def test_update_post_rejects_invalid_fields(client, sign_up, new_post):
+    headers = sign_up()
+    post_id = new_post(headers)
+    for body, error in INVALID_POSTS[:4]:
+        response = client.put(f"/posts/{post_id}", json=body, headers=headers)
+        assert response.status_code == 403
+        assert response.get_json()["error"] == error
+
+
+def test_new_category_rejects_empty_name(client, sign_up, new_post):
+    headers = sign_up()
+    post_id = new_post(headers)
+    response = client.post(f"/category/{post_id}", json={"category": "   "}, headers=headers)
+    assert response.status_code == 403
+    assert client.get(f"/posts/{post_id}").get_json()[0]["categories"] == []
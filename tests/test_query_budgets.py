@@ -0,0 +1,137 @@
+import pytest
+
+from utils.identity import identities
+from utils.query_budget import QueryBudgetExceeded, QUERY_BUDGETS
+
+
+# the app fixture runs every request in "raise" mode, so these requests fail if they go over their endpoint's budget or
+# run a statement in a loop - each one is the worst case of its endpoint: cold identity cache, new categories and fan-out
+@pytest.fixture
+def author(app, client, sign_up):
+    app.config["JWT_IDENTITY_CACHE_TTL"] = 0
+    app.config["FEED_FANOUT_THRESHOLD"] = 1000
+    identities.init_app(app)
+    headers = sign_up("Author", "author@example.com")
+    follower = sign_up("Follower", "follower@example.com")
+    assert client.post("/followers/1", headers=follower).status_code == 200
+    return headers
+
+
+def test_create_post_with_new_categories(client, author):
+    body = {"post_title": "Post", "post_content": "Content", "categories": [f"category {i}" for i in range(5)]}
+    assert client.post("/posts/", json=body, headers=author).status_code == 200
+
+
+def test_create_posts_batch_with_new_categories(client, author):
+    body = [{"post_title": f"Post {i}", "post_content": "Content", "categories": [f"category {i}", "shared"]} for i in range(5)]
+    response = client.post("/posts/batch", json=body, headers=author)
+    assert response.status_code == 200
+    assert len(response.get_json()["post_ids"]) == 5
+
+
+def test_new_category(client, author, new_post):
+    post_id = new_post(author, categories=["Sports"])
+    assert client.post(f"/category/{post_id}", json={"category": "Music"}, headers=author).status_code == 200
+
+
+def test_reads_and_deletes(client, author, new_post):
+    post_id = new_post(author, categories=["Sports"])
+    comment_id = client.post(f"/comments/{post_id}", json={"comment_text": "Comment"}, headers=author).get_json()["comment_id"]
+    assert client.post(f"/likes/post/{post_id}", headers=author).status_code == 200
+    assert client.post(f"/likes/comment/{comment_id}", headers=author).status_code == 200
+
+    for path in ["/posts/", "/posts/compact", f"/posts/{post_id}", "/posts/category/sports", "/posts/search?q=post",
+                 f"/comments/{post_id}", f"/likes/post/{post_id}", f"/likes/comment/{comment_id}", "/followers/1",
+                 "/users/", "/users/1", "/users/posts/1", "/users/comments/1", "/users/likes/1"]:
+        assert client.get(path).status_code == 200, path
+    assert client.get("/feed/", headers=author).status_code == 200
+
+    assert client.delete(f"/comments/{comment_id}", headers=author).status_code == 200
+    assert client.delete(f"/posts/{post_id}", headers=author).status_code == 200
+    assert client.delete("/users/", headers=author).status_code == 200
+
+
+# several rows behind every relationship (posts, comments, likes, categories, followers, timelines), so a query in a
+# loop shows up as a repeated statement and the budgets are checked against more than one row of each
+READERS = 5
+
+
+@pytest.fixture
+def populated(app, client, sign_up, new_post):
+    app.config["JWT_IDENTITY_CACHE_TTL"] = 0
+    app.config["FEED_FANOUT_THRESHOLD"] = 1000
+    identities.init_app(app)
+
+    author = sign_up("Author", "author@example.com")
+    readers = [sign_up(f"Reader {i}", f"reader{i}@example.com") for i in range(READERS)]
+    for reader in readers:
+        assert client.post("/followers/1", headers=reader).status_code == 200
+    for user_id in range(2, READERS + 2):
+        assert client.post(f"/followers/{user_id}", headers=author).status_code == 200
+
+    post_ids = [new_post(author, f"Post {i}", ["Sports", f"Topic {i}"]) for i in range(READERS)]
+    for headers in readers:
+        new_post(headers, "Reader post", ["Sports"])
+
+    comment_ids = []
+    for post_id in post_ids:
+        for headers in readers:
+            response = client.post(f"/comments/{post_id}", json={"comment_text": "Comment"}, headers=headers)
+            comment_ids.append(response.get_json()["comment_id"])
+            assert client.post(f"/likes/post/{post_id}", headers=headers).status_code == 200
+    for comment_id in comment_ids[:READERS]:
+        for headers in readers:
+            assert client.post(f"/likes/comment/{comment_id}", headers=headers).status_code == 200
+
+    return author, readers, post_ids, comment_ids
+
+
+def test_multi_row_reads(client, populated):
+    author, readers, post_ids, comment_ids = populated
+    post_id, comment_id = post_ids[0], comment_ids[0]
+
+    for path in ["/posts/", "/posts/compact", f"/posts/{post_id}", "/posts/category/sports", "/posts/search?q=post",
+                 f"/comments/{post_id}", f"/likes/post/{post_id}", f"/likes/comment/{comment_id}", "/followers/1",
+                 "/followers/2", "/users/", "/users/1", "/users/2", "/users/posts/1", "/users/comments/2",
+                 "/users/likes/2", "/posts/?stream=1", "/users/?stream=1"]:
+        response = client.get(path)
+        assert response.status_code == 200, path
+        assert response.get_data()
+    for headers in (author, readers[0]):
+        assert client.get("/feed/", headers=headers).status_code == 200
+
+
+# the feed pulls the posts of authors with more followers than the threshold instead of reading the fanned out timeline
+def test_multi_row_pulled_feed(app, client, populated):
+    author, readers, post_ids, comment_ids = populated
+    app.config["FEED_FANOUT_THRESHOLD"] = 0
+    for headers in (author, readers[0]):
+        assert client.get("/feed/", headers=headers).status_code == 200
+
+
+def test_multi_row_writes(client, populated):
+    author, readers, post_ids, comment_ids = populated
+    post_id, comment_id = post_ids[0], comment_ids[0]
+
+    assert client.post("/auth/login", json={"email": "author@example.com", "password": "Password.123"}).status_code == 200
+    assert client.put(f"/posts/{post_id}", json={"post_title": "Edited"}, headers=author).status_code == 200
+    assert client.post(f"/category/{post_id}", json={"category": "Music"}, headers=author).status_code == 200
+    assert client.delete(f"/category/{post_id}", json={"category": "Sports"}, headers=author).status_code == 200
+    assert client.put(f"/comments/{comment_id}", json={"comment_text": "Edited"}, headers=readers[0]).status_code == 200
+    assert client.post(f"/likes/post/{post_id}/toggle", headers=readers[0]).status_code == 200
+    assert client.post(f"/likes/comment/{comment_id}/toggle", headers=readers[0]).status_code == 200
+    assert client.delete(f"/likes/post/{post_ids[1]}", headers=readers[0]).status_code == 200
+    assert client.delete(f"/likes/comment/{comment_ids[1]}", headers=readers[1]).status_code == 200
+    assert client.delete("/followers/1", headers=readers[0]).status_code == 200
+    assert client.put("/users/", json={"name": "Renamed"}, headers=readers[1]).status_code == 200
+    assert client.delete(f"/comments/{comment_ids[2]}", headers=readers[2]).status_code == 200
+    assert client.delete(f"/posts/{post_ids[1]}", headers=author).status_code == 200
+    assert client.delete("/users/", headers=readers[3]).status_code == 200
+    assert client.delete("/users/", headers=author).status_code == 200
+
+
+# a request over its budget fails in "raise" mode
+def test_over_budget_raises(client, author, monkeypatch):
+    monkeypatch.setitem(QUERY_BUDGETS, "users.get_users", 0)
+    with pytest.raises(QueryBudgetExceeded, match="users.get_users ran 1 statements, over its budget of 0"):
+        client.get("/users/")
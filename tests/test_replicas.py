@@ -0,0 +1,74 @@
+import sqlite3
+
+import pytest
+
+
+# the app with a sqlite file as its read replica, kept behind the primary until sync() copies the primary to it
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    primary, replica = tmp_path / "primary.db", tmp_path / "replica.db"
+    monkeypatch.setenv("SQLALCHEMY_DATABASE_URI", f"sqlite:///{primary}")
+    monkeypatch.setenv("DATABASE_REPLICA_URIS", f"sqlite:///{replica}")
+    monkeypatch.setenv("JWT_SECRET_KEY", "test-secret-key-that-is-long-enough-for-hs256")
+    monkeypatch.setenv("QUERY_BUDGET_MODE", "raise")
+    monkeypatch.setenv("CACHE_BACKEND", "memory")
+    monkeypatch.setenv("BCRYPT_LOG_ROUNDS", "4")
+    monkeypatch.setenv("REPLICA_STICKY_SECONDS", "5")
+
+    from main import app_init, db
+
+    app = app_init()
+    app.config["TESTING"] = True
+
+    with app.app_context():
+        db.create_all(bind_key=None)
+    sync_replica(tmp_path)
+
+    # each request gets its own app context and session, as in production - a session that has written reads from the
+    # primary for the rest of its life
+    yield app
+
+    with app.app_context():
+        db.drop_all(bind_key=None)
+
+
+# copy the primary to the replica, as replication would
+def sync_replica(tmp_path):
+    with sqlite3.connect(tmp_path / "primary.db") as source, sqlite3.connect(tmp_path / "replica.db") as target:
+        source.backup(target)
+
+
+@pytest.fixture
+def sync(tmp_path):
+    return lambda: sync_replica(tmp_path)
+
+
+# the cached post view reads from the replica, its author reads their own writes from the primary, and a key removed by
+# a write is read from the primary, so the lagging replica can't put the old post back in the cache
+def test_cached_post_reads_replica_without_caching_stale_data(client, sign_up, new_post, sync):
+    author = sign_up("Author", "author@example.com")
+    post_id = new_post(author, "Old title")
+    sync()
+
+    # a post the replica doesn't have yet isn't found by other users, but is by its author right after writing it
+    newer_post_id = new_post(author, "Newer post")
+    assert client.get(f"/posts/{newer_post_id}").status_code == 404
+    assert client.get(f"/posts/{newer_post_id}", headers=author).status_code == 200
+
+    assert client.get(f"/posts/{post_id}").headers["X-Cache"] == "MISS"
+    assert client.put(f"/posts/{post_id}", json={"post_title": "New title"}, headers=author).status_code == 200
+
+    response = client.get(f"/posts/{post_id}")
+    assert response.headers["X-Cache"] == "MISS"
+    assert response.get_json()[0]["post_title"] == "New title"
+
+    response = client.get(f"/posts/{post_id}")
+    assert response.headers["X-Cache"] == "HIT"
+    assert response.get_json()[0]["post_title"] == "New title"
+
+
+def test_cached_user_reads_replica(client, sign_up, sync):
+    sign_up("Author", "author@example.com")
+    assert client.get("/users/1").status_code == 400
+    sync()
+    assert client.get("/users/1").get_json()["name"] == "Author"
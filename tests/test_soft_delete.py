@@ -0,0 +1,87 @@
+from utils.identity import Identity, identities
+
+
+# deleting a user is one UPDATE of their row, which hides their posts and comments through their author - only the
+# counters their likes and follows were counted in are updated besides it
+def test_delete_user_hides_their_posts_and_comments(client, sign_up, new_post, max_queries):
+    author = sign_up("Author", "author@example.com")
+    reader = sign_up("Reader", "reader@example.com")
+    post_id = new_post(author)
+    other_post_id = new_post(reader)
+    client.post(f"/comments/{other_post_id}", json={"comment_text": "Author comment"}, headers=author)
+
+    with max_queries(7) as statements:
+        response = client.delete("/users/", headers=author)
+    assert response.status_code == 200
+    updates = sorted(statement.split(" WHERE")[0] for statement in statements if statement.startswith("UPDATE"))
+    assert updates == [
+        "UPDATE blogposts SET like_count=(coalesce(blogposts.like_count, ?) + ?)",
+        "UPDATE comments SET like_count=(coalesce(comments.like_count, ?) + ?)",
+        "UPDATE users SET deleted_at=?",
+        "UPDATE users SET follower_count=(coalesce(users.follower_count, ?) + ?)",
+    ]
+
+    assert client.get(f"/posts/{post_id}").status_code == 404
+    assert client.get(f"/comments/{other_post_id}").get_json()["comments"] == []
+    assert client.get("/posts/").get_json()["posts"][0]["post_id"] == other_post_id
+
+
+# the likes and follows of a deleted user come off the counters straight away, matching the listings that hide them,
+# and a recount (which leaves them out too) or the purge doesn't change the counters again
+def test_delete_user_updates_counters(app, client, sign_up, new_post):
+    from main import db
+    from utils.counters import recount_all
+    from utils.purge import purge_deleted
+
+    author = sign_up("Author", "author@example.com")
+    reader = sign_up("Reader", "reader@example.com")
+    post_id = new_post(author)
+    comment_id = client.post(f"/comments/{post_id}", json={"comment_text": "Comment"}, headers=author).get_json()["comment_id"]
+    for headers in (author, reader):
+        assert client.post(f"/likes/post/{post_id}", headers=headers).status_code == 200
+        assert client.post(f"/likes/comment/{comment_id}", headers=headers).status_code == 200
+    assert client.post("/followers/1", headers=reader).status_code == 200
+
+    assert client.delete("/users/", headers=reader).status_code == 200
+
+    def counters():
+        post = client.get(f"/posts/{post_id}").get_json()[0]
+        return (post["like_count"], post["comments"][0]["like_count"], client.get("/users/1").get_json()["follower_count"],
+                len(client.get(f"/likes/post/{post_id}").get_json()["likers"]), len(client.get("/followers/1").get_json()["followers"]))
+
+    assert counters() == (1, 1, 0, 1, 0)
+
+    recount_all()
+    db.session.commit()
+    assert counters() == (1, 1, 0, 1, 0)
+
+    purge_deleted(log=lambda message: None)
+    assert counters() == (1, 1, 0, 1, 0)
+
+
+# a token of a deleted user whose identity is still cached (e.g. by another worker) is rejected instead of failing
+def test_deleted_user_with_cached_identity(client, sign_up):
+    headers = sign_up()
+    assert client.delete("/users/", headers=headers).status_code == 200
+
+    identities.set(1, Identity(1, "Test User", "test@example.com"))
+    assert client.put("/users/", json={"name": "New Name"}, headers=headers).status_code == 401
+    assert client.delete("/users/", headers=headers).status_code == 401
+
+
+# rebuilding the search index (e.g. after an import) leaves out deleted posts and the posts of deleted users
+def test_reindex_skips_deleted_posts(app, client, sign_up, new_post):
+    from main import db
+    from utils.search import reindex_all
+
+    author = sign_up("Author", "author@example.com")
+    reader = sign_up("Reader", "reader@example.com")
+    kept = new_post(reader, "Shared title")
+    deleted = new_post(reader, "Shared title")
+    new_post(author, "Shared title")
+    assert client.delete(f"/posts/{deleted}", headers=reader).status_code == 200
+    assert client.delete("/users/", headers=author).status_code == 200
+
+    reindex_all()
+    db.session.commit()
+    assert list(db.session.scalars(db.text("SELECT rowid FROM blogposts_fts"))) == [kept]
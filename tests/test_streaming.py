@@ -0,0 +1,29 @@
+import json
+
+import utils.streaming
+
+
+# streaming reads the posts in batches, with the soft delete filter on every batch and its eager loads
+def test_stream_posts(client, sign_up, new_post, monkeypatch):
+    monkeypatch.setattr(utils.streaming, "STREAM_BATCH_SIZE", 2)
+    headers = sign_up()
+    post_ids = [new_post(headers, title=f"Post {i}") for i in range(5)]
+    comment_ids = [client.post(f"/comments/{post_ids[0]}", json={"comment_text": f"Comment {i}"}, headers=headers).get_json()["comment_id"] for i in range(2)]
+
+    assert client.delete(f"/posts/{post_ids[1]}", headers=headers).status_code == 200
+    assert client.delete(f"/comments/{comment_ids[0]}", headers=headers).status_code == 200
+
+    response = client.get("/posts/?stream=1")
+    assert response.status_code == 200
+    posts = response.get_json()
+    assert [post["post_id"] for post in posts] == [post_ids[4], post_ids[3], post_ids[2], post_ids[0]]
+    assert [comment["comment_id"] for comment in posts[-1]["comments"]] == [comment_ids[1]]
+
+
+def test_stream_posts_ndjson(client, sign_up, new_post):
+    headers = sign_up()
+    post_ids = [new_post(headers, title=f"Post {i}") for i in range(3)]
+
+    response = client.get("/posts/", headers={"Accept": "application/x-ndjson"})
+    assert response.status_code == 200
+    assert [json.loads(line)["post_id"] for line in response.get_data(as_text=True).splitlines()] == post_ids[::-1]
@@ -0,0 +1,214 @@
+# import math, threading, time and functools library
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+# flask related imports for requests and responses
+from flask import request, g, current_app
+
+# import the fields helper
+from utils.fields import get_fields
+
+
+# cache key formats for the cached views, filled in with the view's arguments
+POST_KEY = "post:{post_id}"
+USER_KEY = "user:{user_id}"
+
+
+# in-process least recently used cache where every entry expires after ttl seconds
+# each key holds variants of a response (e.g. different '?fields=' projections) that are invalidated together
+# every variant counts as an entry, so max_entries bounds the number of responses held, however they are spread over keys
+class LRUCache:
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, variant):
+        with self._lock:
+            variants = self._entries.get(key)
+            if variants is None or variant not in variants:
+                return None
+
+            # remove the variant if it has expired
+            expires, value = variants[variant]
+            if expires < time.monotonic():
+                del variants[variant]
+                self._size -= 1
+                return None
+
+            # mark the entry as the most recently used
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, variant, value):
+        with self._lock:
+            variants = self._entries.setdefault(key, {})
+            if variant not in variants:
+                self._size += 1
+            variants[variant] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+
+            # evict the least recently used keys, with all their variants, once the cache is full
+            while self._size > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._size -= len(self._entries.pop(key, ()))
+
+    # the number of variants held
+    def __len__(self):
+        return self._size
+
+
+# set a variant, and start the key's ttl if it doesn't have one yet (atomically, and without EXPIRE's NX option, which
+# needs redis 7)
+SET_VARIANT_SCRIPT = """
+redis.call("HSET", KEYS[1], ARGV[1], ARGV[2])
+if redis.call("TTL", KEYS[1]) < 0 then
+    redis.call("EXPIRE", KEYS[1], ARGV[3])
+end
+"""
+
+
+# shared cache stored in redis, so every gunicorn worker sees the same entries and invalidations
+class RedisCache:
+    def __init__(self, url, ttl, prefix="blog-api:"):
+        # redis is only required when this backend is used
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND 'redis' requires the redis package (pip install redis)")
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self._set_variant = self.client.register_script(SET_VARIANT_SCRIPT)
+
+    # variants are stored as fields of a redis hash, which expires ttl seconds after its first variant was set
+    def get(self, key, variant):
+        return self.client.hget(self.prefix + key, variant)
+
+    def set(self, key, variant, value):
+        self._set_variant(keys=[self.prefix + key], args=[variant, value, self.ttl])
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*(self.prefix + key for key in keys))
+
+    def __len__(self):
+        return sum(1 for _ in self.client.scan_iter(self.prefix + "*"))
+
+
+# read-through cache for serialized JSON responses, with hit/miss counters
+class ResponseCache:
+    def __init__(self):
+        self.backend = None
+        self.backend_name = "none"
+        self._deleted = None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    # create the backend from the app configuration
+    def init_app(self, app):
+        self.backend_name = app.config.get("CACHE_BACKEND", "memory")
+        ttl = app.config.get("CACHE_TTL", 60)
+
+        if self.backend_name == "memory":
+            self.backend = LRUCache(app.config.get("CACHE_MAX_ENTRIES", 1024), ttl)
+        elif self.backend_name == "redis":
+            self.backend = RedisCache(app.config.get("CACHE_REDIS_URL"), ttl)
+        elif self.backend_name == "none":
+            self.backend = None
+        else:
+            raise ValueError(f"Unknown CACHE_BACKEND '{self.backend_name}'")
+
+        # with read replicas, a miss right after a write removed the key could read a replica that hasn't replayed the
+        # write yet and cache the old response again - keys removed while a replica may still be behind (REPLICA_MAX_LAG,
+        # plus REPLICA_CHECK_INTERVAL before a lagging replica is noticed) are remembered and read from the primary
+        self._deleted = None
+        if self.backend is not None and any(key.startswith("replica_") for key in app.config.get("SQLALCHEMY_BINDS") or {}):
+            window = math.ceil(app.config["REPLICA_MAX_LAG"] + app.config["REPLICA_CHECK_INTERVAL"])
+            if self.backend_name == "redis":
+                self._deleted = RedisCache(app.config.get("CACHE_REDIS_URL"), window, prefix="blog-api:deleted:")
+            else:
+                self._deleted = LRUCache(app.config.get("CACHE_MAX_ENTRIES", 1024), window)
+
+        app.extensions["response_cache"] = self
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    # decorator caching a view's successful JSON response under a key built from the view's arguments
+    # responses for different '?fields=' projections (checked against the view's allowed fields) and pages are cached as
+    # variants of the same key - other query parameters don't change the response, so they don't create variants
+    def cached(self, key_format, allowed_fields):
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if self.backend is None:
+                    return view(*args, **kwargs)
+
+                # return the cached JSON if there is one
+                key = key_format.format(**kwargs)
+                variant = repr((get_fields(allowed_fields), request.args.get("limit"), request.args.get("cursor")))
+                data = self.backend.get(key, variant)
+                if data is not None:
+                    self._count(hit=True)
+                    response = current_app.response_class(data, mimetype="application/json")
+                    response.headers["X-Cache"] = "HIT"
+                    return response, 200
+
+                # otherwise run the view and cache the JSON if it succeeded
+                self._count(hit=False)
+
+                # a replica may not have the write that removed the key yet - read from the primary, not an old version
+                if g.get("read_replica") is not None and self._recently_deleted(key):
+                    g.read_replica = None
+                response, status = view(*args, **kwargs)
+                if status == 200:
+                    self.backend.set(key, variant, response.get_data())
+                response.headers["X-Cache"] = "MISS"
+                return response, status
+
+            return wrapper
+
+        return decorator
+
+    # remove cached responses - call after the write that changed them has been committed
+    def delete(self, *keys):
+        if self.backend is not None:
+            self.backend.delete(*keys)
+
+        # replace any earlier entry, so the window restarts from the latest write
+        if self._deleted is not None:
+            self._deleted.delete(*keys)
+            for key in keys:
+                self._deleted.set(key, "deleted", b"1")
+
+    # whether a key was removed recently enough that a replica may not have the write that removed it yet
+    def _recently_deleted(self, key):
+        return self._deleted is not None and self._deleted.get(key, "deleted") is not None
+
+    # hit and miss counters for this worker process
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "backend": self.backend_name,
+            "entries": len(self.backend) if self.backend is not None else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
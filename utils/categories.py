@@ -0,0 +1,72 @@
+# import SQLAlchemy
+from main import db
+
+# import models
+from models.categories import Category
+
+# import conflict-ignoring inserts
+from utils.inserts import insert_or_ignore
+
+
+# normalize a category name so "Sports", " sports" and "SPORTS" are the same category
+def normalize_category_name(name):
+    return name.strip().lower()
+
+
+# build a filter matching categories by exact name or by name prefix, using the normalized name index
+def category_name_filter(name, match="exact"):
+    name = normalize_category_name(name)
+
+    if match == "exact":
+        return Category.name_normalized == name
+
+    # postgresql can use the text_pattern_ops index for LIKE 'abc%'
+    if db.engine.dialect.name == "postgresql":
+        return Category.name_normalized.startswith(name, autoescape=True)
+
+    # other databases compare by code point, so a range scan over the unique index finds every name with the prefix
+    return db.and_(Category.name_normalized >= name, Category.name_normalized < name + "\U0010ffff")
+
+
+# return a dictionary of normalized name to category_id for a list of names, creating any that don't exist yet
+# the number of queries doesn't grow with the number of names or new categories
+def get_or_create_category_ids(names):
+    # keep the first spelling of each normalized name
+    wanted = {}
+    for name in names:
+        wanted.setdefault(normalize_category_name(name), name.strip())
+
+    if not wanted:
+        return {}
+
+    # query the categories that already exist
+    stmt = db.select(Category.name_normalized, Category.category_id).where(Category.name_normalized.in_(wanted))
+    category_ids = dict(db.session.execute(stmt).all())
+
+    # create the missing categories with one multi-row insert
+    missing = [{"category_name": name, "name_normalized": normalized} for normalized, name in wanted.items() if normalized not in category_ids]
+    if missing:
+        stmt = insert_or_ignore(Category.__table__).values(missing).returning(Category.name_normalized, Category.category_id)
+        category_ids.update(db.session.execute(stmt).all())
+
+        # categories created by a concurrent request were skipped by the insert, so query them
+        skipped = [normalized for normalized in wanted if normalized not in category_ids]
+        if skipped:
+            stmt = db.select(Category.name_normalized, Category.category_id).where(Category.name_normalized.in_(skipped))
+            category_ids.update(db.session.execute(stmt).all())
+
+    return category_ids
+
+
+# return the categories for a list of names in the order given (once each), creating any that don't exist yet
+def get_or_create_categories(names):
+    names = list(names)
+    wanted = dict.fromkeys(normalize_category_name(name) for name in names)
+    category_ids = get_or_create_category_ids(names)
+    if not category_ids:
+        return []
+
+    # load the categories with one query
+    stmt = db.select(Category).where(Category.category_id.in_(category_ids.values()))
+    categories = {category.name_normalized: category for category in db.session.scalars(stmt)}
+    return [categories[normalized] for normalized in wanted]
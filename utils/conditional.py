@@ -0,0 +1,45 @@
+# import hashlib and functools library
+import hashlib
+from functools import wraps
+
+# flask related imports for requests and responses
+from flask import request, current_app
+
+
+# build an etag from validator values and the query string (so each page or projection gets its own etag)
+def make_etag(values):
+    data = repr((tuple(values), request.query_string)).encode("utf-8")
+    return hashlib.sha1(data).hexdigest()
+
+
+# check if the client's cached copy is still current
+# only If-None-Match is answered - likes, follows, category changes, deletes and renames change the response without
+# touching any single date, so no Last-Modified date could tell whether a copy is current
+def _not_modified(etag):
+    return bool(request.if_none_match) and request.if_none_match.contains_weak(etag)
+
+
+# decorator answering conditional GET requests with 304 Not Modified before the view runs
+# validator is called with the view's arguments and returns values - cheap-to-query columns that change whenever the
+# response changes
+def conditional(validator):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = make_etag(validator(**kwargs))
+
+            # the client's copy is current - skip the view and return an empty 304 response
+            if _not_modified(etag):
+                response = current_app.response_class(status=304)
+                response.set_etag(etag, weak=True)
+                return response
+
+            # otherwise run the view and attach the etag to a successful response
+            response, status = view(*args, **kwargs)
+            if status == 200:
+                response.set_etag(etag, weak=True)
+            return response, status
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,96 @@
+# import SQLAlchemy
+from main import db
+from sqlalchemy import func
+
+# import models
+from models.blog_posts import BlogPost
+from models.comments import Comment
+from models.users import User
+from models.likes import Like
+from models.followers import Follower
+
+# import the deleted user condition
+from utils.soft_delete import user_deleted
+
+
+# atomically add delta to a counter column on the rows matching the where clause, optionally returning columns of those rows
+# runs inside the current transaction, so it commits or rolls back together with the like/follow row
+def _adjust(model, column, where, delta, *returning):
+    stmt = (
+        db.update(model)
+        .where(where)
+        .values({column: func.coalesce(getattr(model, column), 0) + delta})
+        .execution_options(synchronize_session=False)
+    )
+    if returning:
+        stmt = stmt.returning(*returning)
+    return db.session.execute(stmt)
+
+
+# add delta to the like_count of a blog post and return whether the post exists
+def adjust_post_likes(post_id, delta):
+    return _adjust(BlogPost, "like_count", BlogPost.post_id == post_id, delta).rowcount > 0
+
+
+# add delta to the like_count of a comment and return the comment's post_id (None if the comment doesn't exist)
+def adjust_comment_likes(comment_id, delta):
+    return _adjust(Comment, "like_count", Comment.comment_id == comment_id, delta, Comment.post_id).scalar()
+
+
+# add delta to the follower_count of a user and return whether the user exists
+def adjust_follower_count(user_id, delta):
+    return _adjust(User, "follower_count", User.user_id == user_id, delta).rowcount > 0
+
+
+# subtract a user's likes and follows from the counters they were counted in, so the counters match the listings, which
+# hide them once the user is deleted - call before the user is marked as deleted, while their likes and follows are visible
+# returns the ids of the posts whose like counts changed (liked, or with a liked comment) and of the users they followed
+def remove_user_counts(user_id):
+    liked_posts = db.select(Like.post_id).where(Like.liker_id == user_id, Like.post_id.is_not(None))
+    liked_comments = db.select(Like.comment_id).where(Like.liker_id == user_id, Like.comment_id.is_not(None))
+    followed = db.select(Follower.followed_id).where(Follower.follower_id == user_id)
+
+    post_ids = set(_adjust(BlogPost, "like_count", BlogPost.post_id.in_(liked_posts), -1, BlogPost.post_id).scalars())
+    post_ids.update(_adjust(Comment, "like_count", Comment.comment_id.in_(liked_comments), -1, Comment.post_id).scalars())
+    user_ids = _adjust(User, "follower_count", User.user_id.in_(followed), -1, User.user_id).scalars().all()
+    return post_ids, user_ids
+
+
+# the number of likes of a post or comment, and of follows of a user, leaving out those of deleted users
+def _like_count(column, id):
+    return db.select(func.count()).where(column == id, ~user_deleted(Like.liker_id)).scalar_subquery()
+
+
+def _follower_count():
+    return db.select(func.count()).where(Follower.followed_id == User.user_id, ~user_deleted(Follower.follower_id)).scalar_subquery()
+
+
+# rebuild every counter column from the likes and followers tables using one bulk update per table
+# the counters count every stored like and follow except those of deleted users (see remove_user_counts)
+def recount_all():
+    post_likes = _like_count(Like.post_id, BlogPost.post_id)
+    comment_likes = _like_count(Like.comment_id, Comment.comment_id)
+    followers = _follower_count()
+
+    db.session.execute(db.update(BlogPost).values(like_count=post_likes).execution_options(synchronize_session=False, include_deleted=True))
+    db.session.execute(db.update(Comment).values(like_count=comment_likes).execution_options(synchronize_session=False, include_deleted=True))
+    db.session.execute(db.update(User).values(follower_count=followers).execution_options(synchronize_session=False, include_deleted=True))
+
+
+# rebuild the counters of some posts, comments and users - e.g. after likes or follows were deleted in bulk, which doesn't
+# adjust the counters one row at a time
+def recount(post_ids=(), comment_ids=(), user_ids=()):
+    if post_ids:
+        post_likes = _like_count(Like.post_id, BlogPost.post_id)
+        stmt = db.update(BlogPost).where(BlogPost.post_id.in_(post_ids)).values(like_count=post_likes)
+        db.session.execute(stmt.execution_options(synchronize_session=False, include_deleted=True))
+
+    if comment_ids:
+        comment_likes = _like_count(Like.comment_id, Comment.comment_id)
+        stmt = db.update(Comment).where(Comment.comment_id.in_(comment_ids)).values(like_count=comment_likes)
+        db.session.execute(stmt.execution_options(synchronize_session=False, include_deleted=True))
+
+    if user_ids:
+        followers = _follower_count()
+        stmt = db.update(User).where(User.user_id.in_(user_ids)).values(follower_count=followers)
+        db.session.execute(stmt.execution_options(synchronize_session=False, include_deleted=True))
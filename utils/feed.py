@@ -0,0 +1,99 @@
+# import SQLAlchemy
+from main import db
+
+# flask related imports for the app config
+from flask import current_app
+
+# import models
+from models.blog_posts import BlogPost
+from models.followers import Follower
+from models.timelines import Timeline
+from models.users import User
+
+# import pagination helpers
+from utils.pagination import get_limit, order_by_keyset, encode_cursor
+
+
+# follower threshold below which new posts are fanned out on write (0 when fan-out on write is off)
+def fanout_threshold():
+    return current_app.config["FEED_FANOUT_THRESHOLD"]
+
+
+# write new posts of an author to the timelines of the author's followers, if the author has few enough followers
+# writing a post costs one row per follower, so authors with many followers are left to be read from the followers table
+def fan_out_posts(author_id, post_ids):
+    threshold = fanout_threshold()
+    if threshold <= 0 or not post_ids:
+        return
+
+    follower_count = db.session.scalar(db.select(User.follower_count).filter_by(user_id=author_id)) or 0
+    if follower_count > threshold:
+        return
+
+    # copy the posts into every follower's timeline with one statement
+    rows = (
+        db.select(Follower.follower_id, BlogPost.post_id, BlogPost.posted_date)
+        .join(BlogPost, BlogPost.author_id == Follower.followed_id)
+        .where(BlogPost.post_id.in_(post_ids))
+    )
+    db.session.execute(db.insert(Timeline).from_select(["user_id", "post_id", "posted_date"], rows))
+
+    # mark the posts so feeds read them from the timelines and not from the followers table
+    stmt = db.update(BlogPost).where(BlogPost.post_id.in_(post_ids)).values(fanned_out=True)
+    db.session.execute(stmt.execution_options(synchronize_session=False))
+
+
+# add the fanned out posts of an author to a new follower's timeline - call when the follow is created
+def backfill_timeline(user_id, author_id):
+    rows = (
+        db.select(db.literal(user_id), BlogPost.post_id, BlogPost.posted_date)
+        .where(BlogPost.author_id == author_id, BlogPost.fanned_out.is_(True))
+    )
+    db.session.execute(db.insert(Timeline).from_select(["user_id", "post_id", "posted_date"], rows))
+
+
+# remove the posts of an author from a former follower's timeline - call when the follow is deleted
+def clear_timeline(user_id, author_id):
+    post_ids = db.select(BlogPost.post_id).filter_by(author_id=author_id)
+    stmt = db.delete(Timeline).where(Timeline.user_id == user_id, Timeline.post_id.in_(post_ids))
+    db.session.execute(stmt.execution_options(synchronize_session=False))
+
+
+# return one page of a user's home feed (posts by the users they follow, newest first) with the next cursor
+# each source is read in (posted_date, post_id) order from its own index and limited to one page before they are merged
+def feed_page(user_id, options):
+    limit = get_limit()
+
+    # fan-out on read: posts by followed authors, joining the followers table to the (author_id, posted_date) index
+    read = (
+        db.select(BlogPost.post_id, BlogPost.posted_date)
+        .join(Follower, Follower.followed_id == BlogPost.author_id)
+        .where(Follower.follower_id == user_id)
+    )
+    if fanout_threshold() > 0:
+        read = read.where(BlogPost.fanned_out.is_(False))
+    sources = [order_by_keyset(read, (BlogPost.posted_date, BlogPost.post_id), descending=True).limit(limit + 1)]
+
+    # fan-out on write: posts already written to the user's timeline
+    if fanout_threshold() > 0:
+        written = db.select(Timeline.post_id, Timeline.posted_date).where(Timeline.user_id == user_id)
+        sources.append(order_by_keyset(written, (Timeline.posted_date, Timeline.post_id), descending=True).limit(limit + 1))
+
+    # merge the sources (each wrapped in a subquery so it keeps its own order and limit) and load the page of posts
+    merged = db.union_all(*(db.select(source.subquery()) for source in sources)).subquery()
+    stmt = (
+        db.select(BlogPost)
+        .join(merged, merged.c.post_id == BlogPost.post_id)
+        .options(*options)
+        .order_by(merged.c.posted_date.desc(), merged.c.post_id.desc())
+        .limit(limit + 1)
+    )
+    posts = db.session.scalars(stmt).all()
+
+    # if an extra post was returned, build the cursor from the last post of this page
+    next_cursor = None
+    if len(posts) > limit:
+        posts = posts[:limit]
+        next_cursor = encode_cursor([posts[-1].posted_date, posts[-1].post_id])
+
+    return posts, next_cursor
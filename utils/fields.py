@@ -0,0 +1,68 @@
+# import SQLAlchemy loader options
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only, selectinload
+
+# flask related imports for requests
+from flask import request, abort
+
+
+# read the 'fields' query parameter (e.g. "?fields=post_title,author_info.name") and check it against the allowed fields
+# a relationship name on its own (e.g. "author_info") selects all of its allowed nested fields
+def get_fields(allowed):
+    requested = request.args.get("fields")
+    if requested is None:
+        return tuple(allowed)
+
+    fields = []
+    for name in requested.split(","):
+        name = name.strip()
+        if not name:
+            continue
+
+        # find the allowed fields matching the name
+        matches = [field for field in allowed if field == name or field.startswith(name + ".")]
+        if not matches:
+            abort(400, description=f"The field '{name}' is not available")
+
+        fields.extend(field for field in matches if field not in fields)
+
+    if not fields:
+        abort(400, description="The 'fields' parameter must name at least one field")
+
+    return tuple(fields)
+
+
+# build loader options that fetch only the columns and relationships needed to serialize the fields
+# extra columns (e.g. a pagination sort key) can be passed to always load them
+def load_options(model, fields, *columns):
+    mapper = inspect(model)
+
+    # always load the primary key
+    columns = [getattr(model, column.key) for column in mapper.primary_key] + list(columns)
+    relationships = {}
+
+    # split the fields into columns of this model and fields of related models
+    for field in fields:
+        name, _, nested = field.partition(".")
+        if name in mapper.relationships:
+            relationships.setdefault(name, [])
+            if nested:
+                relationships[name].append(nested)
+        elif name in mapper.column_attrs:
+            columns.append(getattr(model, name))
+
+    options = []
+    for name, nested in relationships.items():
+        relationship = mapper.relationships[name]
+
+        # load the foreign key columns the relationship is joined on
+        for column in relationship.local_columns:
+            columns.append(getattr(model, mapper.get_property_by_column(column).key))
+
+        # eager load the relationship, limited to its own requested fields
+        option = selectinload(getattr(model, name))
+        if nested:
+            option = option.options(*load_options(relationship.mapper.class_, nested))
+        options.append(option)
+
+    return [load_only(*columns)] + options
@@ -0,0 +1,73 @@
+# import namedtuple, SQLAlchemy and the jwt manager
+from collections import namedtuple
+from main import db, jwt
+
+# flask related imports for responses and authentication
+from flask import jsonify
+from flask_jwt_extended import get_jwt_identity
+
+# import models
+from models.users import User
+
+# import the in-process cache
+from utils.cache import LRUCache
+
+
+# the details of the user a token belongs to, returned by flask_jwt_extended's current_user
+Identity = namedtuple("Identity", ["user_id", "name", "email"])
+
+
+# short lived in-process cache of identities by user_id, so most authenticated requests don't query the users table
+# entries are removed when the user changes their details, other workers see the change once their entry expires
+class IdentityCache:
+    def __init__(self):
+        self._cache = None
+
+    def init_app(self, app):
+        # 0 turns the cache off, loading the identity once per request
+        ttl = app.config["JWT_IDENTITY_CACHE_TTL"]
+        self._cache = LRUCache(app.config["JWT_IDENTITY_CACHE_SIZE"], ttl) if ttl > 0 else None
+
+    def get(self, user_id):
+        return self._cache.get(user_id, None) if self._cache is not None else None
+
+    def set(self, user_id, identity):
+        if self._cache is not None:
+            self._cache.set(user_id, None, identity)
+
+    def delete(self, user_id):
+        if self._cache is not None:
+            self._cache.delete(user_id)
+
+
+identities = IdentityCache()
+
+
+# return the current user's id from the token claims, without querying the database
+def current_user_id():
+    return int(get_jwt_identity())
+
+
+# load the identity of the user a token belongs to - flask_jwt_extended calls this once for every authenticated request
+@jwt.user_lookup_loader
+def load_identity(jwt_header, jwt_data):
+    user_id = int(jwt_data["sub"])
+
+    identity = identities.get(user_id)
+    if identity is None:
+        row = db.session.execute(db.select(User.user_id, User.name, User.email).filter_by(user_id=user_id)).first()
+
+        # the user no longer exists - rejected by the error handler below
+        if row is None:
+            return None
+
+        identity = Identity(*row)
+        identities.set(user_id, identity)
+
+    return identity
+
+
+# user lookup error handler - occurs when a valid token belongs to a user that doesn't exist
+@jwt.user_lookup_error_loader
+def user_lookup_error(jwt_header, jwt_data):
+    return jsonify({"error": "The user for this token doesn't exist"}), 401
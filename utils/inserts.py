@@ -0,0 +1,91 @@
+# import csv, io, itertools and datetime library
+import csv
+import io
+import itertools
+from datetime import datetime
+
+# import SQLAlchemy
+from main import db
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+# build an INSERT that skips rows conflicting with a unique constraint (INSERT ... ON CONFLICT DO NOTHING)
+# skipped rows are missing from RETURNING, so callers can tell which rows were inserted
+def insert_or_ignore(table):
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        return postgresql.insert(table).on_conflict_do_nothing()
+    if dialect == "sqlite":
+        return sqlite.insert(table).on_conflict_do_nothing()
+
+    # other databases raise an IntegrityError on conflicts
+    return db.insert(table)
+
+
+# insert one row unless it conflicts with a unique constraint, and return the inserted row's id (None if it was skipped)
+# one statement replaces checking for an existing row before inserting, and can't let a concurrent duplicate through
+def insert_unique(model, id_column, **values):
+    stmt = insert_or_ignore(model.__table__).values(**values).returning(id_column)
+    return db.session.execute(stmt).scalar()
+
+
+# delete the rows of a model matching the filters, and return the deleted row's id (None if nothing was deleted)
+def delete_returning(model, id_column, **filters):
+    stmt = db.delete(model).filter_by(**filters).returning(id_column).execution_options(synchronize_session=False)
+    return db.session.execute(stmt).scalar()
+
+
+# insert rows into a table in batches - with COPY on postgresql, otherwise with one executemany INSERT per batch
+def bulk_insert(table, columns, rows, batch_size):
+    connection = db.session.connection()
+    total = 0
+
+    for batch in _batches(rows, batch_size):
+        if connection.dialect.name == "postgresql":
+            _copy(connection, table, columns, batch)
+        else:
+            connection.execute(table.insert(), [dict(zip(columns, row)) for row in batch])
+        total += len(batch)
+
+    # rows were inserted with explicit ids, so move the postgresql id sequence past them
+    primary_key = list(table.primary_key.columns)
+    if connection.dialect.name == "postgresql" and total and len(primary_key) == 1 and primary_key[0].autoincrement:
+        connection.execute(db.text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', '{primary_key[0].name}'), (SELECT max({primary_key[0].name}) FROM {table.name}))"
+        ))
+
+    return total
+
+
+def _batches(rows, batch_size):
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+# stream a batch of rows to postgresql as CSV with COPY
+# None is written as \N, so empty strings stay empty strings instead of becoming NULL
+def _copy(connection, table, columns, batch):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in batch:
+        writer.writerow(_copy_value(value) for value in row)
+    buffer.seek(0)
+
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+    finally:
+        cursor.close()
+
+
+def _copy_value(value):
+    if value is None:
+        return "\\N"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
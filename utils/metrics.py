@@ -0,0 +1,131 @@
+# import os and time library
+import os
+import time
+
+# import SQLAlchemy events
+from sqlalchemy import event
+
+# import the prometheus client
+from prometheus_client import CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest, multiprocess
+
+# flask related imports for requests
+from flask import request, g, has_app_context
+
+# import the connection pool signals
+from utils.pool import connection_checkout, connection_timeout
+
+
+# when gunicorn runs several worker processes, each worker writes its metrics to files in this directory and /metrics
+# merges them, so every scrape reports the totals of all the workers (see gunicorn.conf.py)
+MULTIPROCESS_DIR = "PROMETHEUS_MULTIPROC_DIR"
+
+# latency buckets in seconds, from a cached response to a slow page
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# buckets for the number of SQL statements run by one request
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+
+# time taken to answer each request, by flask endpoint (e.g. "blogposts.get_posts"), method and status code
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time taken to answer a request",
+    ["endpoint", "method", "status"], buckets=LATENCY_BUCKETS
+)
+
+# number of SQL statements run by each request, by endpoint
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "Number of SQL statements run by a request",
+    ["endpoint"], buckets=QUERY_COUNT_BUCKETS
+)
+
+# total time spent running SQL statements by each request, by endpoint
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_duration_seconds", "Time a request spent running SQL statements",
+    ["endpoint"], buckets=LATENCY_BUCKETS
+)
+
+# time each connection checkout waited for the pool, and the share of the pool in use after it
+POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time waited for a database connection from the pool",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+)
+POOL_SATURATION = Histogram(
+    "db_pool_saturation", "Share of the connection pool checked out after a checkout",
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+)
+POOL_TIMEOUTS = Counter("db_pool_checkout_timeouts", "Requests that gave up waiting for a database connection")
+
+
+# add a SQL statement's duration to the current request's totals
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_start"].pop()
+
+    # statements run outside a request (e.g. CLI commands) aren't recorded
+    if has_app_context():
+        stats = g.get("db_stats")
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += duration
+
+
+# record the wait and pool usage of each connection checkout
+def _record_checkout(pool, wait, checked_out, capacity, saturation):
+    POOL_WAIT.observe(wait)
+    POOL_SATURATION.observe(saturation)
+
+
+def _record_timeout(pool, wait, checked_out, capacity, saturation):
+    POOL_TIMEOUTS.inc()
+
+
+# start the request timer and the SQL statement totals
+def _start_request():
+    g.request_start = time.perf_counter()
+    g.db_stats = [0, 0.0]
+
+
+# record the request's metrics once its response has been sent (after the last chunk of a streamed response)
+def _record_request(response):
+    start = g.get("request_start")
+    stats = g.get("db_stats")
+    if start is None or request.endpoint == "metrics.get_metrics":
+        return response
+
+    endpoint = request.endpoint or "none"
+    method = request.method
+    status = str(response.status_code)
+
+    def record():
+        REQUEST_LATENCY.labels(endpoint, method, status).observe(time.perf_counter() - start)
+        REQUEST_QUERIES.labels(endpoint).observe(stats[0])
+        REQUEST_DB_TIME.labels(endpoint).observe(stats[1])
+
+    response.call_on_close(record)
+    return response
+
+
+# record request latency and SQL statements for every request, and SQL statements for every engine (primary and replicas)
+def init_metrics(app, engines):
+    app.before_request(_start_request)
+    app.after_request(_record_request)
+
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    connection_checkout.connect(_record_checkout)
+    connection_timeout.connect(_record_timeout)
+
+
+# the metrics of every worker process in the prometheus text format
+def latest_metrics():
+    if os.environ.get(MULTIPROCESS_DIR):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+
+    return generate_latest(REGISTRY)
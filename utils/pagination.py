@@ -0,0 +1,118 @@
+# import base64, json and datetime library
+import base64
+import json
+from datetime import datetime
+
+# import SQLAlchemy
+from main import db
+
+# flask related imports for requests
+from flask import request, abort
+
+
+# default and maximum number of rows returned in a single page
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+# encode the sort key values of the last row in a page into an opaque cursor string
+def encode_cursor(values):
+    # convert datetimes into strings so they can be stored as json
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("utf-8")
+
+
+# decode a cursor string back into its list of values
+def _load_cursor(cursor, length):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("utf-8")))
+    except (ValueError, TypeError):
+        abort(400, description="The 'cursor' parameter is invalid")
+
+    # the cursor must contain the expected number of values
+    if not isinstance(values, list) or len(values) != length:
+        abort(400, description="The 'cursor' parameter is invalid")
+
+    return values
+
+
+# decode a cursor string back into sort key values, using the sort columns to restore their types
+def decode_cursor(cursor, sort_columns):
+    values = _load_cursor(cursor, len(sort_columns))
+
+    # convert string values back into datetimes for datetime columns
+    decoded = []
+    for column, value in zip(sort_columns, values):
+        if column.type.python_type is datetime and value is not None:
+            try:
+                value = datetime.fromisoformat(value)
+            except (ValueError, TypeError):
+                abort(400, description="The 'cursor' parameter is invalid")
+        decoded.append(value)
+
+    return decoded
+
+
+# read the 'limit' query parameter, falling back to the default page size
+def get_limit():
+    limit = request.args.get("limit", DEFAULT_PAGE_SIZE)
+
+    try:
+        limit = int(limit)
+    except ValueError:
+        abort(400, description="The 'limit' parameter must be a number")
+
+    # the limit must be between 1 and the maximum page size
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        abort(400, description=f"The 'limit' parameter must be between 1 and {MAX_PAGE_SIZE}")
+
+    return limit
+
+
+# order a select statement by its sort key, continuing after the last row of the previous page if a cursor was provided
+def order_by_keyset(stmt, sort_columns, descending=False):
+    cursor = request.args.get("cursor")
+    if cursor:
+        stmt = after_keyset(stmt, sort_columns, decode_cursor(cursor, sort_columns), descending)
+
+    order = [column.desc() if descending else column.asc() for column in sort_columns]
+    return stmt.order_by(*order)
+
+
+# filter a select statement to the rows after the row with the given sort key values
+def after_keyset(stmt, sort_columns, values, descending=False):
+    key = db.tuple_(*sort_columns)
+    last = db.tuple_(*[db.literal(value, column.type) for column, value in zip(sort_columns, values)])
+    return stmt.where(key < last if descending else key > last)
+
+
+# apply keyset pagination to a select statement and return one page of rows with the next cursor
+# sort_columns must be an indexed, unique sort key ending with the primary key e.g. (posted_date, post_id)
+def paginate(stmt, sort_columns, descending=False):
+    limit = get_limit()
+
+    # order by the sort key and fetch one extra row to check if there is another page
+    stmt = order_by_keyset(stmt, sort_columns, descending)
+    rows = db.session.scalars(stmt.limit(limit + 1)).all()
+
+    # if an extra row was returned, build the cursor from the last row of this page
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([getattr(rows[-1], column.key) for column in sort_columns])
+
+    return rows, next_cursor
+
+
+# read an offset cursor - used where rows are ordered by a computed value (e.g. search rank) that can't be used as a keyset
+def get_offset():
+    cursor = request.args.get("cursor")
+    if not cursor:
+        return 0
+
+    # the cursor must contain one non-negative whole number
+    offset = _load_cursor(cursor, 1)[0]
+    if type(offset) != int or offset < 0:
+        abort(400, description="The 'cursor' parameter is invalid")
+
+    return offset
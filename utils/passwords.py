@@ -0,0 +1,83 @@
+# import threading, bcrypt and thread pool libraries
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import bcrypt
+
+
+# raised when the hashing queue is full, or a password hash doesn't finish within the configured timeout
+class PasswordHasherBusy(Exception):
+    pass
+
+
+# password hashing service - runs bcrypt on a bounded pool of threads with a configurable work factor
+# bcrypt releases the GIL while hashing, so the pool lets hashing use the CPU cores while at most a fixed number of
+# hashes run at once per worker; a burst of logins queues in order (or is turned away) instead of starving other requests
+class PasswordHasher:
+    def __init__(self, app=None):
+        self.rounds = 12
+        self.timeout = None
+        self._executor = None
+        self._slots = None
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # bcrypt work factor (log2 of the number of rounds) used for new hashes
+        self.rounds = app.config["BCRYPT_LOG_ROUNDS"]
+
+        # seconds a request waits for its hash (queued and running) before giving up
+        self.timeout = app.config["PASSWORD_HASH_TIMEOUT"]
+
+        # 0 workers hashes on the request thread
+        workers = app.config["PASSWORD_HASH_WORKERS"]
+        self._executor = None
+        if workers > 0:
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+
+            # one slot for each running hash and each hash allowed to wait in the queue
+            self._slots = threading.BoundedSemaphore(workers + app.config["PASSWORD_HASH_QUEUE_SIZE"])
+
+        app.extensions["passwords"] = self
+
+    # run a bcrypt function on the pool - hashes queue in order, and are turned away straight away when the queue is full
+    # the request thread waits up to the timeout for its hash, so the queue size and timeout bound how long a burst of
+    # logins holds request threads. a hash that has already started can't be stopped: after a timeout it still runs to
+    # completion on its pool thread (keeping its slot), only the request stops waiting for it
+    def _run(self, func, *args):
+        if self._executor is None:
+            return func(*args)
+
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy()
+
+        future = self._executor.submit(func, *args)
+        future.add_done_callback(lambda future: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            # drop the hash from the queue if it hasn't started yet
+            future.cancel()
+            raise PasswordHasherBusy()
+
+    # hash a password with the configured work factor and return the hash as a string
+    def hash(self, password):
+        salt = bcrypt.gensalt(self.rounds)
+        return self._run(bcrypt.hashpw, password.encode("utf-8"), salt).decode("utf-8")
+
+    # check a password against a stored hash
+    def check(self, password_hash, password):
+        try:
+            return self._run(bcrypt.checkpw, password.encode("utf-8"), password_hash.encode("utf-8"))
+        except ValueError:
+            # the stored value isn't a bcrypt hash
+            return False
+
+    # return whether a stored hash was made with a different work factor than the configured one
+    # (the cost is the number after the version in "$2b$12$...")
+    def needs_rehash(self, password_hash):
+        try:
+            return int(password_hash.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return False
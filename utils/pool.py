@@ -0,0 +1,66 @@
+# import time and the blinker signals library
+import time
+from blinker import Namespace
+
+# import the SQLAlchemy queue pool and its checkout timeout error
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import QueuePool
+
+
+# signals sent by the connection pool - subscribe to them to log, graph or alert on pool usage
+# e.g. connection_checkout.connect(receiver) where receiver(pool, wait, checked_out, capacity, saturation)
+pool_signals = Namespace()
+
+# sent every time a request gets a connection from the pool, with the seconds it waited for one
+connection_checkout = pool_signals.signal("connection-checkout")
+
+# sent when a request gave up waiting for a connection (the pool stayed full for the pool timeout)
+connection_timeout = pool_signals.signal("connection-timeout")
+
+
+# queue pool that measures how long each checkout waited and how full the pool is
+# saturation is the share of the pool's capacity (pool size + max overflow) that is checked out - a pool that is often
+# near 1 with long waits is too small for the number of gunicorn worker threads using it
+class InstrumentedQueuePool(QueuePool):
+    # total number of connections the pool can hand out at once
+    def capacity(self):
+        return self.size() + max(self._max_overflow, 0)
+
+    # the arguments sent with both signals
+    def _usage(self, wait):
+        checked_out = self.checkedout()
+        capacity = self.capacity()
+        return {
+            "wait": wait,
+            "checked_out": checked_out,
+            "capacity": capacity,
+            "saturation": checked_out / capacity if capacity else 1.0,
+        }
+
+    # get a connection from the queue (waiting for one to be returned if the pool is full)
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except TimeoutError:
+            connection_timeout.send(self, **self._usage(time.perf_counter() - start))
+            raise
+
+        connection_checkout.send(self, **self._usage(time.perf_counter() - start))
+        return connection
+
+
+# log a warning for each checkout that waited longer than DB_POOL_WAIT_WARNING seconds, and for each checkout timeout
+def log_pool_waits(app):
+    threshold = app.config["DB_POOL_WAIT_WARNING"]
+
+    def log_checkout(pool, wait, checked_out, capacity, saturation):
+        if threshold and wait >= threshold:
+            app.logger.warning(f"Waited {wait * 1000:.0f}ms for a database connection ({checked_out}/{capacity} in use)")
+
+    def log_timeout(pool, wait, checked_out, capacity, saturation):
+        app.logger.error(f"Gave up waiting for a database connection after {wait * 1000:.0f}ms ({checked_out}/{capacity} in use)")
+
+    # keep strong references, as blinker holds receivers weakly by default
+    connection_checkout.connect(log_checkout, weak=False)
+    connection_timeout.connect(log_timeout, weak=False)
@@ -0,0 +1,96 @@
+# import time and datetime library
+import time
+from datetime import datetime, timedelta
+
+# import SQLAlchemy, the counters and the search index
+from main import db
+from utils.counters import recount
+from utils.search import remove_posts
+
+# import models
+from models.users import User
+from models.blog_posts import BlogPost
+from models.comments import Comment
+from models.likes import Like
+from models.followers import Follower
+from models.timelines import Timeline
+from models.categories import post_categories
+
+
+# run a statement on every row, including the soft deleted ones the app's queries don't see
+def _execute(stmt):
+    return db.session.execute(stmt.execution_options(include_deleted=True))
+
+
+# delete the rows of a table matching condition, batch_size rows per transaction, and return the number deleted
+# each batch selects the primary keys of up to batch_size rows (and any extra columns), deletes those rows and commits,
+# so no statement or transaction touches more than batch_size rows and the app's writes never wait long on the purge.
+# on_batch(rows) is called with the selected rows after they are deleted, before the commit
+def delete_in_batches(table, condition, batch_size, columns=(), on_batch=None):
+    key = list(table.primary_key.columns)
+    deleted = 0
+    while True:
+        rows = _execute(db.select(*key, *columns).where(condition).limit(batch_size)).all()
+        if not rows:
+            return deleted
+
+        ids = [tuple(row[:len(key)]) for row in rows]
+        match = key[0].in_([id for id, in ids]) if len(key) == 1 else db.tuple_(*key).in_(ids)
+        _execute(db.delete(table).where(match))
+        if on_batch is not None:
+            on_batch(rows)
+        db.session.commit()
+
+        deleted += len(rows)
+        if len(rows) < batch_size:
+            return deleted
+
+
+# remove the users, posts and comments soft deleted at least older_than ago, with everything referencing them, and return
+# the number of rows deleted for each step. children are deleted before their parents, so deleting a row never cascades
+# to an unbounded number of others
+def purge_deleted(older_than=timedelta(0), batch_size=1000, log=print):
+    cutoff = datetime.now() - older_than
+    users, posts, comments = User.__table__, BlogPost.__table__, Comment.__table__
+    likes, followers, timelines = Like.__table__, Follower.__table__, Timeline.__table__
+
+    # the rows to purge - deleting a user only marks the user, so their posts and comments are found through the author
+    deleted_users = db.select(users.c.user_id).where(users.c.deleted_at <= cutoff)
+    deleted_posts = db.select(posts.c.post_id).where(db.or_(posts.c.deleted_at <= cutoff, posts.c.author_id.in_(deleted_users)))
+    deleted_comments = db.select(comments.c.comment_id).where(db.or_(
+        comments.c.deleted_at <= cutoff, comments.c.author_id.in_(deleted_users), comments.c.post_id.in_(deleted_posts)
+    ))
+
+    # likes and follows by deleted users are counted on rows that stay, so those counters are recounted
+    def recount_likes(rows):
+        recount(post_ids={row.post_id for row in rows if row.post_id}, comment_ids={row.comment_id for row in rows if row.comment_id})
+
+    def recount_followers(rows):
+        recount(user_ids={row.followed_id for row in rows})
+
+    def unindex_posts(rows):
+        remove_posts(row.post_id for row in rows)
+
+    # (name, table, condition, extra columns, on_batch) in the order they run
+    steps = [
+        ("comment likes", likes, likes.c.comment_id.in_(deleted_comments), (), None),
+        ("comments", comments, comments.c.comment_id.in_(deleted_comments), (), None),
+        ("post likes", likes, likes.c.post_id.in_(deleted_posts), (), None),
+        ("post category links", post_categories, post_categories.c.post_id.in_(deleted_posts), (), None),
+        ("timeline entries", timelines, timelines.c.post_id.in_(deleted_posts), (), None),
+        ("posts", posts, posts.c.post_id.in_(deleted_posts), (), unindex_posts),
+        ("likes by users", likes, likes.c.liker_id.in_(deleted_users), (likes.c.post_id, likes.c.comment_id), recount_likes),
+        ("follows by users", followers, followers.c.follower_id.in_(deleted_users), (followers.c.followed_id,), recount_followers),
+        ("follows of users", followers, followers.c.followed_id.in_(deleted_users), (), None),
+        ("user timelines", timelines, timelines.c.user_id.in_(deleted_users), (), None),
+        ("users", users, users.c.deleted_at <= cutoff, (), None),
+    ]
+
+    counts = {}
+    for name, table, condition, columns, on_batch in steps:
+        start = time.perf_counter()
+        counts[name] = delete_in_batches(table, condition, batch_size, columns, on_batch)
+        if counts[name]:
+            log(f"{counts[name]} {name} purged in {time.perf_counter() - start:.1f}s")
+
+    return counts
@@ -0,0 +1,66 @@
+# pytest fixtures for testing the api against a temporary sqlite database, with query budgets enforced
+# enable with "pytest -p utils.pytest_plugin" or "pytest_plugins = ['utils.pytest_plugin']" in a conftest.py
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+
+# the flask app, connected to an empty sqlite database in a temporary folder
+# every request fails with QueryBudgetExceeded if its endpoint goes over its query budget or runs a query in a loop
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setenv("JWT_SECRET_KEY", "test-secret-key-that-is-long-enough-for-hs256")
+    monkeypatch.setenv("QUERY_BUDGET_MODE", "raise")
+    monkeypatch.setenv("CACHE_BACKEND", "none")
+    monkeypatch.setenv("BCRYPT_LOG_ROUNDS", "4")
+    monkeypatch.delenv("DATABASE_REPLICA_URIS", raising=False)
+
+    from main import app_init, db
+
+    app = app_init()
+    app.config["TESTING"] = True
+
+    # only the primary's tables - the metadata of any replica bind stays with the shared db object after the app is gone
+    with app.app_context():
+        db.create_all(bind_key=None)
+        yield app
+        db.session.remove()
+        db.drop_all(bind_key=None)
+
+
+# test client for the app
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+# context manager failing the test if the code inside it runs more than max_queries SQL statements
+# e.g. with max_queries(2): client.get("/posts/1")
+@pytest.fixture
+def max_queries(app):
+    from main import db
+
+    from utils.query_budget import continues_execution
+
+    @contextmanager
+    def check(limit):
+        statements = []
+        previous = [None]
+
+        # the batches of one multi-row INSERT count as one statement, as in the query budgets
+        def count(conn, cursor, statement, parameters, context, executemany):
+            if not continues_execution(context, previous[0]):
+                statements.append(statement)
+                previous[0] = context
+
+        event.listen(db.engine, "before_cursor_execute", count)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, "before_cursor_execute", count)
+
+        assert len(statements) <= limit, f"ran {len(statements)} SQL statements, expected at most {limit}:\n" + "\n".join(statements)
+
+    return check
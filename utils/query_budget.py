@@ -0,0 +1,176 @@
+# import Regex and collections library
+import re
+from collections import Counter
+
+# import SQLAlchemy events
+from sqlalchemy import event
+from sqlalchemy.engine.interfaces import ExecuteStyle
+
+# flask related imports for requests
+from flask import request, g, current_app, has_app_context
+
+
+# maximum number of SQL statements each endpoint may run, keyed by flask endpoint name - the worst case measured on sqlite
+# (the database of the pytest fixtures in utils/pytest_plugin.py) with a cold identity and response cache, including
+# optional work (e.g. creating new categories, fanning out to followers or upgrading a stale password hash) and the extra
+# lookup after a concurrent request created the same category. they are measured with several rows behind every
+# relationship (the "populated" fixture in tests/test_query_budgets.py), so a query run once per row can't fit in them.
+# a change that needs more should say why in its review
+# views can also declare their budget with the @query_budget(n) decorator, which takes precedence over this map
+QUERY_BUDGETS = {
+    # auth
+    "auth.register_user": 3,
+    "auth.login_user": 2,
+
+    # blog posts
+    "blogposts.get_posts": 5,
+    "blogposts.get_posts_list": 2,
+    "blogposts.search_posts": 4,
+    "blogposts.view_category": 5,
+    "blogposts.view_post": 6,
+    "blogposts.create_post": 12,
+    "blogposts.create_posts_batch": 11,
+    "blogposts.update_post": 6,
+    "blogposts.delete_post": 4,
+
+    # categories
+    "category.new_category": 8,
+    "category.delete_category": 4,
+
+    # comments
+    "comments.get_post_comments": 3,
+    "comments.like_post": 4,
+    "comments.update_comment": 4,
+    "comments.delete_comment": 3,
+
+    # likes
+    "likes.get_post_likes": 2,
+    "likes.get_comment_likes": 2,
+    "likes.like_post": 3,
+    "likes.like_comment": 3,
+    "likes.toggle_post_like": 4,
+    "likes.toggle_comment_like": 4,
+    "likes.delete_post_like": 3,
+    "likes.delete_comment_like": 3,
+
+    # followers
+    "followers.get_post_likes": 2,
+    "followers.follow_user": 4,
+    "followers.delete_post_like": 4,
+
+    # users
+    "users.get_users": 1,
+    "users.view_user": 4,
+    "users.view_user_posts": 2,
+    "users.view_user_comments": 1,
+    "users.view_user_likes": 1,
+    "users.update_post": 4,
+    "users.delete_user": 7,
+
+    # feed, cache and metrics
+    "feed.get_feed": 6,
+    "cache.get_cache_stats": 0,
+    "metrics.get_metrics": 0,
+}
+
+# a statement run more than this many times in one request is reported as a query in a loop (N+1)
+REPEATED_STATEMENT_LIMIT = 3
+
+# bound parameter lists of different lengths (e.g. "IN (?, ?, ?)" or "IN (__[POSTCOMPILE_ids])") are the same statement
+_PARAMETER_LIST = re.compile(r"\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*,?)+\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+# raised in "raise" mode when a request runs more statements than its endpoint's budget, or a statement in a loop
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+# decorator declaring the maximum number of SQL statements a view may run
+def query_budget(max_queries):
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+
+    return decorator
+
+
+# the budget of the current request's endpoint (None if it has no budget)
+def endpoint_budget():
+    view = current_app.view_functions.get(request.endpoint)
+    budget = getattr(view, "query_budget", None)
+    return budget if budget is not None else QUERY_BUDGETS.get(request.endpoint)
+
+
+# statement text with whitespace and the length of parameter lists ignored, so repeats of the same query match
+def normalize_statement(statement):
+    return _PARAMETER_LIST.sub("(?)", _WHITESPACE.sub(" ", statement).strip())
+
+
+# the statements of the current request that ran more than REPEATED_STATEMENT_LIMIT times, with their counts
+def repeated_statements(statements):
+    counts = Counter(normalize_statement(statement) for statement in statements)
+    return {statement: count for statement, count in counts.items() if count > REPEATED_STATEMENT_LIMIT}
+
+
+# whether a statement is another batch of the execution before it - a multi-row INSERT is sent in batches by the dialect
+# ("insertmanyvalues"), on sqlite one row at a time for INSERT ... RETURNING in parameter order, and counts as one statement
+def continues_execution(context, previous_context):
+    return context is not None and context is previous_context and context.execute_style is ExecuteStyle.INSERTMANYVALUES
+
+
+# collect the statements run by the current request
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context():
+        statements = g.get("query_log")
+        if statements is not None and not continues_execution(context, g.query_context):
+            statements.append(statement)
+            g.query_context = context
+
+
+def _start_request():
+    g.query_log = []
+    g.query_context = None
+
+
+# compare the request's statements with its endpoint's budget, and log or raise when it goes over
+def _check_request(response):
+    # requests that didn't match a view (e.g. 404s) have no budget to check
+    statements = g.get("query_log")
+    if statements is None or request.endpoint is None:
+        return response
+
+    problems = []
+
+    budget = endpoint_budget()
+    if budget is None:
+        problems.append(f"{request.endpoint} has no query budget (ran {len(statements)} statements)")
+    elif len(statements) > budget:
+        problems.append(f"{request.endpoint} ran {len(statements)} statements, over its budget of {budget}")
+
+    for statement, count in repeated_statements(statements).items():
+        problems.append(f"{request.endpoint} ran the same statement {count} times (a query in a loop?): {statement}")
+
+    if not problems:
+        return response
+
+    if current_app.config["QUERY_BUDGET_MODE"] == "raise":
+        raise QueryBudgetExceeded("\n".join(problems))
+
+    for problem in problems:
+        current_app.logger.warning(problem)
+
+    return response
+
+
+# check every request against its query budget - QUERY_BUDGET_MODE is "off" (default in production), "log" or "raise" (tests)
+# statements run while a streamed response is being sent aren't counted, as the check runs before the body is sent
+def init_query_budgets(app, engines):
+    if app.config["QUERY_BUDGET_MODE"] == "off":
+        return
+
+    app.before_request(_start_request)
+    app.after_request(_check_request)
+
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
@@ -0,0 +1,197 @@
+# import random, threading and time library
+import random
+import threading
+import time
+
+# import SQLAlchemy and the flask-sqlalchemy session
+import sqlalchemy as sa
+from flask_sqlalchemy.session import Session
+
+# flask related imports for requests and authentication
+from flask import request, g, current_app, has_app_context
+from flask_jwt_extended import decode_token, get_jwt_identity
+
+# import the cache backends, used to remember users who wrote recently
+from utils.cache import LRUCache, RedisCache
+
+
+# requests with these methods don't change data, so they can read from a replica
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# seconds behind the primary a postgresql replica is (NULL on a primary or before any replay)
+REPLICATION_LAG = sa.text("SELECT EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())")
+
+
+# health of one replica, re-checked at most once per interval
+class ReplicaHealth:
+    def __init__(self, key):
+        self.key = key
+        self.healthy = True
+        self.checked_at = None
+        self._lock = threading.Lock()
+
+
+# read replica routing - GET requests to the blueprints using route_reads are read from a healthy replica, everything else
+# (writes, other requests, CLI commands, views marked with @replicas.primary) uses the primary database
+# replicas are the SQLALCHEMY_BINDS named "replica_<n>", built from DATABASE_REPLICA_URIS in config.py
+class Replicas:
+    def __init__(self):
+        self.keys = []
+        self.health = {}
+        self.check_interval = 10
+        self.max_lag = 5
+        self.sticky_seconds = 5
+        self._recent_writers = None
+
+    def init_app(self, app):
+        self.keys = sorted(key for key in app.config.get("SQLALCHEMY_BINDS", {}) if key.startswith("replica_"))
+        self.health = {key: ReplicaHealth(key) for key in self.keys}
+        self.check_interval = app.config["REPLICA_CHECK_INTERVAL"]
+        self.max_lag = app.config["REPLICA_MAX_LAG"]
+        self.sticky_seconds = app.config["REPLICA_STICKY_SECONDS"]
+
+        # users who wrote in the last few seconds read from the primary, so they see their own writes
+        # kept in redis when the response cache uses it, so every worker knows about the write
+        self._recent_writers = None
+        if self.keys and self.sticky_seconds > 0:
+            if app.config.get("CACHE_BACKEND") == "redis":
+                self._recent_writers = RedisCache(app.config.get("CACHE_REDIS_URL"), self.sticky_seconds, prefix="blog-api:writer:")
+            else:
+                self._recent_writers = LRUCache(app.config.get("JWT_IDENTITY_CACHE_SIZE", 10000), self.sticky_seconds)
+
+            app.after_request(self._remember_writer)
+
+        # a replica that drops connections is marked unhealthy straight away
+        with app.app_context():
+            engines = current_app.extensions["sqlalchemy"].engines
+            for key in self.keys:
+                sa.event.listen(engines[key], "handle_error", self._make_error_handler(key))
+
+        app.extensions["replicas"] = self
+
+    # decorator for GET views that must read from the primary (cached views don't need it - the response cache reads a
+    # key removed by a recent write from the primary, see ResponseCache.init_app)
+    def primary(self, view):
+        view.use_primary = True
+        return view
+
+    # read the GET requests of a blueprint from the replicas
+    def route_reads(self, blueprint):
+        blueprint.before_request(self._route_request)
+
+    # choose where the current request reads from
+    def _route_request(self):
+        if not self.keys or request.method not in SAFE_METHODS:
+            return
+
+        view = current_app.view_functions.get(request.endpoint)
+        if getattr(view, "use_primary", False) or self._wrote_recently():
+            return
+
+        g.read_replica = self._choose()
+
+    # the key of a random healthy replica, or None to fall back to the primary
+    def _choose(self):
+        healthy = [key for key in self.keys if self._is_healthy(self.health[key])]
+        return random.choice(healthy) if healthy else None
+
+    # whether a replica is healthy, re-checking it if the last check is older than the check interval
+    def _is_healthy(self, health):
+        now = time.monotonic()
+        if health.checked_at is not None and now - health.checked_at < self.check_interval:
+            return health.healthy
+
+        # one request re-checks the replica, the others use the last result in the meantime
+        if not health._lock.acquire(blocking=False):
+            return health.healthy
+
+        try:
+            health.healthy = self._check(health.key)
+            health.checked_at = time.monotonic()
+        finally:
+            health._lock.release()
+
+        return health.healthy
+
+    # connect to a replica and check how far it is behind the primary
+    def _check(self, key):
+        engine = current_app.extensions["sqlalchemy"].engines[key]
+        try:
+            with engine.connect() as connection:
+                if connection.dialect.name != "postgresql":
+                    connection.execute(sa.text("SELECT 1"))
+                    return True
+
+                lag = connection.scalar(REPLICATION_LAG)
+        except sa.exc.DBAPIError as e:
+            current_app.logger.warning(f"Database replica {key} is unavailable, reading from the primary: {e}")
+            return False
+
+        if lag is not None and lag > self.max_lag:
+            current_app.logger.warning(f"Database replica {key} is {lag:.1f}s behind, reading from the primary")
+            return False
+
+        return True
+
+    # engine error listener marking a replica unhealthy when its connection is lost
+    def _make_error_handler(self, key):
+        health = self.health[key]
+
+        def handle_error(context):
+            if context.is_disconnect:
+                health.healthy = False
+                health.checked_at = time.monotonic()
+
+        return handle_error
+
+    # the user id of the request's bearer token, without loading the user (None for anonymous or invalid tokens)
+    def _token_user_id(self):
+        header = request.headers.get("Authorization", "")
+        if not header.startswith("Bearer "):
+            return None
+
+        try:
+            return decode_token(header[len("Bearer "):])["sub"]
+        except Exception:
+            return None
+
+    # whether the request's user made a write in the last REPLICA_STICKY_SECONDS seconds
+    def _wrote_recently(self):
+        if self._recent_writers is None:
+            return False
+
+        user_id = self._token_user_id()
+        return user_id is not None and self._recent_writers.get(f"{user_id}", "wrote") is not None
+
+    # after a successful authenticated write, read that user's requests from the primary for the next few seconds
+    def _remember_writer(self, response):
+        if request.method in SAFE_METHODS or response.status_code >= 400:
+            return response
+
+        try:
+            user_id = get_jwt_identity()
+        except RuntimeError:
+            user_id = None
+
+        if user_id is not None:
+            # replace the entry, so the sticky window restarts from the latest write
+            self._recent_writers.delete(f"{user_id}")
+            self._recent_writers.set(f"{user_id}", "wrote", b"1")
+
+        return response
+
+
+# session reading SELECTs from the replica chosen for the request, and everything else from the primary
+# once the session has written anything, it reads from the primary for the rest of the request
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            key = g.get("read_replica")
+
+            if key is not None and not self._flushing and not self.info.get("wrote") and getattr(clause, "is_select", False):
+                return self._db.engines[key]
+
+            if self._flushing or (clause is not None and not getattr(clause, "is_select", False)):
+                self.info["wrote"] = True
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -0,0 +1,143 @@
+# import Regex and SQLAlchemy
+import re
+from main import db
+from sqlalchemy import event, func
+
+# import models
+from models.blog_posts import BlogPost
+
+
+# text search configuration used to build the postgresql tsvector
+SEARCH_LANGUAGE = "english"
+
+# relative weight of the post title compared to the post content in the sqlite bm25 ranking
+TITLE_WEIGHT = 10.0
+CONTENT_WEIGHT = 1.0
+
+
+# sqlite has no tsvector, so an FTS5 virtual table keyed by post_id (rowid) is used as the inverted index
+event.listen(
+    BlogPost.__table__,
+    "after_create",
+    db.DDL("CREATE VIRTUAL TABLE IF NOT EXISTS blogposts_fts USING fts5(post_title, post_content, tokenize='porter unicode61')").execute_if(dialect="sqlite")
+)
+event.listen(
+    BlogPost.__table__,
+    "before_drop",
+    db.DDL("DROP TABLE IF EXISTS blogposts_fts").execute_if(dialect="sqlite")
+)
+
+
+# name of the database dialect in use (e.g. "postgresql" or "sqlite")
+def _dialect():
+    return db.session.get_bind().dialect.name
+
+
+# build the weighted tsvector expression for a post (title ranks above content)
+def _tsvector():
+    title = func.setweight(func.to_tsvector(SEARCH_LANGUAGE, func.coalesce(BlogPost.post_title, "")), "A")
+    content = func.setweight(func.to_tsvector(SEARCH_LANGUAGE, func.coalesce(BlogPost.post_content, "")), "B")
+    return title.op("||")(content)
+
+
+# add or refresh a post in the search index - call after the post has been added or changed, before commit
+def index_post(post):
+    # make sure the post has an id and its changes are written to the database
+    db.session.flush()
+
+    if _dialect() == "postgresql":
+        stmt = db.update(BlogPost).where(BlogPost.post_id == post.post_id).values(search_vector=_tsvector())
+        db.session.execute(stmt.execution_options(synchronize_session=False))
+    elif _dialect() == "sqlite":
+        db.session.execute(db.text("DELETE FROM blogposts_fts WHERE rowid = :post_id"), {"post_id": post.post_id})
+        db.session.execute(
+            db.text("INSERT INTO blogposts_fts (rowid, post_title, post_content) VALUES (:post_id, :post_title, :post_content)"),
+            {"post_id": post.post_id, "post_title": post.post_title, "post_content": post.post_content}
+        )
+
+
+# add or refresh many posts in the search index with a fixed number of statements - call before commit
+def index_posts(post_ids):
+    post_ids = list(post_ids)
+    if not post_ids:
+        return
+
+    if _dialect() == "postgresql":
+        stmt = db.update(BlogPost).where(BlogPost.post_id.in_(post_ids)).values(search_vector=_tsvector())
+        db.session.execute(stmt.execution_options(synchronize_session=False))
+    elif _dialect() == "sqlite":
+        params = {"post_ids": post_ids}
+        db.session.execute(db.text("DELETE FROM blogposts_fts WHERE rowid IN :post_ids").bindparams(db.bindparam("post_ids", expanding=True)), params)
+        db.session.execute(db.text(
+            "INSERT INTO blogposts_fts (rowid, post_title, post_content) SELECT post_id, post_title, post_content FROM blogposts WHERE post_id IN :post_ids"
+        ).bindparams(db.bindparam("post_ids", expanding=True)), params)
+
+
+# remove a post from the search index - call when the post is deleted, before commit
+def remove_post(post_id):
+    # the postgresql tsvector is a column of the post, so it is removed together with the row
+    if _dialect() == "sqlite":
+        db.session.execute(db.text("DELETE FROM blogposts_fts WHERE rowid = :post_id"), {"post_id": post_id})
+
+
+# rebuild the whole search index in bulk (e.g. after seeding or importing data)
+# soft deleted posts and the posts of deleted users are left out (the orm update skips them through the soft delete
+# criteria, the sqlite statement filters them itself)
+def reindex_all():
+    if _dialect() == "postgresql":
+        stmt = db.update(BlogPost).values(search_vector=_tsvector())
+        db.session.execute(stmt.execution_options(synchronize_session=False))
+    elif _dialect() == "sqlite":
+        db.session.execute(db.text("DELETE FROM blogposts_fts"))
+        db.session.execute(db.text(
+            "INSERT INTO blogposts_fts (rowid, post_title, post_content) SELECT post_id, post_title, post_content FROM blogposts "
+            "WHERE deleted_at IS NULL AND author_id NOT IN (SELECT user_id FROM users WHERE deleted_at IS NOT NULL)"
+        ))
+
+
+# split a search query into words, ignoring punctuation and search operators
+def _terms(query):
+    return re.findall(r"\w+", query)
+
+
+# return the ids of the posts matching the query, most relevant first
+def search_post_ids(query, limit, offset=0):
+    terms = _terms(query)
+    if not terms:
+        return []
+
+    if _dialect() == "postgresql":
+        # rank posts matching every word using the GIN-indexed tsvector column
+        ts_query = func.plainto_tsquery(SEARCH_LANGUAGE, " ".join(terms))
+        rank = func.ts_rank_cd(BlogPost.search_vector, ts_query)
+        stmt = (
+            db.select(BlogPost.post_id)
+            .where(BlogPost.search_vector.op("@@")(ts_query))
+            .order_by(rank.desc(), BlogPost.post_id)
+            .limit(limit)
+            .offset(offset)
+        )
+        return list(db.session.scalars(stmt))
+
+    if _dialect() == "sqlite":
+        # quote each word so it is matched literally, and rank posts matching every word with bm25 (lower is better)
+        fts_query = " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+        stmt = db.text(
+            "SELECT rowid FROM blogposts_fts WHERE blogposts_fts MATCH :query "
+            "ORDER BY bm25(blogposts_fts, :title_weight, :content_weight), rowid LIMIT :limit OFFSET :offset"
+        )
+        params = {"query": fts_query, "title_weight": TITLE_WEIGHT, "content_weight": CONTENT_WEIGHT, "limit": limit, "offset": offset}
+        return list(db.session.scalars(stmt, params))
+
+    # other databases have no inverted index - fall back to an unranked scan
+    conditions = [db.or_(BlogPost.post_title.ilike(f"%{term}%"), BlogPost.post_content.ilike(f"%{term}%")) for term in terms]
+    stmt = db.select(BlogPost.post_id).where(*conditions).order_by(BlogPost.post_id).limit(limit).offset(offset)
+    return list(db.session.scalars(stmt))
+
+
+# remove many posts from the search index in one statement - e.g. when deleted posts are purged
+def remove_posts(post_ids):
+    post_ids = list(post_ids)
+    if post_ids and _dialect() == "sqlite":
+        stmt = db.text("DELETE FROM blogposts_fts WHERE rowid IN :post_ids").bindparams(db.bindparam("post_ids", expanding=True))
+        db.session.execute(stmt, {"post_ids": post_ids})
@@ -0,0 +1,112 @@
+# import datetime library
+from datetime import datetime
+
+# import SQLAlchemy, its events and the session routing reads to the replicas
+from main import db
+from sqlalchemy import event
+from sqlalchemy.orm import with_loader_criteria
+from utils.replicas import RoutingSession
+
+# import models
+from models.users import User
+from models.blog_posts import BlogPost
+from models.comments import Comment
+from models.likes import Like
+from models.followers import Follower
+from models.timelines import Timeline
+
+
+# models deleted by setting deleted_at instead of removing the row, so a DELETE request is one UPDATE however many comments,
+# likes and follows the row has - "flask db purge" removes the rows and everything referencing them later (utils/purge.py)
+SOFT_DELETE_MODELS = (User, BlogPost, Comment)
+
+# execution option for queries that must see deleted rows, e.g. db.select(User).execution_options(include_deleted=True)
+INCLUDE_DELETED = "include_deleted"
+
+
+# conditions true when the row a foreign key column points to is deleted, or hidden because its author or post is -
+# correlated NOT EXISTS lookups by primary key, so a query (even a lookup of one row) only checks the rows it returns.
+# the subqueries read aliases of the tables, so they never correlate with the same table in the outer query
+def user_deleted(user_id):
+    user = User.__table__.alias()
+    return db.exists().where(user.c.user_id == user_id, user.c.deleted_at.is_not(None))
+
+
+def _post_deleted(post_id):
+    post, author = BlogPost.__table__.alias(), User.__table__.alias()
+    return (
+        db.exists()
+        .select_from(post.join(author, author.c.user_id == post.c.author_id))
+        .where(post.c.post_id == post_id, db.or_(post.c.deleted_at.is_not(None), author.c.deleted_at.is_not(None)))
+    )
+
+
+def _comment_deleted(comment_id):
+    comment, author = Comment.__table__.alias(), User.__table__.alias()
+    post, post_author = BlogPost.__table__.alias(), User.__table__.alias()
+    return (
+        db.exists()
+        .select_from(
+            comment.join(author, author.c.user_id == comment.c.author_id)
+            .join(post, post.c.post_id == comment.c.post_id)
+            .join(post_author, post_author.c.user_id == post.c.author_id)
+        )
+        .where(comment.c.comment_id == comment_id, db.or_(
+            comment.c.deleted_at.is_not(None), author.c.deleted_at.is_not(None),
+            post.c.deleted_at.is_not(None), post_author.c.deleted_at.is_not(None)
+        ))
+    )
+
+
+# the criteria hiding deleted rows and the rows referencing them (which are only removed by the purge), for each model
+# deleting a row only marks that row, so e.g. the posts and comments of a deleted user are hidden through their author
+def _criteria():
+    return {
+        User: User.deleted_at.is_(None),
+        BlogPost: db.and_(BlogPost.deleted_at.is_(None), ~user_deleted(BlogPost.author_id)),
+        Comment: db.and_(
+            Comment.deleted_at.is_(None), ~user_deleted(Comment.author_id), ~_post_deleted(Comment.post_id)
+        ),
+        Like: db.and_(
+            ~user_deleted(Like.liker_id),
+            db.or_(Like.post_id.is_(None), ~_post_deleted(Like.post_id)),
+            db.or_(Like.comment_id.is_(None), ~_comment_deleted(Like.comment_id)),
+        ),
+        Follower: db.and_(~user_deleted(Follower.follower_id), ~user_deleted(Follower.followed_id)),
+        Timeline: ~_post_deleted(Timeline.post_id),
+    }
+
+
+# the loader criteria options added to each query, built once
+_options = []
+
+
+# add the criteria above to each ORM SELECT, UPDATE and DELETE - including joins, subqueries and session.get(). core
+# statements on the tables (e.g. text() or Table.select()) and queries with the include_deleted option see every row
+def _hide_deleted(execute_state):
+    if execute_state.execution_options.get(INCLUDE_DELETED, False):
+        return
+
+    # loading the expired columns of an object already loaded must find its row, even if it was just deleted
+    if execute_state.is_column_load:
+        return
+
+    # relationship loads (lazy and selectin) already carry the criteria of the query that loaded their parents
+    if execute_state.is_relationship_load:
+        return
+
+    if execute_state.is_select or execute_state.is_update or execute_state.is_delete:
+        execute_state.statement = execute_state.statement.options(*_options)
+
+
+# hide deleted rows from every query of the app's sessions
+def hide_deleted_rows():
+    if not _options:
+        _options.extend(with_loader_criteria(model, criteria, include_aliases=True) for model, criteria in _criteria().items())
+    if not event.contains(RoutingSession, "do_orm_execute", _hide_deleted):
+        event.listen(RoutingSession, "do_orm_execute", _hide_deleted)
+
+
+# mark a user, post or comment as deleted - one UPDATE, whatever references it
+def soft_delete(row):
+    row.deleted_at = datetime.now()
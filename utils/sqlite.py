@@ -0,0 +1,17 @@
+# import SQLAlchemy events
+from sqlalchemy import event
+
+
+# sqlite ignores foreign keys unless each connection turns them on, and without them the ON DELETE CASCADE foreign keys
+# would leave the comments, likes and follows of deleted rows behind
+def _enable_foreign_keys(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+# turn foreign keys on for every new connection of the sqlite engines (primary and replicas)
+def enable_foreign_keys(engines):
+    for engine in engines:
+        if engine.dialect.name == "sqlite":
+            event.listen(engine, "connect", _enable_foreign_keys)
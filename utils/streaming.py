@@ -0,0 +1,61 @@
+# import SQLAlchemy
+from main import db
+
+# flask related imports for requests and responses
+from flask import Response, current_app, request, stream_with_context
+
+# import keyset ordering
+from utils.pagination import order_by_keyset, after_keyset
+
+
+# number of rows fetched from the database (and eager loaded) by each query while streaming
+STREAM_BATCH_SIZE = 500
+
+# media types a streamed collection can be written as
+JSON = "application/json"
+NDJSON = "application/x-ndjson"
+
+
+# return the media type to stream a collection as, or None if the collection should be returned one page at a time
+# streaming is chosen with '?stream=1' or by accepting ndjson; the Accept header then picks ndjson or a json array
+def get_stream_format():
+    # json is listed first so wildcards like */* keep the default json response
+    if request.accept_mimetypes.best_match([JSON, NDJSON]) == NDJSON:
+        return NDJSON
+
+    return JSON if request.args.get("stream", "").lower() in ("1", "true") else None
+
+
+# stream every row of a select statement (after the cursor, if one was provided) in sort key order
+# rows are fetched in keyset batches of STREAM_BATCH_SIZE, each one a normal query with its own eager loads, and serialized
+# one at a time, so memory use doesn't grow with the table. (yield_per can't be used - the eager loads of a yield_per
+# query inherit its yield_per once a do_orm_execute listener, like the soft delete filter, is registered, and fail)
+def stream_rows(stmt, sort_columns, schema, media_type, descending=False):
+    stmt = order_by_keyset(stmt, sort_columns, descending)
+    dumps = current_app.json.dumps
+
+    def rows():
+        batch = stmt
+        while True:
+            loaded = db.session.scalars(batch.limit(STREAM_BATCH_SIZE)).all()
+            yield from loaded
+            if len(loaded) < STREAM_BATCH_SIZE:
+                return
+
+            # the next batch starts after the last row of this one
+            batch = after_keyset(stmt, sort_columns, [getattr(loaded[-1], column.key) for column in sort_columns], descending)
+
+    def generate():
+        if media_type == NDJSON:
+            # one json document per line
+            for row in rows():
+                yield dumps(schema.dump(row)) + "\n"
+        else:
+            # a json array, written one element at a time
+            yield "["
+            for index, row in enumerate(rows()):
+                yield ("," if index else "") + dumps(schema.dump(row))
+            yield "]\n"
+
+    # keep the request (and its database session) open while the response is written
+    return Response(stream_with_context(generate()), mimetype=media_type)
@@ -0,0 +1,179 @@
+# import itertools, random and datetime library
+import itertools
+import random
+from datetime import datetime, timedelta
+
+# import SQLAlchemy and the bulk insert helper
+from main import db
+from utils.inserts import bulk_insert
+
+# import models
+from models.users import User
+from models.blog_posts import BlogPost
+from models.categories import Category, post_categories
+from models.comments import Comment
+from models.likes import Like
+from models.followers import Follower
+
+
+# words used to build synthetic titles, posts and comments
+WORDS = (
+    "the a of and to in is it that for on with as was at by this be from or have an they which one you were her all she "
+    "there would their we him been has when who will more no if out so said what up its about into than them can only "
+    "other new some could time these two may then do first any my now such like our over man me even most made after "
+    "also did many before must through back years where much your way well down should because each just those people "
+    "game season team family show music travel food city health policy science book film coach player fans win history"
+).split()
+
+# synthetic posts are spread over this many days, and comments are made up to COMMENT_DAYS days after their post
+DATE_RANGE_DAYS = 5 * 365
+COMMENT_DAYS = 30
+
+
+# draws ids with a Zipfian (power law) distribution - a few items are picked very often and most rarely, like the
+# likes of viral posts or the followers of celebrities. the popular ids are spread randomly instead of being the lowest ids
+class ZipfSampler:
+    def __init__(self, rng, ids, exponent):
+        self.rng = rng
+        self.ids = list(ids)
+        rng.shuffle(self.ids)
+        self.cum_weights = list(itertools.accumulate(1.0 / rank ** exponent for rank in range(1, len(self.ids) + 1)))
+
+    def sample(self, k):
+        return self.rng.choices(self.ids, cum_weights=self.cum_weights, k=k)
+
+
+# generator of synthetic rows - the same seed always generates the same rows
+class SyntheticData:
+    def __init__(self, seed, zipf_exponent, start_date):
+        self.rng = random.Random(seed)
+        self.zipf_exponent = zipf_exponent
+        self.start_date = start_date
+        self.first_post = 1
+        self.post_count = 1
+
+    def words(self, count):
+        return " ".join(self.rng.choices(WORDS, k=count))
+
+    # posts are dated in id order across the date range (like real posts), so a comment's post date is known from its id
+    def post_date(self, post_id):
+        seconds = DATE_RANGE_DAYS * 86400 * (post_id - self.first_post) // self.post_count
+        return self.start_date + timedelta(seconds=seconds)
+
+    def zipf(self, ids):
+        return ZipfSampler(self.rng, ids, self.zipf_exponent)
+
+    # (user_id, name, email, password, follower_count)
+    def users(self, first_id, count, password_hash):
+        for user_id in range(first_id, first_id + count):
+            yield (user_id, f"User {user_id}", f"user{user_id}@example.com", password_hash, 0)
+
+    # (category_id, category_name, name_normalized)
+    def categories(self, first_id, count):
+        for category_id in range(first_id, first_id + count):
+            yield (category_id, f"Category {category_id}", f"category {category_id}")
+
+    # (post_id, post_title, post_content, posted_date, updated_date, author_id, like_count, fanned_out)
+    # authors are Zipfian too, as a few users write most of the posts
+    def posts(self, first_id, count, user_ids):
+        self.first_post, self.post_count = first_id, max(count, 1)
+        authors = self.zipf(user_ids)
+        for post_id, author_id in zip(range(first_id, first_id + count), self._stream(authors)):
+            posted = self.post_date(post_id)
+            yield (post_id, self.words(6).capitalize(), self.words(self.rng.randint(40, 200)), posted, posted, author_id, 0, False)
+
+    # (post_id, category_id) - each post has up to 3 categories, with popular categories used more
+    def post_categories(self, post_ids, category_ids):
+        if not category_ids:
+            return
+        categories = self.zipf(category_ids)
+        for post_id in post_ids:
+            for category_id in set(categories.sample(self.rng.randint(0, 3))):
+                yield (post_id, category_id)
+
+    # (comment_id, comment_text, comment_date, updated_date, author_id, post_id, like_count)
+    # popular posts get more comments, averaging comments_per_post across all posts
+    def comments(self, first_id, post_ids, comments_per_post, user_ids):
+        posts = self.zipf(post_ids)
+        users = self._stream(self.zipf(user_ids))
+        count = int(len(post_ids) * comments_per_post)
+        for comment_id, post_id, author_id in zip(range(first_id, first_id + count), self._stream(posts, count), users):
+            date = self.post_date(post_id) + timedelta(seconds=self.rng.randrange(COMMENT_DAYS * 86400))
+            yield (comment_id, self.words(self.rng.randint(3, 30)).capitalize(), date, date, author_id, post_id, 0)
+
+    # (like_id, liker_id, post_id, comment_id) - likers are uniform, liked posts Zipfian, each (liker, post) pair once
+    def likes(self, first_id, count, user_ids, post_ids):
+        posts = self._stream(self.zipf(post_ids))
+        yield from self._unique_pairs(first_id, count, user_ids, posts, lambda like_id, liker_id, post_id: (like_id, liker_id, post_id, None))
+
+    # (follow_id, follower_id, followed_id) - followers are uniform, followed users Zipfian, no self or repeated follows
+    def follows(self, first_id, count, user_ids):
+        followed = self._stream(self.zipf(user_ids))
+        yield from self._unique_pairs(first_id, count, user_ids, followed, lambda follow_id, follower_id, followed_id: (follow_id, follower_id, followed_id))
+
+    # pairs of a uniformly chosen user and a target from the target stream, skipping repeats and self pairs
+    # gives up once most new pairs are repeats (the requested count is more than the distribution can fill)
+    def _unique_pairs(self, first_id, count, user_ids, targets, make_row):
+        seen = set()
+        attempts = 0
+        row_id = first_id
+        while len(seen) < count and attempts < count * 10:
+            attempts += 1
+            user_id = user_ids[self.rng.randrange(len(user_ids))]
+            target = next(targets)
+            if user_id == target or (user_id, target) in seen:
+                continue
+            seen.add((user_id, target))
+            yield make_row(row_id, user_id, target)
+            row_id += 1
+
+    # an endless (or count long) stream of samples, drawn in blocks
+    def _stream(self, sampler, count=None, block=10000):
+        remaining = count
+        while remaining is None or remaining > 0:
+            size = block if remaining is None else min(block, remaining)
+            yield from sampler.sample(size)
+            if remaining is not None:
+                remaining -= size
+
+
+# the next free id of a table's integer primary key
+def next_id(column):
+    return (db.session.scalar(db.select(db.func.max(column))) or 0) + 1
+
+
+# generate and insert a synthetic data set, returning the number of rows inserted into each table
+def generate(users, posts, comments_per_post, likes, follows, categories, password_hash, seed=1, zipf_exponent=1.1, batch_size=10000, log=print):
+    data = SyntheticData(seed, zipf_exponent, datetime(2019, 1, 1))
+    counts = {}
+
+    def insert(name, table, columns, rows):
+        counts[name] = bulk_insert(table, columns, rows, batch_size)
+        db.session.commit()
+        log(f"{counts[name]} {name} inserted...")
+
+    first_user = next_id(User.user_id)
+    user_ids = list(range(first_user, first_user + users))
+    insert("users", User.__table__, ("user_id", "name", "email", "password", "follower_count"), data.users(first_user, users, password_hash))
+
+    first_category = next_id(Category.category_id)
+    category_ids = list(range(first_category, first_category + categories))
+    insert("categories", Category.__table__, ("category_id", "category_name", "name_normalized"), data.categories(first_category, categories))
+
+    first_post = next_id(BlogPost.post_id)
+    post_ids = list(range(first_post, first_post + posts))
+    insert("posts", BlogPost.__table__,
+           ("post_id", "post_title", "post_content", "posted_date", "updated_date", "author_id", "like_count", "fanned_out"),
+           data.posts(first_post, posts, user_ids))
+
+    insert("post categories", post_categories, ("post_id", "category_id"), data.post_categories(post_ids, category_ids))
+
+    insert("comments", Comment.__table__,
+           ("comment_id", "comment_text", "comment_date", "updated_date", "author_id", "post_id", "like_count"),
+           data.comments(next_id(Comment.comment_id), post_ids, comments_per_post, user_ids))
+
+    insert("likes", Like.__table__, ("like_id", "liker_id", "post_id", "comment_id"), data.likes(next_id(Like.like_id), likes, user_ids, post_ids))
+
+    insert("follows", Follower.__table__, ("follow_id", "follower_id", "followed_id"), data.follows(next_id(Follower.follow_id), follows, user_ids))
+
+    return counts
@@ -0,0 +1,173 @@
+# import gzip, io, json, sys, time and datetime library
+import gzip
+import io
+import json
+import sys
+import time
+from datetime import date, datetime, timezone
+
+# import SQLAlchemy and the bulk insert helper
+from main import db
+from utils.inserts import bulk_insert
+
+# import models, so every table is in the metadata
+import models
+
+
+# an export is a JSONL file: a header line, then for each table a line naming the table and its columns followed by one
+# line per row (a list of values in column order). tables are written parents first, so an import never inserts a row
+# before the rows its foreign keys point to
+EXPORT_FORMAT = "blog-api-export"
+EXPORT_VERSION = 1
+
+# derived columns aren't exported - they are rebuilt after an import (the search index by reindex_all)
+DERIVED_COLUMNS = {"blogposts": {"search_vector"}}
+
+# first bytes of a gzip file
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+# the tables in foreign key order (parents first)
+def export_tables():
+    return db.metadata.sorted_tables
+
+
+def _exported_columns(table):
+    return [column for column in table.columns if column.name not in DERIVED_COLUMNS.get(table.name, ())]
+
+
+# open an export file for writing as text, gzip compressed if asked (or the file name ends with ".gz") - "-" is stdout
+def open_export(path, compress=False):
+    binary = sys.stdout.buffer if path == "-" else open(path, "wb")
+    if compress or path.endswith(".gz"):
+        binary = gzip.GzipFile(fileobj=binary, mode="wb", compresslevel=6)
+    return io.TextIOWrapper(binary, encoding="utf-8")
+
+
+# open an export file for reading as text, detecting gzip compression from its first bytes - "-" is stdin
+def open_import(path):
+    binary = io.BufferedReader(sys.stdin.buffer) if path == "-" else open(path, "rb")
+    if binary.peek(2)[:2] == GZIP_MAGIC:
+        binary = gzip.GzipFile(fileobj=binary, mode="rb")
+    return io.TextIOWrapper(binary, encoding="utf-8")
+
+
+# JSON value of a column value (dates as ISO 8601 strings)
+def _encode(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+# function turning a JSON value back into a column value
+def _decoder(column):
+    if isinstance(column.type, db.DateTime):
+        return lambda value: None if value is None else datetime.fromisoformat(value)
+    if isinstance(column.type, db.Date):
+        return lambda value: None if value is None else date.fromisoformat(value)
+    return None
+
+
+# write every table to an export file, returning the number of rows written for each table
+# rows are read with a server-side cursor (where the database has one) in batches of yield_per rows, so memory use
+# doesn't grow with the size of the database
+def export_data(file, batch_size=10000, log=print):
+    # read every table from one snapshot on postgresql, so rows written during the export can't leave a like in the file
+    # pointing at a post that isn't
+    if db.session.get_bind().dialect.name == "postgresql":
+        db.session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+    file.write(json.dumps({"format": EXPORT_FORMAT, "version": EXPORT_VERSION, "exported_at": datetime.now(timezone.utc).isoformat(timespec="seconds")}) + "\n")
+
+    counts = {}
+    for table in export_tables():
+        start = time.perf_counter()
+        columns = _exported_columns(table)
+        file.write(json.dumps({"table": table.name, "columns": [column.name for column in columns]}) + "\n")
+
+        stmt = db.select(*columns).order_by(*table.primary_key.columns).execution_options(yield_per=batch_size)
+        count = 0
+        for rows in db.session.execute(stmt).partitions():
+            file.write("".join(json.dumps([_encode(value) for value in row], separators=(",", ":")) + "\n" for row in rows))
+            count += len(rows)
+
+        counts[table.name] = count
+        _log_table(log, "exported", table.name, count, time.perf_counter() - start)
+
+    return counts
+
+
+# insert the rows of an export file into an empty database, keeping their ids, returning the number of rows for each table
+# each table is inserted in batches of batch_size rows and committed before the next table is read
+def import_data(file, batch_size=10000, log=print):
+    lines = iter(file)
+    header = json.loads(next(lines, "{}"))
+    if header.get("format") != EXPORT_FORMAT:
+        raise ValueError("the file isn't a blog api export")
+    if header.get("version") != EXPORT_VERSION:
+        raise ValueError(f"export format version {header.get('version')} isn't supported (expected {EXPORT_VERSION})")
+
+    # ids are kept, so the rows can only be added to empty tables
+    for table in export_tables():
+        if db.session.execute(db.select(db.literal(1)).select_from(table).limit(1)).first() is not None:
+            raise ValueError(f"the {table.name} table isn't empty - import into an empty database")
+
+    tables = db.metadata.tables
+    counts = {}
+    for section, rows in _sections(lines):
+        start = time.perf_counter()
+        table = tables.get(section["table"])
+        if table is None:
+            raise ValueError(f"the export contains an unknown table '{section['table']}'")
+
+        names = section["columns"]
+        unknown = [name for name in names if name not in table.columns]
+        if unknown:
+            raise ValueError(f"the {table.name} table has no column(s) {', '.join(unknown)}")
+
+        decoders = [(index, _decoder(table.columns[name])) for index, name in enumerate(names)]
+        decoders = [(index, decode) for index, decode in decoders if decode is not None]
+
+        def decoded(rows):
+            for row in rows:
+                for index, decode in decoders:
+                    row[index] = decode(row[index])
+                yield row
+
+        counts[table.name] = bulk_insert(table, names, decoded(rows), batch_size)
+        db.session.commit()
+        _log_table(log, "imported", table.name, counts[table.name], time.perf_counter() - start)
+
+    return counts
+
+
+# split the lines after the header into (table line, rows) pairs - the rows are read lazily, one table at a time
+def _sections(lines):
+    following = [None]
+
+    def rows():
+        for line in lines:
+            value = json.loads(line)
+            if isinstance(value, dict):
+                following[0] = value
+                return
+            yield value
+
+    for line in lines:
+        section = json.loads(line)
+        if not isinstance(section, dict):
+            raise ValueError("the export has rows before its first table line")
+        while section is not None:
+            following[0] = None
+            section_rows = rows()
+            yield section, section_rows
+
+            # skip any rows the caller didn't read, to reach the next table line
+            for _ in section_rows:
+                pass
+            section = following[0]
+
+
+def _log_table(log, action, name, count, seconds):
+    rate = count / seconds if seconds > 0 else 0
+    log(f"{count} {name} rows {action} in {seconds:.1f}s ({rate:,.0f} rows/s)")